@@ -1,60 +1,595 @@
 # api_main.py
-from fastapi import FastAPI
-from functions.popularity import get_popular_recommendations
-from functions.item_based import load_and_prepare_data, get_item_based_collaborative_recommendations
-from functions.session_based import  load_and_prepare_session_data, get_session_based_recommendations
-from functions.svd import load_and_prepare_svd_data, train_svd_model, get_svd_recommendations
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from functions.popularity import PopularityIndex, get_popular_recommendations, get_popular_recommendations_batch
+from functions.item_based import load_and_prepare_data, build_item_similarity_index, get_item_based_collaborative_recommendations, get_item_based_collaborative_recommendations_batch
+from functions.session_based import build_user_click_index, get_session_based_recommendations, get_session_based_recommendations_batch
+from functions.covisitation import build_covisitation_index, build_covisitation_index_from_files, get_covisitation_recommendations, get_covisitation_recommendations_batch
+from functions.svd import load_and_prepare_svd_data, train_svd_model, get_svd_recommendations, get_svd_recommendations_batch, SVDModel
+from functions.als import train_als_model, get_als_recommendations, get_als_recommendations_batch, ALSModel
+from functions.content_based import ContentIndex, load_article_embeddings, get_content_based_recommendations, get_content_based_recommendations_batch
+from functions.hybrid import HybridRecommender
+from functions.candidates import CandidateIndex, load_article_metadata
+from functions.cache import ResponseCache, RedisBackend
+from functions.registry import ModelRegistry
+from functions.metrics import RequestMetricsMiddleware, record_fallback, render as render_metrics
+from functions.shared import ServingIndexes
+from functions.ann import recall_at_n
+from functions.loader import load_clicks
+from functions.ingestion import ClickStore, ClickFileWatcher, PeriodicRefresher, clicks_from_records
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+import numpy as np
 import pandas as pd
 
-DATA_PATH = r"..\data\news-portal-user-interactions-by-globocom\clicks_sample.csv"
-df = pd.read_csv(DATA_PATH, sep=',')
-df = df.dropna(subset=['click_article_id'])
+# Fichier de clics ou dossier des fichiers horaires clicks_hour_*.csv (cache Arrow créé à côté)
+DATA_PATH = os.environ.get(
+    "CLICKS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "news-portal-user-interactions-by-globocom", "clicks_sample.csv"),
+)
 
-app = FastAPI()
+# "standalone" : le processus construit ses index et entraîne ses modèles ;
+# "shared" : worker lancé par serve.py, qui mappe en mémoire les index et modèles publiés par le superviseur
+SERVING_MODE = os.environ.get("SERVING_MODE", "standalone")
+if SERVING_MODE not in ("standalone", "shared"):
+    raise ValueError(f"SERVING_MODE inconnu : {SERVING_MODE} (attendu : standalone, shared)")
+# Publier les index après chaque construction, pour les workers (activé par serve.py dans le superviseur)
+PUBLISH_INDEXES = os.environ.get("PUBLISH_INDEXES") == "1"
+# Dossier des registres (index publiés, modèles SVD et ALS)
+MODELS_DIR = os.environ.get("MODELS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+INDEXES_DIR = os.path.join(MODELS_DIR, "indexes")
+
+def build_indexes(clicks, clicks_dir=None):
+    """
+    Construit les index qui ne sont pas mis à jour clic par clic (similarité item-item, historiques compactés,
+    co-visitation).
+
+    Args:
+        clicks (pd.DataFrame): Les clics.
+        clicks_dir (str): Dossier des fichiers horaires, pour construire la co-visitation en parallèle par fichier.
+
+    Returns:
+        tuple: L'index des historiques de clics, l'index de similarité item-item et l'index de co-visitation.
+    """
+    _, interaction_matrix = load_and_prepare_data(dataframe=clicks)
+    if clicks_dir is not None:
+        # Lancé comme script (python api.py), ce module serait réexécuté par chaque processus lancé en "spawn" :
+        # les fichiers sont alors traités dans le processus courant
+        new_covisitation_index = build_covisitation_index_from_files(clicks_dir, top_k=50, max_workers=1 if __name__ == "__main__" else None)
+    else:
+        new_covisitation_index = build_covisitation_index(clicks, top_k=50)
+    return build_user_click_index(clicks), build_item_similarity_index(interaction_matrix, top_k=50), new_covisitation_index
+
+def publish_indexes():
+    """
+    Publie les index servis pour les workers (mode "shared"), qui les chargent au prochain `sync_published`.
+    """
+    indexes_registry.publish(ServingIndexes(
+        click_index=session_index, similarity_index=item_similarity_index,
+        covisitation_index=covisitation_index, popularity_counts=popularity.counts,
+    ))
+
+def load_data():
+    """
+    Charge les clics et reconstruit les index précalculés (au démarrage et à chaque rechargement).
+    En mode "shared", les index publiés par le superviseur sont mappés en mémoire au lieu d'être reconstruits.
+    """
+    global click_store, popularity, session_index, item_similarity_index, covisitation_index, indexed_version, data_generation, latest_click_ms, last_rebuild
+    if SERVING_MODE == "shared":
+        # Le worker ne garde que les clics qu'il ingère lui-même ; le log complet reste chez le superviseur
+        clicks = pd.DataFrame({"user_id": [], "click_article_id": [], "click_timestamp": []})
+        version, indexes = indexes_registry.load()
+        new_popularity = indexes.popularity()
+        new_session_index, new_item_similarity_index, new_covisitation_index = indexes.click_index, indexes.similarity_index, indexes.covisitation_index
+        timestamps = new_session_index.timestamps
+    else:
+        clicks = load_clicks(DATA_PATH)
+        new_popularity = PopularityIndex.from_dataframe(clicks)
+        new_session_index, new_item_similarity_index, new_covisitation_index = build_indexes(clicks, clicks_dir=DATA_PATH if os.path.isdir(DATA_PATH) else None)
+        timestamps = clicks['click_timestamp']
+    latest_click_ms = int(timestamps.max()) if len(timestamps) else None
+    store = ClickStore(clicks)
+    click_store, popularity, session_index, item_similarity_index, covisitation_index, indexed_version = store, new_popularity, new_session_index, new_item_similarity_index, new_covisitation_index, 0
+    # Un nouveau stockage repart de la version 0 : la génération distingue ses versions des précédentes
+    data_generation += 1
+    last_rebuild = time.monotonic()
+    if PUBLISH_INDEXES:
+        publish_indexes()
+
+def sync_published():
+    """
+    Mode "shared" : bascule sur les dernières versions publiées par le superviseur (index, SVD, ALS).
+    Appelé périodiquement par chaque worker à la place de `refresh_models`.
+    """
+    if indexes_registry.latest_version() != indexes_registry.current[0]:
+        load_data()
+    for registry in (svd_registry, als_registry):
+        if registry.latest_version() != registry.current[0]:
+            registry.load()
+
+def ingest_clicks(clicks, source=None):
+    """
+    Ajoute un lot de clics : popularité et historiques sont à jour immédiatement,
+    la similarité item-item et le modèle SVD le seront au prochain rafraîchissement.
+    `source` est le fichier du lot, archivé une fois le lot compacté.
+    """
+    global latest_click_ms
+    with click_store.lock:
+        version = click_store.append(clicks, source)
+        latest_click_ms = max(latest_click_ms or 0, int(clicks['click_timestamp'].max()))
+        popularity.update(clicks['click_article_id'].to_numpy())
+        session_index.append(clicks['user_id'].to_numpy(), clicks['click_article_id'].to_numpy(), clicks['click_timestamp'].to_numpy())
+    return version
+
+def refresh_models(force: bool = False):
+    """
+    Reconstruit en arrière-plan les index et les modèles SVD et ALS à partir des clics ingérés.
+    Les requêtes continuent d'être servies par les anciens objets jusqu'à la bascule.
+
+    La reconstruction n'a lieu qu'à partir de REFRESH_MIN_CLICKS nouveaux clics, ou quand des clics
+    attendent depuis plus de REFRESH_MAX_DELAY_SECONDS : quelques clics ne relancent pas un entraînement complet.
+
+    Args:
+        force (bool): Reconstruire dès qu'il y a un nouveau clic, sans attendre les seuils.
+    """
+    global session_index, item_similarity_index, covisitation_index, indexed_version, last_rebuild
+    # Un seul rafraîchissement à la fois ; un appel concurrent est simplement ignoré
+    if not refresh_lock.acquire(blocking=False):
+        return
+    try:
+        store = click_store
+        if store.version == indexed_version:
+            return
+        pending_clicks = sum(len(batch) for batch in store.batches_since(indexed_version))
+        if not force and pending_clicks < REFRESH_MIN_CLICKS and time.monotonic() - last_rebuild < REFRESH_MAX_DELAY_SECONDS:
+            return
+        version, clicks = store.snapshot()
+        new_session_index, new_item_similarity_index, new_covisitation_index = build_indexes(clicks)
+        _, svd_interaction_matrix = load_and_prepare_svd_data(dataframe=clicks)
+        svd_registry.publish(train_svd_model(svd_interaction_matrix, n_components=50))
+        svd_registry.load()
+        als_registry.publish(train_als_model(svd_interaction_matrix, factors=50))
+        als_registry.load()
+
+        with store.lock:
+            if store is not click_store:
+                # Les données ont été rechargées entre-temps : ces index sont périmés
+                return
+            # Les lots arrivés pendant la reconstruction sont rejoués avant la bascule
+            for batch in store.batches_since(version):
+                new_session_index.append(batch['user_id'].to_numpy(), batch['click_article_id'].to_numpy(), batch['click_timestamp'].to_numpy())
+            session_index, item_similarity_index, covisitation_index, indexed_version = new_session_index, new_item_similarity_index, new_covisitation_index, version
+            last_rebuild = time.monotonic()
+        # Les fichiers compactés sont archivés avant la publication : un worker qui bascule sur les index
+        # publiés ne peut plus les lire une seconde fois
+        archive_click_files(store.compact(version, clicks))
+        if PUBLISH_INDEXES:
+            publish_indexes()
+    finally:
+        refresh_lock.release()
+
+# Nombre de versions gardées sur disque par registre après chaque publication (la version servie est toujours gardée)
+MODELS_TO_KEEP = int(os.environ.get("MODELS_TO_KEEP", "3"))
+# Seuils de reconstruction des index et modèles (voir `refresh_models`)
+REFRESH_MIN_CLICKS = int(os.environ.get("REFRESH_MIN_CLICKS", "1000"))
+REFRESH_MAX_DELAY_SECONDS = float(os.environ.get("REFRESH_MAX_DELAY_SECONDS", "3600"))
+
+refresh_lock = threading.Lock()
+data_generation = 0
+latest_click_ms = None
+last_rebuild = None
+indexes_registry = ModelRegistry(INDEXES_DIR, ServingIndexes, keep=MODELS_TO_KEEP)
+
+load_data()
+
+# Le modèle SVD est entraîné une seule fois puis servi depuis le registre
+SVD_MODELS_DIR = os.path.join(MODELS_DIR, "svd")
+# "exact" : score de tous les articles ; "approx" : recherche HNSW sur les vecteurs d'articles
+SVD_SEARCH_MODE = os.environ.get("SVD_SEARCH_MODE", "exact")
+svd_registry = ModelRegistry(SVD_MODELS_DIR, SVDModel, prepare=lambda model: model.build_article_index(SVD_SEARCH_MODE), keep=MODELS_TO_KEEP)
+if svd_registry.latest_version() is None and SERVING_MODE == "standalone":
+    _, svd_interaction_matrix = load_and_prepare_svd_data(dataframe=click_store.snapshot()[1])
+    svd_registry.publish(train_svd_model(svd_interaction_matrix, n_components=50))
+svd_registry.load()
+
+# Modèle ALS implicite : même registre versionné et mêmes modes de recherche que SVD
+ALS_MODELS_DIR = os.path.join(MODELS_DIR, "als")
+ALS_SEARCH_MODE = os.environ.get("ALS_SEARCH_MODE", "exact")
+als_registry = ModelRegistry(ALS_MODELS_DIR, ALSModel, prepare=lambda model: model.build_article_index(ALS_SEARCH_MODE), keep=MODELS_TO_KEEP)
+if als_registry.latest_version() is None and SERVING_MODE == "standalone":
+    _, als_interaction_matrix = load_and_prepare_svd_data(dataframe=click_store.snapshot()[1])
+    als_registry.publish(train_als_model(als_interaction_matrix, factors=50))
+als_registry.load()
+
+# Embeddings des articles (pickle converti une fois en .npy mappé en mémoire, partagé entre workers)
+EMBEDDINGS_PATH = os.environ.get(
+    "EMBEDDINGS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "news-portal-user-interactions-by-globocom", "articles_embeddings.pickle"),
+)
+CONTENT_SEARCH_MODE = os.environ.get("CONTENT_SEARCH_MODE", "exact")
+content_index = ContentIndex(load_article_embeddings(EMBEDDINGS_PATH), mode=CONTENT_SEARCH_MODE) if os.path.exists(EMBEDDINGS_PATH) else None
+
+# Pré-filtrage des candidats à partir des métadonnées des articles (date de création, catégorie, nombre de mots).
+# Âge maximal des articles éligibles (par défaut, aucun) et nombre minimal de mots ; l'ensemble éligible
+# est recalculé toutes les CANDIDATE_REFRESH_SECONDS
+ARTICLES_METADATA_PATH = os.environ.get(
+    "ARTICLES_METADATA_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "news-portal-user-interactions-by-globocom", "articles_metadata.csv"),
+)
+CANDIDATE_MAX_AGE_HOURS = float(os.environ["CANDIDATE_MAX_AGE_HOURS"]) if os.environ.get("CANDIDATE_MAX_AGE_HOURS") else None
+CANDIDATE_MIN_WORDS = int(os.environ.get("CANDIDATE_MIN_WORDS", "0"))
+CANDIDATE_REFRESH_SECONDS = float(os.environ.get("CANDIDATE_REFRESH_SECONDS", "60"))
+candidate_index = CandidateIndex(
+    load_article_metadata(ARTICLES_METADATA_PATH), max_age_hours=CANDIDATE_MAX_AGE_HOURS, min_words=CANDIDATE_MIN_WORDS,
+) if os.path.exists(ARTICLES_METADATA_PATH) else None
+
+def refresh_candidates():
+    """
+    Recalcule l'ensemble des articles éligibles. La fraîcheur est mesurée par rapport au dernier clic reçu
+    et non à l'horloge : les données rejouées (ex. le jeu Globo.com de 2017) gardent des articles éligibles.
+    """
+    if candidate_index is not None:
+        candidate_index.refresh(reference_ms=latest_click_ms)
+
+refresh_candidates()
+
+def resolve_candidates(max_age_hours: float = None, category_id: int = None):
+    """
+    Returns:
+        CandidateSet | None: Les articles éligibles qui passent les filtres de la requête,
+                             ou None sans métadonnées (aucun filtrage).
+    """
+    if candidate_index is None:
+        if max_age_hours is not None or category_id is not None:
+            raise HTTPException(status_code=503, detail="Métadonnées des articles indisponibles : filtres max_age_hours et category_id impossibles")
+        return None
+    return candidate_index.resolve(max_age_hours=max_age_hours, category_id=category_id)
+
+# Mélange hybride : poids par moteur (JSON, ex. {"svd": 0.5}) et pool de threads partagé par les requêtes
+HYBRID_WEIGHTS = json.loads(os.environ.get("HYBRID_WEIGHTS", "{}"))
+hybrid_recommender = HybridRecommender(max_workers=int(os.environ.get("HYBRID_WORKERS", "8")))
+
+# Rafraîchissement périodique des modèles, et dossier de fichiers horaires à suivre (optionnel)
+REFRESH_INTERVAL_SECONDS = float(os.environ.get("REFRESH_INTERVAL_SECONDS", "600"))
+CLICKS_WATCH_DIR = os.environ.get("CLICKS_WATCH_DIR")
+# Destination des fichiers de CLICKS_WATCH_DIR une fois compactés : par défaut le dossier des fichiers horaires,
+# chargé au démarrage ; sans dossier (CLICKS_PATH est un fichier), ils sont supprimés
+CLICKS_ARCHIVE_DIR = os.environ.get("CLICKS_ARCHIVE_DIR") or (DATA_PATH if os.path.isdir(DATA_PATH) else None)
+# Mode "shared" : délai entre deux vérifications des versions publiées par le superviseur
+SYNC_INTERVAL_SECONDS = float(os.environ.get("SYNC_INTERVAL_SECONDS", "10"))
+
+# Pool des calculs de recommandation : ils s'exécutent hors de la boucle d'événements, qui reste
+# disponible pour les requêtes légères (santé, cache) ; NumPy et SciPy relâchent le GIL pendant les calculs
+SCORING_THREADS = int(os.environ.get("SCORING_THREADS", str(min(8, os.cpu_count() or 1))))
+scoring_executor = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix="scoring")
+
+async def run_cpu(function, *args, **kwargs):
+    """
+    Exécute un calcul dans le pool `scoring_executor` et attend son résultat sans bloquer la boucle.
+    """
+    return await asyncio.get_running_loop().run_in_executor(scoring_executor, functools.partial(function, *args, **kwargs))
+
+def archive_click_files(files: list):
+    """
+    Sort de CLICKS_WATCH_DIR les fichiers dont les clics sont compactés dans le log de base :
+    le dossier surveillé ne grossit pas et un redémarrage ne les ingère pas une seconde fois.
+
+    Args:
+        files (list): Les fichiers rendus par `ClickStore.compact`.
+    """
+    for file in files:
+        if not os.path.exists(file):
+            continue
+        if CLICKS_ARCHIVE_DIR is None:
+            os.remove(file)
+            continue
+        destination = os.path.join(CLICKS_ARCHIVE_DIR, os.path.basename(file))
+        os.replace(file, destination)
+        # Date de modification mise à jour : le cache Arrow du dossier sera reconstruit avec ce fichier
+        os.utime(destination)
+
+def click_file_watcher() -> ClickFileWatcher:
+    """
+    Returns:
+        ClickFileWatcher: L'observateur de CLICKS_WATCH_DIR. Les fichiers présents au démarrage n'ont pas
+                          été compactés (sinon ils seraient archivés) et sont donc ingérés, sauf si le
+                          dossier surveillé est celui des clics chargés au démarrage.
+    """
+    skip_existing = os.path.realpath(CLICKS_WATCH_DIR) == os.path.realpath(DATA_PATH)
+    return ClickFileWatcher(CLICKS_WATCH_DIR, on_clicks=ingest_clicks, skip_existing=skip_existing)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Un worker ne réentraîne rien : il recharge ce que le superviseur publie
+    refresh = sync_published if SERVING_MODE == "shared" else refresh_models
+    workers = [PeriodicRefresher(refresh, interval=SYNC_INTERVAL_SECONDS if SERVING_MODE == "shared" else REFRESH_INTERVAL_SECONDS)]
+    if CLICKS_WATCH_DIR:
+        workers.append(click_file_watcher())
+    if candidate_index is not None:
+        workers.append(PeriodicRefresher(refresh_candidates, interval=CANDIDATE_REFRESH_SECONDS))
+    for worker in workers:
+        worker.start()
+    yield
+    for worker in workers:
+        worker.stop()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestMetricsMiddleware)
+
+# Cache des réponses : local à chaque worker, ou partagé si REDIS_URL est défini
+response_cache = ResponseCache(
+    max_size=int(os.environ.get("RESPONSE_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "60")),
+    backend=RedisBackend(os.environ["REDIS_URL"]) if os.environ.get("REDIS_URL") else None,
+)
+
+def serving_version(live_clicks: bool = False, max_age_hours: float = None) -> tuple:
+    """
+    Args:
+        live_clicks (bool): Inclure la version des clics ingérés, pour les endpoints qui lisent les historiques
+                            à jour clic par clic.
+        max_age_hours (float): Le filtre de fraîcheur de la requête, qui dépend aussi de l'instant de référence.
+
+    Returns:
+        tuple: La version de ce qui est servi (données, index, modèles, articles éligibles et, si demandé,
+               clics ingérés) : elle change dès qu'un index ou un modèle est publié.
+    """
+    candidate_version = candidate_index.version(max_age_hours) if candidate_index is not None else None
+    version = (data_generation, indexed_version, svd_registry.current[0], als_registry.current[0], candidate_version)
+    return version + (click_store.version,) if live_clicks else version
+
+def cached_response(algo: str, live_clicks: bool = False):
+    """
+    Met en cache la réponse d'un endpoint de recommandation, par (algorithme, user_id, top_n, paramètres)
+    et pour la version servie au début de la requête. L'endpoint (synchrone) est exécuté dans le pool de calcul.
+
+    Args:
+        algo (str): Le nom de l'algorithme, préfixe de la clé.
+        live_clicks (bool): L'endpoint lit les historiques de clics à jour (recommandations par l'historique,
+                            fold-in, exclusion des articles lus) : chaque lot ingéré invalide ses réponses.
+                            Sinon, elles ne changent qu'avec les index et modèles publiés
+                            (les compteurs de popularité, mis à jour clic par clic, attendent l'expiration du cache).
+    """
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**params):
+            version = serving_version(live_clicks, params.get("max_age_hours"))
+            extra = tuple(sorted((name, value) for name, value in params.items() if name not in ("user_id", "top_n")))
+            key = (algo, params.get("user_id"), params.get("top_n", 5), extra)
+            response = response_cache.get(key, version)
+            if response is None:
+                response = await run_cpu(endpoint, **params)
+                response_cache.set(key, version, response)
+            return response
+        return wrapper
+    return decorator
 
 @app.get("/")
 async def alive():
     return {"message": "API de Recommandation Alive"}
 
+@app.post("/reload")
+async def reload_data():
+    # Mode "shared" : seul le worker qui reçoit l'appel recharge tout de suite, les autres au prochain passage
+    await run_cpu(sync_published if SERVING_MODE == "shared" else load_data)
+    return {"message": "Données rechargées"}
+
+@app.post("/models/svd/reload")
+async def reload_svd_model(version: str = None):
+    loaded_version, _ = await run_cpu(svd_registry.load, version)
+    return {"model": "svd", "version": loaded_version}
+
+@app.post("/models/als/reload")
+async def reload_als_model(version: str = None):
+    loaded_version, _ = await run_cpu(als_registry.load, version)
+    return {"model": "als", "version": loaded_version}
+
+class Click(BaseModel):
+    user_id: int
+    click_article_id: int
+    click_timestamp: int
+    session_id: int | None = None
+
+class ClickBatch(BaseModel):
+    clicks: list[Click]
+
+def queue_clicks(clicks):
+    """
+    Mode "shared" : écrit un lot de clics dans le dossier surveillé, d'où chaque worker et le superviseur
+    l'ingèrent (un clic reçu par un seul worker serait sinon invisible des autres). Le superviseur
+    archive le fichier quand il compacte le lot (voir `archive_click_files`).
+
+    Returns:
+        str: Le fichier écrit.
+    """
+    path = os.path.join(CLICKS_WATCH_DIR, f"clicks_api_{time.time_ns()}_{os.getpid()}.csv")
+    # Écrit sous un nom ignoré par les observateurs puis renommé : un fichier visible est toujours complet
+    clicks.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return path
+
+@app.post("/clicks")
+async def post_clicks(batch: ClickBatch):
+    if not batch.clicks:
+        return {"ingested": 0, "version": click_store.version}
+    clicks = clicks_from_records([click.model_dump() for click in batch.clicks])
+    if SERVING_MODE == "shared":
+        if not CLICKS_WATCH_DIR:
+            raise HTTPException(status_code=503, detail="En mode multi-processus, l'ingestion passe par CLICKS_WATCH_DIR")
+        await run_cpu(queue_clicks, clicks)
+        return {"queued": len(batch.clicks), "version": click_store.version}
+    version = await run_cpu(ingest_clicks, clicks)
+    return {"ingested": len(batch.clicks), "version": version}
+
+@app.post("/models/refresh")
+async def refresh():
+    if SERVING_MODE == "shared":
+        raise HTTPException(status_code=409, detail="En mode multi-processus, les modèles sont rafraîchis par le superviseur")
+    # Déclenche le rafraîchissement sans attendre la fin : les requêtes ne bloquent jamais sur l'entraînement.
+    # Un appel explicite n'attend pas les seuils REFRESH_MIN_CLICKS / REFRESH_MAX_DELAY_SECONDS
+    threading.Thread(target=refresh_models, kwargs={"force": True}, name="manual-refresh", daemon=True).start()
+    return {"message": "Rafraîchissement lancé", "version": click_store.version}
+
+@app.get("/models/svd/recall")
+def svd_search_recall(top_n: int = 10, sample_size: int = 200):
+    # Compare la recherche servie (exacte ou approchée) à la recherche exacte sur un échantillon d'utilisateurs
+    version, svd_model = svd_registry.current
+    rng = np.random.default_rng(0)
+    sample_rows = rng.choice(len(svd_model.user_ids), size=min(sample_size, len(svd_model.user_ids)), replace=False)
+    recall = recall_at_n(svd_model.article_index, svd_model.U[sample_rows], top_n=top_n)
+    return {"model": "svd", "version": version, "mode": svd_model.article_index.mode, "top_n": top_n, "recall": recall}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Format texte Prometheus : durées par endpoint et par étape, replis, temps de construction, nnz, RSS
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
 @app.get("/recommendation/popularity")
-async def recommendation_per_popularity():
-    recommendations = get_popular_recommendations(dataframe=df, top_n=5)
+@cached_response("popularity")
+def recommendation_per_popularity(max_age_hours: float = None, category_id: int = None):
+    candidates = resolve_candidates(max_age_hours, category_id)
+    recommendations = get_popular_recommendations(popularity=popularity, top_n=5, candidates=candidates)
     return {"recommendations": recommendations}
 
 @app.get("/recommendation/item-based")
-async def recommendation_item_based(user_id: int):
-    clicks_df, interaction_matrix = load_and_prepare_data(dataframe=df)
-
-    if not interaction_matrix.empty:
-        recommendations = get_item_based_collaborative_recommendations(user_id, dataframe=df, interaction_matrix=interaction_matrix, top_n=5)
+@cached_response("item-based", live_clicks=True)
+def recommendation_item_based(user_id: int, recency_half_life_hours: float = None, max_age_hours: float = None, category_id: int = None):
+    candidates = resolve_candidates(max_age_hours, category_id)
+    if not item_similarity_index.empty:
+        recommendations = get_item_based_collaborative_recommendations(user_id, popularity=popularity, similarity_index=item_similarity_index, top_n=5, click_index=session_index, recency_half_life_hours=recency_half_life_hours, candidates=candidates)
         return {"user_id": user_id, "recommendations": recommendations}
     else:
         return {"user_id": user_id, "recommendations": []}
 
 @app.get("/recommendation/session-based") # Corrigé la typo
-async def recommendation_per_session(user_id: str):
-    clicks_df = load_and_prepare_session_data(dataframe=df)
-    if not clicks_df.empty:
-        recommendations = get_session_based_recommendations(user_id, dataframe=df, top_n=5)
+@cached_response("session-based", live_clicks=True)
+def recommendation_per_session(user_id: str, max_age_hours: float = None, category_id: int = None):
+    candidates = resolve_candidates(max_age_hours, category_id)
+    if not session_index.empty:
+        recommendations = get_session_based_recommendations(user_id, click_index=session_index, popularity=popularity, top_n=5, candidates=candidates)
         return {"user_id": user_id, "recommendations": recommendations}
     else:
         return {"user_id": user_id, "recommendations": []}
 
+@app.get("/recommendation/covisitation")
+@cached_response("covisitation", live_clicks=True)
+def recommendation_per_covisitation(user_id: int, max_age_hours: float = None, category_id: int = None):
+    candidates = resolve_candidates(max_age_hours, category_id)
+    # Prochains articles d'après les derniers clics (clics ingérés compris) et les sessions des autres lecteurs
+    recommendations = get_covisitation_recommendations(user_id, click_index=session_index, covisitation_index=covisitation_index, popularity=popularity, top_n=5, candidates=candidates)
+    return {"user_id": user_id, "recommendations": recommendations}
+
 @app.get("/recommendation/svd")
-async def recommendation_per_svd(user_id: int):
-    clicks_df, interaction_matrix, user_ids, article_ids = load_and_prepare_svd_data(dataframe=df)
-    svd_model, U_latent, V_latent = train_svd_model(interaction_matrix, n_components=50)
+@cached_response("svd", live_clicks=True)
+def recommendation_per_svd(user_id: int, max_age_hours: float = None, category_id: int = None):
+    candidates = resolve_candidates(max_age_hours, category_id)
+    # Lecture unique : le modèle ne change pas en cours de requête même si une nouvelle version est chargée
+    version, svd_model = svd_registry.current
 
-    if user_id in user_ids:
-        recommendations = get_svd_recommendations(user_id, dataframe=df, interaction_matrix=interaction_matrix, user_ids=user_ids, article_ids=article_ids, U_latent=U_latent, V_latent=V_latent, top_n=5)
-        return {"user_id": user_id, "recommendations": recommendations}
+    if user_id in svd_model.users:
+        recommendations = get_svd_recommendations(user_id, popularity=popularity, model=svd_model, top_n=5, click_index=session_index, candidates=candidates)
+        return {"user_id": user_id, "recommendations": recommendations, "model_version": version}
+    elif len(session_index.history(user_id)[0]) > 0:
+        # Utilisateur absent de l'entraînement mais avec des clics : projection (fold-in) sur le modèle
+        recommendations = get_svd_recommendations(user_id, popularity=popularity, model=svd_model, top_n=5, click_index=session_index, candidates=candidates)
+        return {"user_id": user_id, "recommendations": recommendations, "model_version": version, "info": "Utilisateur projeté sur le modèle SVD à partir de ses clics récents."}
     else:
         # Si l'utilisateur n'est pas dans les données d'entraînement, on retombe sur la popularité
-        popular_articles = df['click_article_id'].value_counts()
-        top_articles = popular_articles.head(5)
-        fallback_recs = [{"article_id": int(art_id), "popularity": int(count)} for art_id, count in top_articles.items()]
+        record_fallback("svd", "unknown_user")
+        fallback_recs = popularity.recommend(top_n=5, candidates=candidates)
         return {"user_id": user_id, "recommendations": fallback_recs, "info": "Utilisateur inconnu du modèle SVD, retombé sur la popularité."}
 
+@app.get("/recommendation/als")
+@cached_response("als", live_clicks=True)
+def recommendation_per_als(user_id: int, max_age_hours: float = None, category_id: int = None):
+    candidates = resolve_candidates(max_age_hours, category_id)
+    version, als_model = als_registry.current
+
+    if user_id in als_model.users:
+        recommendations = get_als_recommendations(user_id, popularity=popularity, model=als_model, top_n=5, click_index=session_index, candidates=candidates)
+        return {"user_id": user_id, "recommendations": recommendations, "model_version": version}
+    elif len(session_index.history(user_id)[0]) > 0:
+        recommendations = get_als_recommendations(user_id, popularity=popularity, model=als_model, top_n=5, click_index=session_index, candidates=candidates)
+        return {"user_id": user_id, "recommendations": recommendations, "model_version": version, "info": "Utilisateur projeté sur le modèle ALS à partir de ses clics récents."}
+    else:
+        record_fallback("als", "unknown_user")
+        fallback_recs = popularity.recommend(top_n=5, candidates=candidates)
+        return {"user_id": user_id, "recommendations": fallback_recs, "info": "Utilisateur inconnu du modèle ALS, retombé sur la popularité."}
+
+@app.get("/recommendation/content-based")
+@cached_response("content-based", live_clicks=True)
+def recommendation_content_based(user_id: int, recency_half_life_hours: float = None, max_age_hours: float = None, category_id: int = None):
+    if content_index is None:
+        raise HTTPException(status_code=503, detail="Embeddings des articles indisponibles")
+    candidates = resolve_candidates(max_age_hours, category_id)
+    recommendations = get_content_based_recommendations(user_id, content_index=content_index, click_index=session_index, popularity=popularity, top_n=5, recency_half_life_hours=recency_half_life_hours, candidates=candidates)
+    return {"user_id": user_id, "recommendations": recommendations}
+
+@app.get("/recommendation/hybrid")
+def recommendation_hybrid(user_id: int, top_n: int = 5, popularity_weight: float = None, item_based_weight: float = None,
+                          svd_weight: float = None, session_weight: float = None, budget_ms: float = None,
+                          max_age_hours: float = None, category_id: int = None):
+    # Fonction synchrone : FastAPI l'exécute dans son pool, l'attente des moteurs ne bloque pas la boucle
+    requested_weights = {"popularity": popularity_weight, "item-based": item_based_weight, "svd": svd_weight, "session": session_weight}
+    weights = {**HYBRID_WEIGHTS, **{name: weight for name, weight in requested_weights.items() if weight is not None}}
+    budgets_ms = {name: budget_ms for name in requested_weights} if budget_ms is not None else None
+    candidates = resolve_candidates(max_age_hours, category_id)
+    svd_version, svd_model = svd_registry.current
+    recommendations, engines = hybrid_recommender.recommend(
+        user_id, popularity=popularity, similarity_index=item_similarity_index, svd_model=svd_model,
+        click_index=session_index, top_n=top_n, weights=weights, budgets_ms=budgets_ms, candidates=candidates,
+    )
+    return {"user_id": user_id, "recommendations": recommendations, "engines": engines, "model_version": svd_version}
+
+class BatchRequest(BaseModel):
+    user_ids: list[int]
+    top_n: int = 5
+    max_age_hours: float | None = None
+    category_id: int | None = None
+
+# Taille des paquets d'utilisateurs scorés ensemble : borne la mémoire des matrices de scores
+BATCH_CHUNK_SIZE = 256
+
+@app.post("/recommendation/{algo}/batch")
+async def recommendation_batch(algo: str, request: BatchRequest):
+    # Les index et le modèle sont lus une seule fois pour tout le lot
+    svd_version, svd_model = svd_registry.current
+    als_version, als_model = als_registry.current
+    popularity_index, click_index, similarity_index, next_article_index = popularity, session_index, item_similarity_index, covisitation_index
+    candidates = resolve_candidates(request.max_age_hours, request.category_id)
+    batch_functions = {
+        "popularity": lambda user_ids: get_popular_recommendations_batch(user_ids, popularity=popularity_index, top_n=request.top_n, candidates=candidates),
+        "item-based": lambda user_ids: get_item_based_collaborative_recommendations_batch(user_ids, popularity=popularity_index, similarity_index=similarity_index, top_n=request.top_n, click_index=click_index, candidates=candidates),
+        "session-based": lambda user_ids: get_session_based_recommendations_batch(user_ids, click_index=click_index, popularity=popularity_index, top_n=request.top_n, candidates=candidates),
+        "covisitation": lambda user_ids: get_covisitation_recommendations_batch(user_ids, click_index=click_index, covisitation_index=next_article_index, popularity=popularity_index, top_n=request.top_n, candidates=candidates),
+        "svd": lambda user_ids: get_svd_recommendations_batch(user_ids, popularity=popularity_index, model=svd_model, top_n=request.top_n, click_index=click_index, candidates=candidates),
+        "als": lambda user_ids: get_als_recommendations_batch(user_ids, popularity=popularity_index, model=als_model, top_n=request.top_n, click_index=click_index, candidates=candidates),
+    }
+    if content_index is not None:
+        batch_functions["content-based"] = lambda user_ids: get_content_based_recommendations_batch(user_ids, content_index=content_index, click_index=click_index, popularity=popularity_index, top_n=request.top_n, candidates=candidates)
+    if algo not in batch_functions:
+        raise HTTPException(status_code=404, detail=f"Algorithme inconnu : {algo}")
+    recommend = batch_functions[algo]
+
+    def ndjson_lines():
+        for start in range(0, len(request.user_ids), BATCH_CHUNK_SIZE):
+            user_ids = request.user_ids[start:start + BATCH_CHUNK_SIZE]
+            for user_id, recommendations in zip(user_ids, recommend(user_ids)):
+                yield json.dumps({"user_id": user_id, "recommendations": recommendations}) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app=app, host="0.0.0.0", port=8005) # Utilise un int pour le port
@@ -0,0 +1,59 @@
+# benchmarks/bench_topn.py
+"""
+Compare la sélection du top-N par tri complet (`argsort`) et par `argpartition` (functions/topn.py).
+
+Usage (depuis le dossier api/) :
+    python benchmarks/bench_topn.py [--top-n 5] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from functions.topn import top_n_indices, top_n_indices_batch
+
+CATALOGUE_SIZES = (10_000, 100_000, 1_000_000)
+BATCH_SIZE = 16
+
+def full_sort_top_n(scores: np.ndarray, top_n: int, exclude: np.ndarray) -> np.ndarray:
+    # Approche précédente : tri complet du vecteur puis filtrage des articles déjà consultés
+    ranked = scores.argsort()[::-1]
+    return ranked[~exclude[ranked]][:top_n]
+
+def best_time(statement, repeat: int) -> float:
+    return min(timeit.repeat(statement, number=1, repeat=repeat)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"top_n={args.top_n}, meilleur temps sur {args.repeat} essais (ms)\n")
+    print(f"| articles | argsort | argpartition | gain | argsort x{BATCH_SIZE} | argpartition x{BATCH_SIZE} | gain |")
+    print("|---:|---:|---:|---:|---:|---:|---:|")
+    for n_articles in CATALOGUE_SIZES:
+        scores = rng.standard_normal(n_articles)
+        exclude = np.zeros(n_articles, dtype=bool)
+        exclude[rng.choice(n_articles, size=50, replace=False)] = True
+        batch_scores = rng.standard_normal((BATCH_SIZE, n_articles))
+        batch_exclude = np.zeros(batch_scores.shape, dtype=bool)
+
+        assert np.array_equal(full_sort_top_n(scores, args.top_n, exclude), top_n_indices(scores, args.top_n, exclude=exclude))
+
+        single_sort = best_time(lambda: full_sort_top_n(scores, args.top_n, exclude), args.repeat)
+        single_partition = best_time(lambda: top_n_indices(scores, args.top_n, exclude=exclude), args.repeat)
+        batch_sort = best_time(lambda: [full_sort_top_n(row, args.top_n, mask) for row, mask in zip(batch_scores, batch_exclude)], args.repeat)
+        batch_partition = best_time(lambda: top_n_indices_batch(batch_scores, args.top_n, exclude=batch_exclude), args.repeat)
+        print(
+            f"| {n_articles:,} | {single_sort:.3f} | {single_partition:.3f} | x{single_sort / single_partition:.1f} "
+            f"| {batch_sort:.2f} | {batch_partition:.2f} | x{batch_sort / batch_partition:.1f} |"
+        )
+    print(f"\nLes colonnes x{BATCH_SIZE} mesurent un lot de {BATCH_SIZE} utilisateurs scorés ensemble.")
+
+if __name__ == "__main__":
+    main()
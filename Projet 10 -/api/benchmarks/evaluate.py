@@ -0,0 +1,267 @@
+# benchmarks/evaluate.py
+"""
+Évaluation hors ligne des moteurs de recommandation : qualité et performances.
+
+Le log de clics est coupé dans le temps : les clics antérieurs à la coupure servent à construire
+les moteurs, les articles cliqués après la coupure sont les articles à retrouver. Pour chaque moteur
+et chaque taille d'entraînement, le rapport contient :
+    - HR@k, NDCG@k, MRR et couverture du catalogue ;
+    - latence par requête (p50, p95, p99), débit et temps de construction ;
+    - RSS maximal du processus après construction (monotone : les tailles sont traitées par ordre croissant).
+
+Tous les moteurs suivent la même règle pour les articles lus avant la coupure (--seen-policy) :
+"exclude" (par défaut) les retire des listes recommandées, complétées jusqu'à k, et des articles
+à retrouver ; "keep" les laisse partout. Sans règle commune, un moteur qui repropose l'historique
+n'est pas comparable à un moteur qui l'exclut (le moteur session-based, qui recommande l'historique,
+est proche de 0 avec "exclude").
+
+Usage (depuis le dossier api/) :
+    python benchmarks/evaluate.py <fichier_ou_dossier_de_clics> [--k 10] [--sizes 0.25,0.5,1]
+                                  [--engines popularity,item-based,session-based,svd,als] [--seen-policy exclude]
+                                  [--output rapport.json]
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from functions.als import get_als_recommendations, train_als_model
+from functions.interactions import build_interaction_matrix
+from functions.item_based import build_item_similarity_index, get_item_based_collaborative_recommendations
+from functions.loader import load_clicks
+from functions.popularity import PopularityIndex, get_popular_recommendations
+from functions.session_based import build_user_click_index, get_session_based_recommendations
+from functions.svd import get_svd_recommendations, train_svd_model
+
+ENGINES = ("popularity", "item-based", "session-based", "svd", "als")
+SEEN_POLICIES = ("exclude", "keep")
+
+def time_split(clicks, test_fraction: float):
+    """
+    Coupe le log au quantile `1 - test_fraction` des horodatages.
+
+    Returns:
+        tuple: Les clics d'entraînement, les clics de test et l'horodatage de coupure.
+    """
+    cutoff = int(np.quantile(clicks['click_timestamp'].to_numpy(), 1 - test_fraction))
+    is_train = clicks['click_timestamp'].to_numpy() < cutoff
+    return clicks[is_train], clicks[~is_train], cutoff
+
+def test_targets(test, max_users: int, seed: int = 0) -> dict:
+    """
+    Returns:
+        dict: Pour un échantillon d'utilisateurs du test, l'ensemble des articles cliqués après la coupure.
+    """
+    targets = test.groupby('user_id')['click_article_id'].agg(lambda articles: set(articles.tolist()))
+    if len(targets) > max_users:
+        targets = targets.sample(n=max_users, random_state=seed)
+    return {int(user_id): articles for user_id, articles in targets.items()}
+
+def seen_articles(train, users) -> dict:
+    """
+    Returns:
+        dict: Pour chaque utilisateur de `users`, l'ensemble des articles cliqués avant la coupure.
+    """
+    train = train[train['user_id'].isin(list(users))]
+    seen = train.groupby('user_id')['click_article_id'].agg(lambda articles: set(articles.tolist()))
+    return {int(user_id): articles for user_id, articles in seen.items()}
+
+def exclude_seen(targets: dict, seen: dict) -> dict:
+    """
+    Returns:
+        dict: Les articles à retrouver sans ceux déjà lus ; les utilisateurs sans article nouveau sont retirés.
+    """
+    targets = {user_id: relevant - seen.get(user_id, set()) for user_id, relevant in targets.items()}
+    return {user_id: relevant for user_id, relevant in targets.items() if relevant}
+
+def ranking_metrics(recommended: list, relevant: set, k: int) -> tuple:
+    """
+    Returns:
+        tuple: HR@k, NDCG@k et rang réciproque (MRR) d'une liste recommandée.
+    """
+    hits = [rank for rank, article_id in enumerate(recommended[:k]) if article_id in relevant]
+    if not hits:
+        return 0.0, 0.0, 0.0
+    dcg = sum(1.0 / np.log2(rank + 2) for rank in hits)
+    ideal = sum(1.0 / np.log2(rank + 2) for rank in range(min(len(relevant), k)))
+    return 1.0, dcg / ideal, 1.0 / (hits[0] + 1)
+
+def peak_rss_mb() -> float:
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def build_engines(train, engines: list, svd_components: int, als_factors: int) -> dict:
+    """
+    Construit les moteurs demandés sur les clics d'entraînement.
+
+    Returns:
+        dict: Nom du moteur -> (fonction (user_id, top_n) -> liste d'IDs recommandés, temps de construction en s,
+              RSS maximal en Mo).
+    """
+    built = {}
+
+    def timed(name, build):
+        start = time.perf_counter()
+        recommend = build()
+        built[name] = (recommend, time.perf_counter() - start, peak_rss_mb())
+
+    # Popularité et historiques sont partagés par plusieurs moteurs (repli, fold-in) : construits d'abord
+    start = time.perf_counter()
+    popularity = PopularityIndex.from_dataframe(train)
+    click_index = build_user_click_index(train)
+    shared_seconds = time.perf_counter() - start
+    interaction_matrix = build_interaction_matrix(train) if {"item-based", "svd", "als"} & set(engines) else None
+
+    def ids(recommendations):
+        return [recommendation['article_id'] for recommendation in recommendations]
+
+    builders = {
+        "popularity": lambda: (lambda user_id, top_n: ids(get_popular_recommendations(popularity, top_n=top_n))),
+        "session-based": lambda: (
+            lambda user_id, top_n: ids(get_session_based_recommendations(user_id, click_index, popularity, top_n=top_n))
+        ),
+    }
+
+    def item_based():
+        similarity_index = build_item_similarity_index(interaction_matrix, top_k=50)
+        return lambda user_id, top_n: ids(get_item_based_collaborative_recommendations(user_id, popularity, similarity_index, top_n=top_n, click_index=click_index))
+
+    def svd():
+        model = train_svd_model(interaction_matrix, n_components=svd_components)
+        return lambda user_id, top_n: ids(get_svd_recommendations(user_id, popularity, model, top_n=top_n, click_index=click_index))
+
+    def als():
+        model = train_als_model(interaction_matrix, factors=als_factors)
+        return lambda user_id, top_n: ids(get_als_recommendations(user_id, popularity, model, top_n=top_n, click_index=click_index))
+
+    builders.update({"item-based": item_based, "svd": svd, "als": als})
+    for name in engines:
+        timed(name, builders[name])
+    for name in ("popularity", "session-based"):
+        if name in built:
+            recommend, seconds, rss = built[name]
+            built[name] = (recommend, seconds + shared_seconds, rss)
+    return built
+
+def evaluate_engine(recommend, targets: dict, k: int, n_articles: int, seen: dict = None) -> dict:
+    """
+    Interroge un moteur pour chaque utilisateur de test.
+
+    Args:
+        seen (dict): Les articles déjà lus par utilisateur, retirés des recommandations (None : rien n'est retiré).
+                     Le moteur est interrogé pour k articles de plus que l'historique, la liste filtrée
+                     est ensuite coupée à k : chaque moteur a ainsi k recommandations nouvelles.
+
+    Returns:
+        dict: Les métriques de qualité, les percentiles de latence et le débit.
+    """
+    latencies, scores, recommended_articles = [], [], set()
+    start = time.perf_counter()
+    for user_id, relevant in targets.items():
+        request_start = time.perf_counter()
+        if seen is None:
+            recommended = recommend(user_id, k)
+        else:
+            user_seen = seen.get(user_id, set())
+            recommended = [article_id for article_id in recommend(user_id, k + len(user_seen)) if article_id not in user_seen][:k]
+        latencies.append(time.perf_counter() - request_start)
+        scores.append(ranking_metrics(recommended, relevant, k))
+        recommended_articles.update(recommended)
+    elapsed = time.perf_counter() - start
+
+    hr, ndcg, mrr = np.mean(scores, axis=0) if scores else (0.0, 0.0, 0.0)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "metrics": {
+            f"hr@{k}": float(hr),
+            f"ndcg@{k}": float(ndcg),
+            "mrr": float(mrr),
+            "coverage": len(recommended_articles) / n_articles if n_articles else 0.0,
+        },
+        "latency_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else 0.0,
+            "p95": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else 0.0,
+            "p99": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else 0.0,
+            "mean": float(latencies_ms.mean()) if len(latencies_ms) else 0.0,
+        },
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("clicks", help="Fichier CSV de clics ou dossier de fichiers horaires")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--test-fraction", type=float, default=0.1, help="Part la plus récente du log gardée pour le test")
+    parser.add_argument("--sizes", default="0.25,0.5,1", help="Parts (les plus récentes) des clics d'entraînement utilisées")
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--max-users", type=int, default=2000, help="Nombre maximal d'utilisateurs de test interrogés")
+    parser.add_argument("--svd-components", type=int, default=50)
+    parser.add_argument("--als-factors", type=int, default=50)
+    parser.add_argument("--seen-policy", choices=SEEN_POLICIES, default="exclude",
+                        help="Articles lus avant la coupure : retirés des recommandations et des cibles, ou gardés")
+    parser.add_argument("--output", default="evaluation_report.json")
+    args = parser.parse_args()
+
+    engines = [engine for engine in args.engines.split(",") if engine]
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"Moteurs inconnus : {', '.join(sorted(unknown))} (attendus : {', '.join(ENGINES)})")
+
+    clicks = load_clicks(args.clicks).sort_values('click_timestamp', kind='stable')
+    train, test, cutoff = time_split(clicks, args.test_fraction)
+    targets = test_targets(test, args.max_users)
+    seen = None
+    if args.seen_policy == "exclude":
+        seen = seen_articles(train, targets)
+        targets = exclude_seen(targets, seen)
+    print(f"{len(train):,} clics d'entraînement, {len(test):,} clics de test, {len(targets):,} utilisateurs évalués\n")
+
+    runs = []
+    print(f"| taille | moteur | HR@{args.k} | NDCG@{args.k} | MRR | couverture | p50 (ms) | p95 (ms) | p99 (ms) | req/s | construction (s) | RSS max (Mo) |")
+    print("|---:|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|")
+    for size in sorted(float(size) for size in args.sizes.split(",")):
+        # Les clics les plus récents, les plus proches de la période de test, sont gardés en priorité
+        sized_train = train.iloc[len(train) - int(round(len(train) * size)):]
+        n_articles = sized_train['click_article_id'].nunique()
+        run = {
+            "size": size,
+            "train_clicks": len(sized_train),
+            "train_users": int(sized_train['user_id'].nunique()),
+            "train_articles": int(n_articles),
+            "engines": {},
+        }
+        for name, (recommend, build_seconds, rss) in build_engines(sized_train, engines, args.svd_components, args.als_factors).items():
+            result = evaluate_engine(recommend, targets, args.k, n_articles, seen)
+            result.update({"build_seconds": build_seconds, "peak_rss_mb": rss})
+            run["engines"][name] = result
+            metrics, latency = result["metrics"], result["latency_ms"]
+            print(
+                f"| {size:g} | {name} | {metrics[f'hr@{args.k}']:.4f} | {metrics[f'ndcg@{args.k}']:.4f} | {metrics['mrr']:.4f} "
+                f"| {metrics['coverage']:.4f} | {latency['p50']:.2f} | {latency['p95']:.2f} | {latency['p99']:.2f} "
+                f"| {result['throughput_rps']:.0f} | {build_seconds:.2f} | {rss:.0f} |"
+            )
+        runs.append(run)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "clicks": os.path.abspath(args.clicks),
+        "k": args.k,
+        "test_fraction": args.test_fraction,
+        "seen_policy": args.seen_policy,
+        "cutoff_timestamp": cutoff,
+        "test_users": len(targets),
+        "runs": runs,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nRapport écrit dans {args.output}")
+
+if __name__ == "__main__":
+    main()
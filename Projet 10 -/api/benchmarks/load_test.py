@@ -0,0 +1,317 @@
+# benchmarks/load_test.py
+"""
+Test de charge de l'API de recommandation : débit, latence (p50, p95, p99) et taux d'erreur
+à mesure que la concurrence augmente.
+
+Les user_id envoyés suivent la distribution réelle du log de clics (un utilisateur est tiré avec une
+probabilité proportionnelle à son nombre de clics), plus une part d'utilisateurs inconnus qui passent
+par les replis. Chaque scénario est joué en boucle fermée : N clients envoient chacun une requête dès
+que la précédente est revenue, pendant --duration secondes par palier de concurrence.
+
+Scénarios :
+    - un par endpoint (popularity, item-based, session-based, covisitation, svd, als, content-based, hybrid) ;
+    - batch : POST /recommendation/svd/batch avec --batch-size utilisateurs ;
+    - mixed : un endpoint tiré à chaque requête selon MIXED_WEIGHTS ;
+    - ui-compare : la comparaison de l'interface Gradio, tous les endpoints en parallèle pour un utilisateur
+      (la latence mesurée est celle de la réponse la plus lente).
+
+Sans --url, l'API est lancée localement (uvicorn, ou serve.py si --workers > 1) puis arrêtée à la fin.
+Le cache des réponses avantage les utilisateurs fréquents : --api-env RESPONSE_CACHE_SIZE=0 le désactive.
+Avec --baseline, les écarts de débit et de p99 avec un rapport précédent sont affichés (avant / après).
+
+Usage (depuis le dossier api/) :
+    python benchmarks/load_test.py <fichier_ou_dossier_de_clics> [--url http://127.0.0.1:8005]
+                                   [--scenarios popularity,svd,mixed,ui-compare] [--concurrency 1,4,16,64]
+                                   [--duration 10] [--workers 1] [--api-env CLE=VALEUR] [--label apres]
+                                   [--baseline avant.json] [--output load_test_report.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+from functions.loader import load_clicks
+
+ENDPOINTS = {
+    "popularity": "/recommendation/popularity",
+    "item-based": "/recommendation/item-based",
+    "session-based": "/recommendation/session-based",
+    "covisitation": "/recommendation/covisitation",
+    "svd": "/recommendation/svd",
+    "als": "/recommendation/als",
+    "content-based": "/recommendation/content-based",
+    "hybrid": "/recommendation/hybrid",
+}
+# Part de chaque endpoint dans le trafic mixte
+MIXED_WEIGHTS = {
+    "svd": 0.2, "item-based": 0.15, "hybrid": 0.15, "covisitation": 0.15,
+    "session-based": 0.1, "als": 0.1, "content-based": 0.1, "popularity": 0.05,
+}
+SCENARIOS = tuple(ENDPOINTS) + ("batch", "mixed", "ui-compare")
+
+class UserSampler:
+    """
+    Tire des user_id selon la distribution du log de clics.
+
+    Args:
+        user_ids (np.ndarray): L'ID utilisateur de chaque clic.
+        unknown_fraction (float): La part de requêtes pour des utilisateurs absents du log.
+    """
+
+    def __init__(self, user_ids: np.ndarray, unknown_fraction: float = 0.05):
+        self.users, counts = np.unique(np.asarray(user_ids, dtype=np.int64), return_counts=True)
+        self.probabilities = counts / counts.sum()
+        self.unknown_fraction = unknown_fraction
+        self.first_unknown = int(self.users.max()) + 1 if len(self.users) else 0
+
+    def sample(self, rng: np.random.Generator, size: int = 1) -> np.ndarray:
+        users = rng.choice(self.users, size=size, p=self.probabilities)
+        unknown = rng.random(size) < self.unknown_fraction
+        users[unknown] = self.first_unknown + rng.integers(0, 1_000_000, size=unknown.sum())
+        return users
+
+def scenario_requests(scenario: str, sampler: UserSampler, rng: np.random.Generator, batch_size: int) -> list:
+    """
+    Returns:
+        list: Les requêtes (méthode, chemin, paramètres, corps JSON) d'une transaction du scénario,
+              envoyées en parallèle.
+    """
+    if scenario == "mixed":
+        names = list(MIXED_WEIGHTS)
+        weights = np.array([MIXED_WEIGHTS[name] for name in names])
+        scenario = names[rng.choice(len(names), p=weights / weights.sum())]
+    if scenario == "batch":
+        return [("POST", "/recommendation/svd/batch", None, {"user_ids": sampler.sample(rng, batch_size).tolist(), "top_n": 5})]
+
+    user_id = int(sampler.sample(rng)[0])
+
+    def request(name):
+        # L'endpoint de popularité ne dépend pas de l'utilisateur
+        return ("GET", ENDPOINTS[name], None if name == "popularity" else {"user_id": user_id}, None)
+
+    if scenario == "ui-compare":
+        return [request(name) for name in ENDPOINTS]
+    return [request(scenario)]
+
+async def send(client: httpx.AsyncClient, method: str, path: str, params: dict, body: dict):
+    """
+    Returns:
+        int | str: Le code HTTP, ou le nom de l'erreur réseau (ex. "ReadTimeout").
+    """
+    try:
+        response = await client.request(method, path, params=params, json=body)
+        return response.status_code
+    except httpx.HTTPError as error:
+        return type(error).__name__
+
+async def run_step(client: httpx.AsyncClient, scenario: str, sampler: UserSampler, concurrency: int,
+                   duration: float, warmup: float, batch_size: int, seed: int = 0) -> dict:
+    """
+    Joue un palier de concurrence : `concurrency` clients en boucle fermée pendant `warmup + duration` secondes,
+    seules les transactions commencées après l'échauffement étant mesurées.
+
+    Returns:
+        dict: Le nombre de transactions, le débit, les percentiles de latence, le taux d'erreur et les codes reçus.
+    """
+    latencies, failures, statuses = [], [], Counter()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def user(position):
+        rng = np.random.default_rng([seed, concurrency, position])
+        while (start := time.perf_counter()) < deadline:
+            requests = scenario_requests(scenario, sampler, rng, batch_size)
+            codes = await asyncio.gather(*(send(client, *request) for request in requests))
+            elapsed = time.perf_counter() - start
+            if start >= measure_from:
+                latencies.append(elapsed)
+                failures.append(any(not isinstance(code, int) or code >= 400 for code in codes))
+                statuses.update(str(code) for code in codes)
+
+    await asyncio.gather(*(user(position) for position in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "transactions": len(latencies),
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else 0.0,
+            "p95": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else 0.0,
+            "p99": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else 0.0,
+            "mean": float(latencies_ms.mean()) if len(latencies_ms) else 0.0,
+        },
+        "error_rate": float(np.mean(failures)) if failures else 0.0,
+        "statuses": dict(statuses),
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float):
+    # Le démarrage construit les index et entraîne les modèles : il peut prendre plusieurs minutes
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"L'API s'est arrêtée au démarrage (code {process.returncode})")
+        try:
+            if httpx.get(url + "/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"L'API n'a pas répondu sur {url} en {timeout:.0f} s")
+
+@contextmanager
+def local_api(workers: int, env: dict, startup_timeout: float):
+    """
+    Lance l'API sur un port libre de la machine et l'arrête en sortie.
+
+    Args:
+        workers (int): 1 pour un seul processus uvicorn, plus pour le mode multi-processus de serve.py.
+        env (dict): Variables d'environnement ajoutées à celles du processus (ex. CLICKS_PATH).
+        startup_timeout (float): Le délai maximal de démarrage, en secondes.
+
+    Returns:
+        str: L'URL de l'API.
+    """
+    port = free_port()
+    if workers > 1:
+        command = [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=API_DIR, env={**os.environ, **env})
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(url, process, startup_timeout)
+        yield url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+async def run_scenarios(url: str, sampler: UserSampler, scenarios: list, levels: list, args) -> list:
+    """
+    Joue chaque scénario sur la rampe de concurrence ; la rampe d'un scénario s'arrête dès que
+    son taux d'erreur dépasse --max-error-rate (l'API est alors saturée).
+    """
+    steps = []
+    # La comparaison de l'interface ouvre une connexion par endpoint et par client
+    connections = max(levels) * (len(ENDPOINTS) if "ui-compare" in scenarios else 1)
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        for scenario in scenarios:
+            for concurrency in levels:
+                step = await run_step(client, scenario, sampler, concurrency, args.duration, args.warmup, args.batch_size, args.seed)
+                steps.append(step)
+                latency = step["latency_ms"]
+                print(
+                    f"| {scenario} | {concurrency} | {step['transactions']:,} | {step['throughput_rps']:.1f} "
+                    f"| {latency['p50']:.1f} | {latency['p95']:.1f} | {latency['p99']:.1f} | {step['error_rate'] * 100:.2f} |",
+                    flush=True,
+                )
+                if step["error_rate"] > args.max_error_rate:
+                    break
+    return steps
+
+def print_comparison(steps: list, baseline_path: str):
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    previous = {(step["scenario"], step["concurrency"]): step for step in baseline["steps"]}
+    print(f"\nComparaison avec {baseline_path} ({baseline.get('label') or baseline['created_at']})\n")
+    print("| scénario | concurrence | req/s avant | req/s après | écart | p99 avant (ms) | p99 après (ms) | écart |")
+    print("|---|---:|---:|---:|---:|---:|---:|---:|")
+    for step in steps:
+        before = previous.get((step["scenario"], step["concurrency"]))
+        if before is None:
+            continue
+        rps_before, rps_after = before["throughput_rps"], step["throughput_rps"]
+        p99_before, p99_after = before["latency_ms"]["p99"], step["latency_ms"]["p99"]
+        print(
+            f"| {step['scenario']} | {step['concurrency']} | {rps_before:.1f} | {rps_after:.1f} "
+            f"| {(rps_after / rps_before - 1) * 100 if rps_before else 0.0:+.1f} % | {p99_before:.1f} | {p99_after:.1f} "
+            f"| {(p99_after / p99_before - 1) * 100 if p99_before else 0.0:+.1f} % |"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("clicks", help="Fichier CSV de clics ou dossier de fichiers horaires (distribution des user_id)")
+    parser.add_argument("--url", help="URL d'une API déjà lancée ; sinon l'API est lancée localement sur ces clics")
+    parser.add_argument("--scenarios", default="popularity,item-based,session-based,covisitation,svd,als,content-based,hybrid,batch,mixed,ui-compare")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Paliers de concurrence (clients simultanés)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée mesurée de chaque palier, en secondes")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Échauffement non mesuré avant chaque palier, en secondes")
+    parser.add_argument("--unknown-fraction", type=float, default=0.05, help="Part des requêtes pour des utilisateurs inconnus")
+    parser.add_argument("--batch-size", type=int, default=100, help="Nombre d'utilisateurs par requête du scénario batch")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Délai maximal d'une requête, en secondes")
+    parser.add_argument("--max-error-rate", type=float, default=0.5, help="Taux d'erreur qui arrête la rampe d'un scénario")
+    parser.add_argument("--workers", type=int, default=1, help="Processus de l'API lancée localement (serve.py au-delà de 1)")
+    parser.add_argument("--api-env", action="append", default=[], metavar="CLE=VALEUR", help="Variable d'environnement de l'API lancée localement")
+    parser.add_argument("--startup-timeout", type=float, default=900.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", help="Nom de la mesure dans le rapport (ex. avant, apres)")
+    parser.add_argument("--baseline", help="Rapport précédent à comparer (débit et p99)")
+    parser.add_argument("--output", default="load_test_report.json")
+    args = parser.parse_args()
+
+    scenarios = [scenario for scenario in args.scenarios.split(",") if scenario]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Scénarios inconnus : {', '.join(sorted(unknown))} (attendus : {', '.join(SCENARIOS)})")
+    levels = sorted(int(level) for level in args.concurrency.split(","))
+    api_env = dict(item.split("=", 1) for item in args.api_env)
+    api_env.setdefault("CLICKS_PATH", os.path.abspath(args.clicks))
+
+    sampler = UserSampler(load_clicks(args.clicks)['user_id'].to_numpy(), unknown_fraction=args.unknown_fraction)
+    print(f"{len(sampler.users):,} utilisateurs, {args.unknown_fraction:.0%} de requêtes pour des utilisateurs inconnus\n")
+
+    def run(url):
+        print(f"API : {url}\n")
+        print("| scénario | concurrence | transactions | req/s | p50 (ms) | p95 (ms) | p99 (ms) | erreurs (%) |")
+        print("|---|---:|---:|---:|---:|---:|---:|---:|")
+        return asyncio.run(run_scenarios(url, sampler, scenarios, levels, args))
+
+    if args.url:
+        url = args.url.rstrip("/")
+        steps = run(url)
+    else:
+        with local_api(args.workers, api_env, args.startup_timeout) as url:
+            steps = run(url)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "label": args.label,
+        "url": url,
+        "local_api": None if args.url else {"workers": args.workers, "env": api_env},
+        "clicks": os.path.abspath(args.clicks),
+        "users": len(sampler.users),
+        "unknown_fraction": args.unknown_fraction,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "steps": steps,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nRapport écrit dans {args.output}")
+    if args.baseline:
+        print_comparison(steps, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# functions/als.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+
+from functions.id_map import IdMap
+from functions.metrics import build_timer, record_fallback, stage
+from functions.interactions import InteractionMatrix
+from functions.popularity import PopularityIndex
+from functions.session_based import UserClickIndex
+from functions.ann import ArticleVectorIndex
+from functions.latent import best_articles, user_history
+
+# Nombre maximal de clics traités ensemble par un thread (borne la mémoire des tableaux clics x facteurs)
+CHUNK_NNZ = 65536
+
+@dataclass
+class ALSModel:
+    """
+    Modèle de moindres carrés alternés pour retours implicites (Hu, Koren et Volinsky, 2008).
+
+    Chaque clic est une préférence p = 1 de confiance c = 1 + alpha * nombre de clics ;
+    les couples non observés sont des préférences p = 0 de confiance 1, sans densifier la matrice.
+
+    Attributes:
+        user_ids (np.ndarray): IDs des utilisateurs, dans l'ordre des lignes de `user_factors`.
+        article_ids (np.ndarray): IDs des articles, dans l'ordre des lignes de `item_factors`.
+        user_factors (np.ndarray): Facteurs latents des utilisateurs.
+        item_factors (np.ndarray): Facteurs latents des articles.
+        regularization (float): Coefficient de régularisation L2 utilisé à l'entraînement.
+        alpha (float): Poids de la confiance accordée à chaque clic.
+        users (IdMap): Correspondance ID utilisateur <-> ligne de `user_factors`.
+        articles (IdMap): Correspondance ID article <-> ligne de `item_factors`.
+    """
+    user_ids: np.ndarray
+    article_ids: np.ndarray
+    user_factors: np.ndarray
+    item_factors: np.ndarray
+    regularization: float
+    alpha: float
+
+    FIELDS = ("user_ids", "article_ids", "user_factors", "item_factors", "regularization", "alpha")
+
+    def __post_init__(self):
+        self.regularization = float(self.regularization)
+        self.alpha = float(self.alpha)
+        self.users = IdMap(self.user_ids)
+        self.articles = IdMap(self.article_ids)
+        self.article_index = None
+        # Terme Yᵀ·Y commun à tous les utilisateurs, calculé une seule fois pour le fold-in
+        self.item_gram = np.asarray(self.item_factors).T @ np.asarray(self.item_factors)
+
+    def fold_in(self, article_ids: np.ndarray):
+        """
+        Calcule le vecteur latent d'un utilisateur absent de l'entraînement à partir de ses clics,
+        par une résolution exacte de son équation normale (les facteurs des articles restant fixes).
+
+        Args:
+            article_ids (np.ndarray): Les IDs des articles cliqués (un élément par clic).
+
+        Returns:
+            np.ndarray | None: Le vecteur latent, ou None si aucun article n'est connu du modèle.
+        """
+        columns = self.articles.rows(article_ids)
+        columns, counts = np.unique(columns[columns >= 0], return_counts=True)
+        if len(columns) == 0:
+            return None
+        factors = np.asarray(self.item_factors[columns], dtype=np.float64)
+        confidence = self.alpha * counts
+        A = self.item_gram + (factors.T * confidence) @ factors + self.regularization * np.eye(factors.shape[1])
+        b = (1.0 + confidence) @ factors
+        return np.linalg.solve(A, b)
+
+    def build_article_index(self, mode: str = "exact"):
+        """
+        Construit l'index de recherche par produit scalaire maximal sur les facteurs des articles.
+
+        Args:
+            mode (str): "exact" ou "approx" (HNSW).
+        """
+        self.article_index = ArticleVectorIndex(self.item_factors, mode=mode)
+
+    def save(self, directory: str):
+        """
+        Sauvegarde le modèle sous forme de fichiers `.npy` (un par tableau), mappables en mémoire.
+
+        Args:
+            directory (str): Le dossier de destination (créé s'il n'existe pas).
+        """
+        os.makedirs(directory, exist_ok=True)
+        for field in self.FIELDS:
+            np.save(os.path.join(directory, f"{field}.npy"), getattr(self, field))
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = "r"):
+        """
+        Charge un modèle sauvegardé avec `save`.
+
+        Args:
+            directory (str): Le dossier contenant les fichiers `.npy`.
+            mmap_mode (str): Mode de mapping mémoire passé à `np.load` (None pour tout charger).
+
+        Returns:
+            ALSModel: Le modèle chargé.
+        """
+        arrays = {field: np.load(os.path.join(directory, f"{field}.npy"), mmap_mode=mmap_mode) for field in cls.FIELDS}
+        return cls(**arrays)
+
+def _row_chunks(matrix: sparse.csr_matrix, chunk_nnz: int) -> list:
+    """
+    Découpe les lignes d'une matrice CSR en tranches contiguës d'environ `chunk_nnz` valeurs non nulles.
+
+    Returns:
+        list: Les couples (début, fin) des tranches.
+    """
+    boundaries = np.searchsorted(matrix.indptr, np.arange(chunk_nnz, matrix.nnz, chunk_nnz), side="right") - 1
+    boundaries = np.unique(np.concatenate([[0], boundaries, [matrix.shape[0]]]))
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def _segment_sum(values: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    """
+    Somme les lignes de `values` par segment CSR (une ligne de résultat par ligne de la matrice).
+    """
+    sums = np.zeros((len(indptr) - 1, values.shape[1]), dtype=values.dtype)
+    non_empty = np.diff(indptr) > 0
+    if non_empty.any():
+        sums[non_empty] = np.add.reduceat(values, indptr[:-1][non_empty], axis=0)
+    return sums
+
+def _conjugate_gradient_chunk(confidence: sparse.csr_matrix, fixed: np.ndarray, gram: np.ndarray, solution: np.ndarray, cg_steps: int):
+    """
+    Met à jour en place les vecteurs latents d'une tranche de lignes par quelques pas de gradient conjugué
+    sur (YᵀY + Yᵀ(Cᵤ - I)Y + λI) xᵤ = YᵀCᵤ pᵤ, sans former les matrices k x k de chaque ligne.
+
+    Args:
+        confidence (sparse.csr_matrix): La tranche de la matrice alpha * clics (lignes à mettre à jour).
+        fixed (np.ndarray): Les facteurs fixes de l'autre côté (Y).
+        gram (np.ndarray): YᵀY + λI.
+        solution (np.ndarray): Les vecteurs de la tranche, point de départ puis résultat.
+        cg_steps (int): Le nombre de pas de gradient conjugué.
+    """
+    indptr = confidence.indptr
+    rows = np.repeat(np.arange(confidence.shape[0]), np.diff(indptr))
+    neighbours = fixed[confidence.indices]
+    weights = confidence.data[:, None]
+
+    def apply(vectors):
+        # (YᵀY + λI) v + Σ c y (y · v), pour toutes les lignes de la tranche à la fois
+        projections = np.einsum("nk,nk->n", neighbours, vectors[rows])[:, None]
+        return vectors @ gram + _segment_sum(weights * projections * neighbours, indptr)
+
+    residual = _segment_sum((1.0 + weights) * neighbours, indptr) - apply(solution)
+    direction = residual.copy()
+    residual_norm = np.einsum("nk,nk->n", residual, residual)
+    for _ in range(cg_steps):
+        applied = apply(direction)
+        curvature = np.einsum("nk,nk->n", direction, applied)
+        step = np.divide(residual_norm, curvature, out=np.zeros_like(residual_norm), where=curvature > 1e-20)
+        solution += step[:, None] * direction
+        residual -= step[:, None] * applied
+        new_residual_norm = np.einsum("nk,nk->n", residual, residual)
+        ratio = np.divide(new_residual_norm, residual_norm, out=np.zeros_like(residual_norm), where=residual_norm > 1e-20)
+        direction = residual + ratio[:, None] * direction
+        residual_norm = new_residual_norm
+
+def _update_chunk(confidence, fixed, gram, solution, start, end, cg_steps):
+    # Chaque thread travaille sur une copie de sa tranche, recopiée en une seule écriture
+    chunk = solution[start:end].copy()
+    _conjugate_gradient_chunk(confidence[start:end], fixed, gram, chunk, cg_steps)
+    solution[start:end] = chunk
+
+def _least_squares(confidence: sparse.csr_matrix, solution: np.ndarray, fixed: np.ndarray, regularization: float, executor: ThreadPoolExecutor, cg_steps: int):
+    """
+    Met à jour en place toutes les lignes de `solution`, les tranches étant réparties sur le pool de threads.
+    """
+    gram = fixed.T @ fixed + regularization * np.eye(fixed.shape[1], dtype=fixed.dtype)
+    futures = [
+        executor.submit(_update_chunk, confidence, fixed, gram, solution, start, end, cg_steps)
+        for start, end in _row_chunks(confidence, CHUNK_NNZ)
+    ]
+    for future in futures:
+        future.result()
+
+def train_als_model(interaction_matrix: InteractionMatrix, factors: int = 50, regularization: float = 0.1, alpha: float = 40.0,
+                    iterations: int = 15, cg_steps: int = 3, n_threads: int = None, random_state: int = 0) -> ALSModel:
+    """
+    Entraîne un modèle ALS implicite sur la matrice de comptage des clics.
+
+    Chaque demi-itération résout les vecteurs d'un côté (utilisateurs puis articles), l'autre étant fixe,
+    par gradient conjugué démarré depuis la solution précédente. Les tranches de lignes sont traitées
+    en parallèle : les opérations NumPy sous-jacentes relâchent le GIL.
+
+    Args:
+        interaction_matrix (InteractionMatrix): La matrice d'interaction creuse utilisateur-article.
+        factors (int): Le nombre de facteurs latents.
+        regularization (float): Le coefficient de régularisation L2.
+        alpha (float): Le poids de la confiance accordée à chaque clic.
+        iterations (int): Le nombre d'itérations (utilisateurs puis articles).
+        cg_steps (int): Le nombre de pas de gradient conjugué par demi-itération.
+        n_threads (int): Le nombre de threads (par défaut, le nombre de coeurs).
+        random_state (int): La graine de l'initialisation aléatoire.
+
+    Returns:
+        ALSModel: Le modèle entraîné.
+    """
+    user_confidence = (interaction_matrix.counts * alpha).astype(np.float32).tocsr()
+    item_confidence = user_confidence.T.tocsr()
+    n_users, n_articles = user_confidence.shape
+
+    rng = np.random.default_rng(random_state)
+    user_factors = (rng.standard_normal((n_users, factors)) * 0.01).astype(np.float32)
+    item_factors = (rng.standard_normal((n_articles, factors)) * 0.01).astype(np.float32)
+
+    with build_timer("als"), ThreadPoolExecutor(max_workers=n_threads or os.cpu_count()) as executor:
+        for _ in range(iterations):
+            with stage("train_als_model", "user_factors"):
+                _least_squares(user_confidence, user_factors, item_factors, regularization, executor, cg_steps)
+            with stage("train_als_model", "item_factors"):
+                _least_squares(item_confidence, item_factors, user_factors, regularization, executor, cg_steps)
+
+    return ALSModel(
+        user_ids=interaction_matrix.user_ids,
+        article_ids=interaction_matrix.article_ids,
+        user_factors=user_factors,
+        item_factors=item_factors,
+        regularization=regularization,
+        alpha=alpha,
+    )
+
+def _latent_vector(user_id: int, model: ALSModel, history: np.ndarray):
+    """
+    Retourne le vecteur latent d'un utilisateur : sa ligne de `user_factors` s'il est connu du modèle,
+    sinon le fold-in de son historique de clics.
+    """
+    user_row = model.users.row(user_id)
+    if user_row is not None:
+        return model.user_factors[user_row]
+    return model.fold_in(history)
+
+def get_als_recommendations(user_id: int, popularity: PopularityIndex, model: ALSModel, top_n: int = 5, click_index: UserClickIndex = None, candidates=None):
+    """
+    Génère des recommandations ALS pour un utilisateur donné.
+
+    Args:
+        user_id (int): L'ID de l'utilisateur.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        model (ALSModel): Le modèle ALS entraîné.
+        top_n (int): Le nombre de recommandations à retourner.
+        click_index (UserClickIndex): L'index des historiques de clics, pour exclure les articles déjà
+                                      consultés et projeter (fold-in) les utilisateurs absents de l'entraînement.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Une liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    with stage("get_als_recommendations", "latent_vector"):
+        history = user_history(user_id, click_index)
+        user_vector = _latent_vector(user_id, model, history)
+    if user_vector is None:
+        # Si l'utilisateur est inconnu (et sans historique exploitable), retourner les articles populaires
+        record_fallback("als", "unknown_user")
+        return popularity.recommend(top_n, candidates)
+
+    with stage("get_als_recommendations", "search"):
+        recommended_article_ids, _ = best_articles(model.articles, model.item_factors, model.article_index, user_vector[None, :], [history], top_n, candidates)[0]
+    if len(recommended_article_ids) == 0:
+        record_fallback("als", "no_candidates")
+        return popularity.recommend(top_n, candidates)
+    with stage("get_als_recommendations", "describe"):
+        return popularity.describe(recommended_article_ids)
+
+def get_als_recommendations_batch(user_ids: list, popularity: PopularityIndex, model: ALSModel, top_n: int = 5, click_index: UserClickIndex = None, candidates=None):
+    """
+    Génère les recommandations ALS pour un lot d'utilisateurs : un seul produit
+    (facteurs des utilisateurs x facteurs des articles), puis un top-N par ligne.
+
+    Args:
+        user_ids (list): Les IDs des utilisateurs.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        model (ALSModel): Le modèle ALS entraîné.
+        top_n (int): Le nombre de recommandations par utilisateur.
+        click_index (UserClickIndex): L'index des historiques de clics (exclusion et fold-in).
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Pour chaque utilisateur, dans l'ordre, une liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    histories = [user_history(int(user_id), click_index) for user_id in user_ids]
+    user_rows = model.users.rows(user_ids)
+    scored = user_rows >= 0
+    user_vectors = np.zeros((len(user_rows), model.item_factors.shape[1]), dtype=np.float32)
+    user_vectors[scored] = model.user_factors[user_rows[scored]]
+    for position in np.flatnonzero(~scored):
+        folded = model.fold_in(histories[position])
+        if folded is not None:
+            user_vectors[position] = folded
+            scored[position] = True
+
+    scored_histories = [history for history, is_scored in zip(histories, scored) if is_scored]
+    best = iter(best_articles(model.articles, model.item_factors, model.article_index, user_vectors[scored], scored_histories, top_n, candidates))
+    # Les utilisateurs sans vecteur latent retombent sur la popularité
+    fallback = popularity.recommend(top_n, candidates)
+    recommendations = []
+    for is_scored in scored:
+        articles = next(best)[0] if is_scored else []
+        recommendations.append(popularity.describe(articles) if len(articles) else fallback)
+    return recommendations
@@ -0,0 +1,140 @@
+# functions/ann.py
+import numpy as np
+
+from functions.topn import top_n_indices_batch
+
+try:
+    import hnswlib
+except ImportError:  # Dépendance optionnelle : seul le mode exact est alors disponible
+    hnswlib = None
+
+SEARCH_MODES = ("exact", "approx")
+
+# Au-delà de cette taille, un ensemble d'articles éligibles est cherché dans le graphe HNSW puis filtré
+EXACT_SUBSET_LIMIT = 20_000
+
+def _isin_sorted(values: np.ndarray, sorted_values: np.ndarray) -> np.ndarray:
+    if len(sorted_values) == 0:
+        return np.zeros(values.shape, dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+class ArticleVectorIndex:
+    """
+    Recherche des articles de plus grand produit scalaire avec un vecteur requête.
+
+    En mode "exact", tous les scores sont calculés puis le top-N est extrait par `argpartition`.
+    En mode "approx", un graphe HNSW (hnswlib) est construit une fois et interrogé en temps sous-linéaire.
+
+    Args:
+        vectors (np.ndarray): Les vecteurs des articles (articles x dimensions).
+        mode (str): "exact" ou "approx".
+        ef_search (int): Taille de la liste de candidats HNSW à l'interrogation (précision / latence).
+        M (int): Nombre de liens par noeud du graphe HNSW.
+        ef_construction (int): Taille de la liste de candidats HNSW à la construction.
+    """
+
+    def __init__(self, vectors: np.ndarray, mode: str = "exact", ef_search: int = 64, M: int = 16, ef_construction: int = 200):
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Mode de recherche inconnu : {mode} (attendu : {', '.join(SEARCH_MODES)})")
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.mode = mode
+        self._hnsw = None
+        if mode == "approx":
+            if hnswlib is None:
+                raise ImportError("Le mode 'approx' nécessite hnswlib : pip install hnswlib")
+            # Réduction MIPS -> plus proche voisin euclidien : une coordonnée supplémentaire
+            # ramène tous les vecteurs à la même norme, sans changer l'ordre des produits scalaires
+            norms = np.linalg.norm(self.vectors, axis=1)
+            extra = np.sqrt(np.maximum(norms.max() ** 2 - norms ** 2, 0.0))
+            augmented = np.hstack([self.vectors, extra[:, None]]).astype(np.float32)
+            n_vectors, dimensions = augmented.shape
+            self._hnsw = hnswlib.Index(space="l2", dim=dimensions)
+            self._hnsw.init_index(max_elements=n_vectors, ef_construction=ef_construction, M=M)
+            self._hnsw.add_items(augmented, np.arange(n_vectors))
+            self._hnsw.set_ef(max(ef_search, 1))
+
+    def search_batch(self, queries: np.ndarray, top_n: int, rows: np.ndarray = None):
+        """
+        Args:
+            queries (np.ndarray): Les vecteurs requêtes (requêtes x dimensions).
+            top_n (int): Le nombre d'articles à retourner par requête.
+            rows (np.ndarray): Les seuls indices d'articles à considérer, triés (None : tous les articles).
+
+        Returns:
+            tuple: Les indices des articles (requêtes x top_n) et leurs produits scalaires,
+                   triés par score décroissant.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if rows is not None:
+            return self._search_rows(queries, top_n, np.asarray(rows, dtype=np.int64))
+        top_n = min(top_n, len(self.vectors))
+        if self._hnsw is not None:
+            self._hnsw.set_ef(max(self._hnsw.ef, top_n))
+            labels, _ = self._hnsw.knn_query(np.hstack([queries, np.zeros((len(queries), 1), dtype=np.float32)]), k=top_n)
+            labels = labels.astype(np.int64)
+            # Les produits scalaires des seuls candidats retenus sont recalculés exactement
+            scores = np.einsum("qd,qkd->qk", queries, self.vectors[labels])
+            order = np.argsort(-scores, axis=1)
+            return np.take_along_axis(labels, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+        scores = queries @ self.vectors.T
+        indices = np.array(top_n_indices_batch(scores, top_n)).reshape(len(queries), top_n)
+        return indices, np.take_along_axis(scores, indices, axis=1)
+
+    def _search_rows(self, queries: np.ndarray, top_n: int, rows: np.ndarray):
+        top_n = min(top_n, len(rows))
+        if self._hnsw is not None and len(rows) > EXACT_SUBSET_LIMIT:
+            # Ensemble large : le graphe est interrogé avec une marge proportionnelle à la part
+            # d'articles écartés, puis filtré ; la recherche exacte prend le relais s'il manque des candidats
+            k = min(len(self.vectors), 2 * top_n * -(-len(self.vectors) // len(rows)))
+            labels, scores = self.search_batch(queries, k)
+            eligible = _isin_sorted(labels, rows)
+            if np.all(eligible.sum(axis=1) >= top_n):
+                order = np.argsort(~eligible, axis=1, kind="stable")[:, :top_n]
+                return np.take_along_axis(labels, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+        if 2 * len(rows) <= len(self.vectors):
+            # Ensemble sélectif : seuls les vecteurs des articles éligibles sont scorés
+            scores = queries @ self.vectors[rows].T
+            indices = np.array(top_n_indices_batch(scores, top_n), dtype=np.int64).reshape(len(queries), top_n)
+            return rows[indices], np.take_along_axis(scores, indices, axis=1)
+
+        # Ensemble large : scorer tout le catalogue coûte moins que d'en extraire la majorité des vecteurs
+        scores = queries @ self.vectors.T
+        exclude = np.ones(len(self.vectors), dtype=bool)
+        exclude[rows] = False
+        indices = top_n_indices_batch(scores, top_n, np.broadcast_to(exclude, scores.shape))
+        indices = np.array(indices, dtype=np.int64).reshape(len(queries), top_n)
+        return indices, np.take_along_axis(scores, indices, axis=1)
+
+    def search(self, query: np.ndarray, top_n: int, rows: np.ndarray = None):
+        """
+        Args:
+            query (np.ndarray): Le vecteur requête.
+            top_n (int): Le nombre d'articles à retourner.
+            rows (np.ndarray): Les seuls indices d'articles à considérer, triés (None : tous les articles).
+
+        Returns:
+            tuple: Les indices des articles et leurs produits scalaires, triés par score décroissant.
+        """
+        indices, scores = self.search_batch(query[None, :], top_n, rows)
+        return indices[0], scores[0]
+
+def recall_at_n(index: ArticleVectorIndex, queries: np.ndarray, top_n: int = 10) -> float:
+    """
+    Mesure le rappel@N de l'index par rapport à la recherche exacte.
+
+    Args:
+        index (ArticleVectorIndex): L'index à évaluer.
+        queries (np.ndarray): Un échantillon de vecteurs requêtes.
+        top_n (int): La taille des listes comparées.
+
+    Returns:
+        float: La part moyenne des `top_n` articles exacts retrouvés par l'index.
+    """
+    exact = ArticleVectorIndex(index.vectors, mode="exact")
+    expected, _ = exact.search_batch(queries, top_n)
+    found, _ = index.search_batch(queries, top_n)
+    hits = [len(np.intersect1d(expected_row, found_row)) for expected_row, found_row in zip(expected, found)]
+    return float(np.sum(hits) / expected.size) if expected.size else 1.0
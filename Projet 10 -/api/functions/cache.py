@@ -0,0 +1,162 @@
+# functions/cache.py
+import json
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # Dépendance optionnelle : sans redis, seul le cache en mémoire est disponible
+    redis = None
+
+class RedisBackend:
+    """
+    Stockage partagé entre workers sur un serveur compatible Redis ; l'expiration est confiée au serveur.
+
+    Args:
+        url (str): L'URL du serveur (ex. redis://localhost:6379/0).
+        prefix (str): Le préfixe des clés écrites.
+    """
+
+    def __init__(self, url: str, prefix: str = "reco:"):
+        if redis is None:
+            raise ImportError("Le cache partagé nécessite redis : pip install redis")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value, ttl_seconds: float):
+        self.client.set(self.prefix + key, json.dumps(value), px=max(int(ttl_seconds * 1000), 1))
+
+class ResponseCache:
+    """
+    Cache borné (LRU) à durée de vie (TTL) des réponses de recommandation.
+
+    Les clés sont des tuples (algorithme, user_id, top_n, ...) ; chaque entrée garde la version des données
+    avec lesquelles elle a été calculée (versions des modèles, des index, du stockage de clics). Chaque
+    endpoint a sa propre version : une entrée dont la version ne correspond plus est un échec et est
+    supprimée à la lecture, les autres entrées restent valides. Les entrées périmées jamais relues
+    sortent par LRU ou TTL ; dans le stockage partagé, la version fait partie de la clé et elles expirent
+    d'elles-mêmes.
+
+    Args:
+        max_size (int): Le nombre maximal d'entrées gardées en mémoire.
+        ttl_seconds (float): La durée de vie d'une entrée, en secondes.
+        backend (RedisBackend): Stockage partagé optionnel, interrogé après le cache local.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl_seconds: float = 60.0, backend: RedisBackend = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.evictions = self.expirations = self.backend_errors = 0
+
+    def get(self, key: tuple, version):
+        """
+        Args:
+            key (tuple): La clé de la réponse.
+            version: La version des données servies.
+
+        Returns:
+            La réponse en cache, ou None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_version, value = entry
+                if entry_version != version:
+                    # Calculée sur des données déjà remplacées
+                    del self._entries[key]
+                elif expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                else:
+                    del self._entries[key]
+                    self.expirations += 1
+
+        if self.backend is not None:
+            try:
+                value = self.backend.get(json.dumps([key, version], default=str))
+            except Exception:
+                value = None
+                with self._lock:
+                    self.backend_errors += 1
+            if value is not None:
+                self._store(key, version, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store(self, key: tuple, version, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set(self, key: tuple, version, value):
+        """
+        Args:
+            key (tuple): La clé de la réponse.
+            version: La version des données avec lesquelles la réponse a été calculée.
+            value: La réponse (sérialisable en JSON).
+        """
+        self._store(key, version, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(json.dumps([key, version], default=str), value, self.ttl_seconds)
+            except Exception:
+                with self._lock:
+                    self.backend_errors += 1
+
+    def get_or_compute(self, key: tuple, version, compute):
+        """
+        Args:
+            key (tuple): La clé de la réponse.
+            version: La version des données servies.
+            compute (callable): Calcule la réponse en cas d'absence.
+
+        Returns:
+            La réponse, en cache ou calculée.
+        """
+        value = self.get(key, version)
+        if value is None:
+            value = compute()
+            self.set(key, version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Les compteurs du cache (succès, échecs, évictions, expirations) et son taux de succès.
+        """
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis" if self.backend is not None else "memory",
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "backend_errors": self.backend_errors,
+        }
@@ -0,0 +1,237 @@
+# functions/candidates.py
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from functions.id_map import IdMap
+
+METADATA_DTYPES = {
+    'article_id': 'int32',
+    'category_id': 'int32',
+    'created_at_ts': 'int64',
+    'publisher_id': 'int32',
+    'words_count': 'int32',
+}
+
+def load_article_metadata(path: str) -> pd.DataFrame:
+    """
+    Args:
+        path (str): Le fichier `articles_metadata.csv`.
+
+    Returns:
+        pd.DataFrame: Les métadonnées des articles (ID, catégorie, date de création, nombre de mots), typées.
+    """
+    return pd.read_csv(path, usecols=['article_id', 'category_id', 'created_at_ts', 'words_count'], dtype=METADATA_DTYPES)
+
+class CandidateSet:
+    """
+    Ensemble des articles qu'un moteur a le droit de scorer.
+
+    Attributes:
+        mask (np.ndarray): Bitmap des articles éligibles (tableau booléen indexé par ID d'article).
+        ids (np.ndarray): Les IDs des articles éligibles, triés.
+        key (tuple): Identifie l'ensemble (génération de l'index, filtres appliqués et instant de référence
+                     de la fraîcheur).
+    """
+
+    def __init__(self, mask: np.ndarray, key: tuple):
+        self.mask = mask
+        self.ids = np.flatnonzero(mask)
+        self.key = key
+        self._lock = threading.Lock()
+        # Positions des articles éligibles dans l'IdMap de chaque modèle, calculées une fois par modèle
+        self._columns = weakref.WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def contains(self, article_ids) -> np.ndarray:
+        """
+        Args:
+            article_ids: Des IDs d'articles.
+
+        Returns:
+            np.ndarray: Pour chaque ID, True s'il est éligible (False pour un article sans métadonnées).
+        """
+        article_ids = np.asarray(article_ids, dtype=np.int64)
+        known = (article_ids >= 0) & (article_ids < len(self.mask))
+        return known & self.mask[np.where(known, article_ids, 0)]
+
+    def columns(self, id_map: IdMap) -> np.ndarray:
+        """
+        Args:
+            id_map (IdMap): La correspondance ID article <-> colonne d'un modèle.
+
+        Returns:
+            np.ndarray: Les colonnes (triées) des articles éligibles connus du modèle.
+        """
+        with self._lock:
+            columns = self._columns.get(id_map)
+        if columns is None:
+            columns = id_map.rows(self.ids)
+            columns = columns[columns >= 0]
+            with self._lock:
+                self._columns[id_map] = columns
+        return columns
+
+    def rows(self, n_rows: int) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Les IDs éligibles inférieurs à `n_rows`, pour un index dont la ligne est l'ID d'article.
+        """
+        return self.ids[:np.searchsorted(self.ids, n_rows)]
+
+class CandidateIndex:
+    """
+    Génération des candidats à partir des métadonnées des articles (date de création, catégorie, nombre de mots).
+
+    L'ensemble de base des articles éligibles (assez récents et assez longs) est recalculé par `refresh`,
+    à intervalle régulier ; sa génération n'augmente que s'il a changé. Les filtres d'une requête
+    (`max_age_hours`, `category_id`) se résolvent par des bitmaps : celui d'une catégorie est précalculé
+    à la première demande, celui de fraîcheur est une tranche des articles triés par date de création ;
+    les deux sont combinés au bitmap de base par un ET logique, et les ensembles résolus sont gardés
+    en cache (LRU) par génération et, pour la fraîcheur, par instant de référence.
+
+    Args:
+        metadata (pd.DataFrame): Les métadonnées (voir `load_article_metadata`).
+        max_age_hours (float): L'âge maximal d'un article éligible (None : pas de limite).
+        min_words (int): Le nombre minimal de mots d'un article éligible.
+        cache_size (int): Le nombre d'ensembles filtrés gardés en cache.
+    """
+
+    def __init__(self, metadata: pd.DataFrame, max_age_hours: float = None, min_words: int = 0, cache_size: int = 256):
+        self.max_age_hours = max_age_hours
+        self.min_words = min_words
+        self.cache_size = cache_size
+
+        article_ids = metadata['article_id'].to_numpy(dtype=np.int64)
+        created_at = metadata['created_at_ts'].to_numpy(dtype=np.int64)
+        categories = metadata['category_id'].to_numpy(dtype=np.int64)
+        n_articles = int(article_ids.max()) + 1 if len(article_ids) else 0
+        self.known = np.zeros(n_articles, dtype=bool)
+        self.known[article_ids] = True
+        self.words = np.zeros(n_articles, dtype=np.int64)
+        self.words[article_ids] = metadata['words_count'].to_numpy(dtype=np.int64)
+
+        # Index de fraîcheur : les IDs triés par date de création
+        creation_order = np.argsort(created_at, kind="stable")
+        self._by_creation = article_ids[creation_order]
+        self._creation_times = created_at[creation_order]
+
+        # Index par catégorie (format CSR) : les IDs de chaque catégorie forment une tranche contiguë
+        category_order = np.lexsort((article_ids, categories))
+        self._category_ids, starts = np.unique(categories[category_order], return_index=True)
+        self._category_offsets = np.append(starts, len(category_order))
+        self._category_articles = article_ids[category_order]
+        self._category_bitmaps = {}
+
+        self._lock = threading.Lock()
+        self._resolved = OrderedDict()
+        self.generation = 0
+        self.reference_ms = int(created_at.max()) if len(created_at) else 0
+        self.eligible = None
+        self.refresh()
+
+    def _bitmap(self, article_ids: np.ndarray) -> np.ndarray:
+        bitmap = np.zeros(len(self.known), dtype=bool)
+        bitmap[article_ids] = True
+        return bitmap
+
+    def category_bitmap(self, category_id: int) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Le bitmap des articles de la catégorie (vide si elle est inconnue).
+        """
+        bitmap = self._category_bitmaps.get(category_id)
+        if bitmap is None:
+            position = np.searchsorted(self._category_ids, category_id)
+            if position < len(self._category_ids) and self._category_ids[position] == category_id:
+                start, end = self._category_offsets[position], self._category_offsets[position + 1]
+                bitmap = self._bitmap(self._category_articles[start:end])
+            else:
+                bitmap = np.zeros(len(self.known), dtype=bool)
+            bitmap = self._category_bitmaps.setdefault(category_id, bitmap)
+        return bitmap
+
+    def freshness_bitmap(self, max_age_hours: float, reference_ms: int = None) -> np.ndarray:
+        """
+        Args:
+            max_age_hours (float): L'âge maximal, en heures.
+            reference_ms (int): L'instant de référence (par défaut celui du dernier `refresh`).
+
+        Returns:
+            np.ndarray: Le bitmap des articles créés depuis moins de `max_age_hours`.
+        """
+        reference_ms = self.reference_ms if reference_ms is None else reference_ms
+        cutoff = reference_ms - max_age_hours * 3_600_000
+        return self._bitmap(self._by_creation[np.searchsorted(self._creation_times, cutoff, side="left"):])
+
+    def refresh(self, reference_ms: int = None) -> CandidateSet:
+        """
+        Recalcule l'ensemble de base des articles éligibles. La génération (et le cache des ensembles
+        filtrés) ne change que si l'ensemble a changé.
+
+        Args:
+            reference_ms (int): L'instant de référence de la fraîcheur, en millisecondes
+                                (ex. l'horodatage du dernier clic reçu).
+
+        Returns:
+            CandidateSet: Le nouvel ensemble de base.
+        """
+        if reference_ms is not None:
+            self.reference_ms = int(reference_ms)
+        eligible = self.known & (self.words >= self.min_words)
+        if self.max_age_hours is not None:
+            eligible &= self.freshness_bitmap(self.max_age_hours)
+        with self._lock:
+            if self.eligible is None or not np.array_equal(eligible, self.eligible.mask):
+                self.generation += 1
+                self.eligible = CandidateSet(eligible, key=(self.generation, None, None, None))
+                self._resolved.clear()
+        return self.eligible
+
+    def version(self, max_age_hours: float = None) -> tuple:
+        """
+        Args:
+            max_age_hours (float): Filtre de fraîcheur de la requête.
+
+        Returns:
+            tuple: Ce dont dépend l'ensemble résolu pour ce filtre : la génération et, pour un filtre
+                   de fraîcheur, l'instant de référence.
+        """
+        return (self.generation, self.reference_ms if max_age_hours is not None else None)
+
+    def resolve(self, max_age_hours: float = None, category_id: int = None) -> CandidateSet:
+        """
+        Args:
+            max_age_hours (float): Filtre de fraîcheur de la requête.
+            category_id (int): Filtre de catégorie de la requête.
+
+        Returns:
+            CandidateSet: Les articles éligibles qui passent les filtres.
+        """
+        eligible, reference_ms = self.eligible, self.reference_ms
+        if max_age_hours is None and category_id is None:
+            return eligible
+        key = (eligible.key[0], max_age_hours, category_id, reference_ms if max_age_hours is not None else None)
+        with self._lock:
+            candidates = self._resolved.get(key)
+            if candidates is not None:
+                self._resolved.move_to_end(key)
+                return candidates
+
+        mask = eligible.mask
+        if max_age_hours is not None:
+            mask = mask & self.freshness_bitmap(max_age_hours, reference_ms)
+        if category_id is not None:
+            mask = mask & self.category_bitmap(category_id)
+        candidates = CandidateSet(mask, key=key)
+        with self._lock:
+            if key[0] == self.generation:
+                self._resolved[key] = candidates
+                while len(self._resolved) > self.cache_size:
+                    self._resolved.popitem(last=False)
+        return candidates
@@ -0,0 +1,179 @@
+# functions/content_based.py
+import os
+import pickle
+
+import numpy as np
+
+from functions.ann import ArticleVectorIndex
+from functions.item_based import recency_weights
+from functions.metrics import record_fallback, stage
+from functions.popularity import PopularityIndex
+from functions.session_based import UserClickIndex
+
+def default_embeddings_cache_path(path: str) -> str:
+    """
+    Args:
+        path (str): Le fichier `articles_embeddings.pickle`.
+
+    Returns:
+        str: L'emplacement du fichier `.npy` converti.
+    """
+    return os.path.splitext(path)[0] + '.npy'
+
+def convert_embeddings(pickle_path: str, npy_path: str) -> str:
+    """
+    Convertit les embeddings des articles (pickle) en un fichier `.npy` float32 de vecteurs normés.
+
+    Les vecteurs sont normés une fois pour toutes : le produit scalaire avec un profil est alors
+    une similarité cosinus, et le fichier peut être mappé en mémoire tel quel, sans copie.
+
+    Args:
+        pickle_path (str): Le fichier `articles_embeddings.pickle` (articles x dimensions).
+        npy_path (str): Le fichier `.npy` à écrire.
+
+    Returns:
+        str: Le chemin du fichier `.npy`.
+    """
+    with open(pickle_path, 'rb') as file:
+        embeddings = np.asarray(pickle.load(file), dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.where(norms > 0, norms, 1.0)
+    tmp_path = npy_path + '.tmp.npy'
+    np.save(tmp_path, embeddings)
+    os.replace(tmp_path, npy_path)
+    return npy_path
+
+def load_article_embeddings(path: str, cache_path: str = None) -> np.ndarray:
+    """
+    Charge les embeddings des articles en mémoire partagée.
+
+    Le pickle n'est lu qu'à la première utilisation (ou s'il est plus récent que sa conversion) ;
+    ensuite, le `.npy` est mappé en lecture seule : les pages sont partagées par le cache du système
+    entre tous les workers uvicorn au lieu d'être copiées dans le tas de chacun.
+
+    Args:
+        path (str): Le fichier `articles_embeddings.pickle`, ou directement un `.npy` converti.
+        cache_path (str): L'emplacement du `.npy` converti (par défaut à côté du pickle).
+
+    Returns:
+        np.ndarray: Les embeddings normés (articles x dimensions), mappés en mémoire.
+    """
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    cache_path = cache_path or default_embeddings_cache_path(path)
+    if not os.path.exists(cache_path) or os.path.getmtime(cache_path) < os.path.getmtime(path):
+        convert_embeddings(path, cache_path)
+    return np.load(cache_path, mmap_mode='r')
+
+class ContentIndex:
+    """
+    Index de recherche sur les embeddings des articles ; l'ID d'un article est sa ligne dans les embeddings.
+
+    Args:
+        embeddings (np.ndarray): Les embeddings normés (voir `load_article_embeddings`).
+        mode (str): "exact" ou "approx" (HNSW), comme pour les facteurs SVD.
+    """
+
+    def __init__(self, embeddings: np.ndarray, mode: str = "exact"):
+        self.embeddings = embeddings
+        self.article_index = ArticleVectorIndex(embeddings, mode=mode)
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def known_articles(self, article_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Les IDs d'articles qui ont un embedding.
+        """
+        article_ids = np.asarray(article_ids, dtype=np.int64)
+        return article_ids[(article_ids >= 0) & (article_ids < len(self.embeddings))]
+
+def user_profile(history: tuple, content_index: ContentIndex, recency_half_life_hours: float = None):
+    """
+    Construit le profil d'un utilisateur : la moyenne (pondérée par la récence) des embeddings des articles cliqués.
+
+    Args:
+        history (tuple): Les articles cliqués et leurs horodatages (voir `UserClickIndex.history`).
+        content_index (ContentIndex): L'index des embeddings.
+        recency_half_life_hours (float): Demi-vie (en heures) du poids de chaque clic ;
+                                         None pour donner le même poids à tous les clics.
+
+    Returns:
+        np.ndarray | None: Le profil, ou None si aucun article cliqué n'a d'embedding.
+    """
+    articles, timestamps = history
+    known = (articles >= 0) & (articles < len(content_index))
+    if not known.any():
+        return None
+    articles, timestamps = articles[known], timestamps[known]
+    if recency_half_life_hours is None:
+        weights = np.ones(len(articles), dtype=np.float32)
+    else:
+        weights = recency_weights(timestamps, recency_half_life_hours).astype(np.float32)
+    # Une seule lecture groupée des lignes mappées, puis une moyenne pondérée
+    return weights @ content_index.embeddings[articles] / weights.sum()
+
+def _best_articles(content_index: ContentIndex, profiles: np.ndarray, seen_articles: list, top_n: int, candidates=None) -> list:
+    # Les articles déjà consultés, les plus proches du profil par construction, sont exclus
+    extra = max((len(seen) for seen in seen_articles), default=0)
+    rows = None if candidates is None else candidates.rows(len(content_index))
+    best_indices, _ = content_index.article_index.search_batch(profiles, top_n + extra, rows=rows)
+    return [row[~np.isin(row, seen)][:top_n] for row, seen in zip(best_indices, seen_articles)]
+
+def get_content_based_recommendations(user_id: int, content_index: ContentIndex, click_index: UserClickIndex, popularity: PopularityIndex, top_n: int = 5, recency_half_life_hours: float = None, candidates=None):
+    """
+    Génère des recommandations basées sur le contenu : les articles dont l'embedding est le plus proche
+    du profil de l'utilisateur.
+
+    Args:
+        user_id (int): L'ID de l'utilisateur.
+        content_index (ContentIndex): L'index des embeddings des articles.
+        click_index (UserClickIndex): L'index des historiques de clics.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        top_n (int): Le nombre de recommandations à retourner.
+        recency_half_life_hours (float): Demi-vie (en heures) du poids des clics dans le profil.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Une liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    return get_content_based_recommendations_batch([user_id], content_index, click_index, popularity, top_n, recency_half_life_hours, candidates)[0]
+
+def get_content_based_recommendations_batch(user_ids: list, content_index: ContentIndex, click_index: UserClickIndex, popularity: PopularityIndex, top_n: int = 5, recency_half_life_hours: float = None, candidates=None):
+    """
+    Génère les recommandations basées sur le contenu pour un lot d'utilisateurs, avec une seule recherche
+    pour tous les profils du lot.
+
+    Args:
+        user_ids (list): Les IDs des utilisateurs.
+        content_index (ContentIndex): L'index des embeddings des articles.
+        click_index (UserClickIndex): L'index des historiques de clics.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        top_n (int): Le nombre de recommandations par utilisateur.
+        recency_half_life_hours (float): Demi-vie (en heures) du poids des clics dans le profil.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Pour chaque utilisateur, dans l'ordre, une liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    with stage("get_content_based_recommendations", "profiles"):
+        histories = [click_index.history(int(user_id)) for user_id in user_ids]
+        profiles = [user_profile(history, content_index, recency_half_life_hours) for history in histories]
+        scored = [profile is not None for profile in profiles]
+
+    best_articles = iter([])
+    if any(scored):
+        with stage("get_content_based_recommendations", "search"):
+            seen_articles = [np.unique(content_index.known_articles(history[0])) for history, is_scored in zip(histories, scored) if is_scored]
+            best_articles = iter(_best_articles(content_index, np.stack([profile for profile in profiles if profile is not None]), seen_articles, top_n, candidates))
+
+    # Les utilisateurs sans historique exploitable retombent sur la popularité
+    record_fallback("content-based", "no_profile", count=scored.count(False))
+    with stage("get_content_based_recommendations", "describe"):
+        fallback = popularity.recommend(top_n, candidates)
+        recommendations = []
+        for is_scored in scored:
+            articles = next(best_articles) if is_scored else []
+            recommendations.append(popularity.describe(articles) if len(articles) else fallback)
+    return recommendations
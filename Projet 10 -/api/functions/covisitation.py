@@ -0,0 +1,261 @@
+# functions/covisitation.py
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from functions.item_based import _keep_top_k_per_row
+from functions.loader import list_click_files, read_click_csv
+from functions.metrics import MATRIX_NNZ, build_timer, record_fallback, stage
+from functions.popularity import PopularityIndex
+from functions.session_based import UserClickIndex
+
+@dataclass
+class CovisitationIndex:
+    """
+    Index de co-visitation : pour chaque article, les articles consultés juste après lui dans une même session.
+
+    Les lignes et colonnes de `neighbours` sont directement les IDs d'articles ; seuls les `top_k`
+    voisins les plus fréquents de chaque article sont gardés.
+
+    Attributes:
+        neighbours (sparse.csr_matrix): Poids de co-visitation article -> article suivant (articles x articles).
+    """
+    neighbours: sparse.csr_matrix
+
+    @property
+    def empty(self) -> bool:
+        return self.neighbours.nnz == 0
+
+    def next_articles(self, recent_articles: np.ndarray, top_n: int, recency_decay: float = 0.7, exclude: np.ndarray = None, candidates=None):
+        """
+        Prédit les prochains articles à partir des derniers clics, sans passer par une multiplication creuse :
+        les listes de voisins des derniers articles sont lues directement dans `indices` / `data`.
+
+        Args:
+            recent_articles (np.ndarray): Les derniers articles cliqués, du plus ancien au plus récent.
+            top_n (int): Le nombre d'articles à retourner.
+            recency_decay (float): Facteur appliqué au poids de chaque clic à mesure qu'il s'éloigne du dernier.
+            exclude (np.ndarray): Articles à écarter (ex. l'historique de l'utilisateur).
+            candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+        Returns:
+            np.ndarray: Les IDs des articles prédits, du plus probable au moins probable.
+        """
+        neighbours = self.neighbours
+        recent_articles = np.asarray(recent_articles, dtype=np.int64)
+        recent_articles = recent_articles[(recent_articles >= 0) & (recent_articles < neighbours.shape[0])]
+        if len(recent_articles) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        starts, ends = neighbours.indptr[recent_articles], neighbours.indptr[recent_articles + 1]
+        lengths = ends - starts
+        if lengths.sum() == 0:
+            return np.empty(0, dtype=np.int64)
+        positions = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+        # Le dernier clic a un poids de 1, le précédent `recency_decay`, etc.
+        click_weights = np.repeat(recency_decay ** np.arange(len(recent_articles) - 1, -1, -1), lengths)
+        next_ids, inverse = np.unique(neighbours.indices[positions], return_inverse=True)
+        scores = np.bincount(inverse, weights=neighbours.data[positions] * click_weights)
+
+        # Les voisins étant triés, l'exclusion se fait par recherche dichotomique (moins coûteux que np.isin)
+        exclude = recent_articles if exclude is None else np.asarray(exclude, dtype=np.int64)
+        found = np.minimum(np.searchsorted(next_ids, exclude), len(next_ids) - 1)
+        scores[found[next_ids[found] == exclude]] = -np.inf
+        if candidates is not None:
+            scores[~candidates.contains(next_ids)] = -np.inf
+        # Quelques centaines de voisins au plus : un tri complet est plus rapide qu'argpartition ici
+        best = np.argsort(-scores, kind="stable")[:top_n]
+        return next_ids[best[np.isfinite(scores[best])]].astype(np.int64)
+
+def _linked_pairs(clicks: pd.DataFrame, max_gap_minutes: float, half_life_minutes: float, segments: np.ndarray = None):
+    """
+    Retourne les couples de clics consécutifs d'une même session (article source, article suivant, poids).
+
+    Args:
+        segments (np.ndarray): Numéro de fichier de chaque clic ; s'il est donné, seuls les couples
+                               à cheval sur deux fichiers sont retournés.
+    """
+    sessions = clicks['session_id'].to_numpy(dtype=np.int64)
+    timestamps = clicks['click_timestamp'].to_numpy(dtype=np.int64)
+    articles = clicks['click_article_id'].to_numpy(dtype=np.int64)
+
+    order = np.lexsort((timestamps, sessions))
+    sessions, timestamps, articles = sessions[order], timestamps[order], articles[order]
+    gap_minutes = np.diff(timestamps) / 60_000
+    linked = (sessions[1:] == sessions[:-1]) & (gap_minutes <= max_gap_minutes) & (articles[1:] != articles[:-1])
+    if segments is not None:
+        segments = segments[order]
+        linked &= segments[1:] != segments[:-1]
+    return articles[:-1][linked], articles[1:][linked], np.power(0.5, gap_minutes[linked] / half_life_minutes)
+
+def _pairs_matrix(sources: np.ndarray, targets: np.ndarray, weights: np.ndarray, n_articles: int, backward_weight: float) -> sparse.csr_matrix:
+    counts = sparse.csr_matrix(
+        (np.concatenate([weights, backward_weight * weights]), (np.concatenate([sources, targets]), np.concatenate([targets, sources]))),
+        shape=(n_articles, n_articles),
+    )
+    counts.sum_duplicates()
+    return counts
+
+def covisitation_counts(clicks: pd.DataFrame, n_articles: int = None, max_gap_minutes: float = 60.0, half_life_minutes: float = 10.0, backward_weight: float = 0.5) -> sparse.csr_matrix:
+    """
+    Compte les co-visitations entre clics consécutifs d'une même session, pondérées par l'écart de temps.
+
+    Deux clics consécutifs (a puis b) écartés de `gap` minutes ajoutent 0.5 ** (gap / half_life_minutes)
+    au poids a -> b, et `backward_weight` fois ce poids à b -> a. Au-delà de `max_gap_minutes`,
+    les deux clics ne sont pas considérés comme liés.
+
+    Args:
+        clicks (pd.DataFrame): Les clics, avec 'session_id', 'click_timestamp' et 'click_article_id'.
+        n_articles (int): La taille de la matrice (par défaut, le plus grand ID d'article + 1).
+        max_gap_minutes (float): L'écart maximal entre deux clics liés.
+        half_life_minutes (float): La demi-vie du poids en fonction de l'écart.
+        backward_weight (float): Le poids relatif du sens inverse (b -> a).
+
+    Returns:
+        sparse.csr_matrix: La matrice des poids de co-visitation (articles x articles).
+    """
+    clicks = clicks.dropna(subset=['session_id', 'click_article_id'])
+    if n_articles is None:
+        n_articles = int(clicks['click_article_id'].max()) + 1 if len(clicks) else 0
+    sources, targets, weights = _linked_pairs(clicks, max_gap_minutes, half_life_minutes)
+    return _pairs_matrix(sources, targets, weights, n_articles, backward_weight)
+
+def build_covisitation_index(clicks: pd.DataFrame, top_k: int = 50, **weighting) -> CovisitationIndex:
+    """
+    Construit l'index de co-visitation à partir d'un DataFrame de clics.
+
+    Args:
+        clicks (pd.DataFrame): Les clics.
+        top_k (int): Le nombre de voisins gardés par article.
+        **weighting: Paramètres de pondération passés à `covisitation_counts`.
+
+    Returns:
+        CovisitationIndex: L'index prêt à être interrogé.
+    """
+    with build_timer("covisitation"):
+        with stage("build_covisitation_index", "counts"):
+            counts = covisitation_counts(clicks, **weighting)
+        with stage("build_covisitation_index", "top_k"):
+            neighbours = _keep_top_k_per_row(counts, top_k)
+    MATRIX_NNZ.set(neighbours.nnz, matrix="covisitation")
+    return CovisitationIndex(neighbours=neighbours)
+
+def _session_boundaries(clicks: pd.DataFrame) -> pd.DataFrame:
+    # Premier et dernier clic de chaque session : les seuls qui peuvent être liés à un autre fichier
+    clicks = clicks.sort_values(['session_id', 'click_timestamp'], kind='stable')
+    grouped = clicks.groupby('session_id', sort=False)
+    boundaries = grouped.head(1).index.union(grouped.tail(1).index)
+    return clicks.loc[boundaries, ['session_id', 'click_timestamp', 'click_article_id']]
+
+def _file_covisitation_counts(file: str, weighting: dict):
+    # Exécuté dans un processus du pool : lecture et comptage d'un fichier horaire
+    clicks = read_click_csv([file]).dropna(subset=['session_id'])
+    return covisitation_counts(clicks, **weighting), _session_boundaries(clicks)
+
+def build_covisitation_index_from_files(path: str, top_k: int = 50, max_workers: int = None, max_gap_minutes: float = 60.0,
+                                        half_life_minutes: float = 10.0, backward_weight: float = 0.5, mp_context=None) -> CovisitationIndex:
+    """
+    Construit l'index de co-visitation fichier horaire par fichier horaire, en parallèle.
+
+    Chaque processus lit un fichier et compte ses co-visitations ; les matrices partielles sont ensuite
+    additionnées puis élaguées. Les sessions à cheval sur deux fichiers sont recousues à partir du premier
+    et du dernier clic de chaque session dans chaque fichier.
+
+    Les processus sont lancés en "spawn" par défaut : ils partent d'un interpréteur neuf, sans hériter
+    des threads ni des verrous de l'appelant (l'API construit ses index au chargement du module et
+    pendant `/reload`, alors que des threads tournent), quelle que soit la méthode par défaut de la plateforme.
+    Appelée depuis un processus du pool (module principal réimporté par un processus lancé en "spawn"
+    ou "forkserver"), la construction se fait dans le processus courant, sans lancer de pool imbriqué.
+
+    Args:
+        path (str): Un dossier de fichiers horaires `clicks_*.csv` (ou un fichier unique).
+        top_k (int): Le nombre de voisins gardés par article.
+        max_workers (int): Le nombre de processus (par défaut, le nombre de coeurs).
+        max_gap_minutes (float): L'écart maximal entre deux clics liés.
+        half_life_minutes (float): La demi-vie du poids en fonction de l'écart.
+        backward_weight (float): Le poids relatif du sens inverse (b -> a).
+        mp_context: Le contexte `multiprocessing` des processus (par défaut, "spawn").
+
+    Returns:
+        CovisitationIndex: L'index prêt à être interrogé.
+    """
+    files = list_click_files(path)
+    weighting = {"max_gap_minutes": max_gap_minutes, "half_life_minutes": half_life_minutes, "backward_weight": backward_weight}
+    max_workers = min(max_workers or os.cpu_count() or 1, len(files))
+    with build_timer("covisitation"):
+        with stage("build_covisitation_index_from_files", "file_counts"):
+            if max_workers <= 1 or multiprocessing.parent_process() is not None:
+                results = [_file_covisitation_counts(file, weighting) for file in files]
+            else:
+                with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context or multiprocessing.get_context("spawn")) as executor:
+                    results = list(executor.map(_file_covisitation_counts, files, [weighting] * len(files)))
+
+        with stage("build_covisitation_index_from_files", "merge"):
+            boundaries = pd.concat([file_boundaries for _, file_boundaries in results], ignore_index=True)
+            segments = np.repeat(np.arange(len(results)), [len(file_boundaries) for _, file_boundaries in results])
+            n_articles = max([counts.shape[0] for counts, _ in results] + [int(boundaries['click_article_id'].max()) + 1 if len(boundaries) else 0])
+
+            sources, targets, weights = _linked_pairs(boundaries, max_gap_minutes, half_life_minutes, segments=segments)
+            total = _pairs_matrix(sources, targets, weights, n_articles, backward_weight)
+            for counts, _ in results:
+                counts.resize((n_articles, n_articles))
+                total = total + counts
+        with stage("build_covisitation_index_from_files", "top_k"):
+            neighbours = _keep_top_k_per_row(total.tocsr(), top_k)
+    MATRIX_NNZ.set(neighbours.nnz, matrix="covisitation")
+    return CovisitationIndex(neighbours=neighbours)
+
+def get_covisitation_recommendations(user_id: int, click_index: UserClickIndex, covisitation_index: CovisitationIndex, popularity: PopularityIndex, top_n: int = 5, last_n: int = 5, candidates=None):
+    """
+    Recommande les prochains articles d'un utilisateur à partir de ses `last_n` derniers clics.
+
+    Args:
+        user_id (int): L'ID de l'utilisateur.
+        click_index (UserClickIndex): L'index des historiques de clics (clics ingérés compris).
+        covisitation_index (CovisitationIndex): L'index de co-visitation.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        top_n (int): Le nombre de recommandations à retourner.
+        last_n (int): Le nombre de derniers clics pris en compte.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Une liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    with stage("get_covisitation_recommendations", "history"):
+        user_articles, _ = click_index.history(user_id)
+    if len(user_articles) == 0:
+        # Si l'utilisateur est inconnu, retourner les articles populaires
+        record_fallback("covisitation", "unknown_user")
+        return popularity.recommend(top_n, candidates)
+
+    # Les articles déjà lus par l'utilisateur ne sont pas reproposés
+    with stage("get_covisitation_recommendations", "neighbours"):
+        next_article_ids = covisitation_index.next_articles(user_articles[-last_n:], top_n, exclude=user_articles, candidates=candidates)
+    if len(next_article_ids) == 0:
+        record_fallback("covisitation", "no_candidates")
+        return popularity.recommend(top_n, candidates)
+    with stage("get_covisitation_recommendations", "describe"):
+        return popularity.describe(next_article_ids)
+
+def get_covisitation_recommendations_batch(user_ids: list, click_index: UserClickIndex, covisitation_index: CovisitationIndex, popularity: PopularityIndex, top_n: int = 5, candidates=None):
+    """
+    Génère les recommandations par co-visitation pour un lot d'utilisateurs.
+
+    Args:
+        user_ids (list): Les IDs des utilisateurs.
+        click_index (UserClickIndex): L'index des historiques de clics.
+        covisitation_index (CovisitationIndex): L'index de co-visitation.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        top_n (int): Le nombre de recommandations par utilisateur.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Pour chaque utilisateur, dans l'ordre, une liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    # Chaque requête ne lit que quelques listes de voisins : pas de calcul partagé à vectoriser
+    return [get_covisitation_recommendations(int(user_id), click_index, covisitation_index, popularity, top_n, candidates=candidates) for user_id in user_ids]
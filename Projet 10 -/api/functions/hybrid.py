@@ -0,0 +1,176 @@
+# functions/hybrid.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+
+from functions.item_based import ItemSimilarityIndex, item_based_scores
+from functions.metrics import HYBRID_ENGINES, record_fallback, stage
+from functions.popularity import PopularityIndex
+from functions.session_based import UserClickIndex
+from functions.svd import SVDModel, svd_scores
+from functions.topn import top_n_indices
+
+# Poids par défaut de chaque moteur dans le mélange
+DEFAULT_WEIGHTS = {"popularity": 0.1, "item-based": 0.35, "svd": 0.35, "session": 0.2}
+# Budget de latence par défaut de chaque moteur, en millisecondes
+DEFAULT_BUDGETS_MS = {"popularity": 20.0, "item-based": 100.0, "svd": 100.0, "session": 20.0}
+
+def popularity_scores(popularity: PopularityIndex, top_n: int, candidates=None):
+    """
+    Returns:
+        tuple: Les `top_n` articles les plus populaires et le logarithme de leur nombre de clics
+               (la popularité est très asymétrique : sans logarithme, seul le premier article compterait).
+    """
+    article_ids = popularity.top(top_n, candidates)
+    return article_ids, np.log1p(popularity.popularity(article_ids)).astype(np.float64)
+
+def session_recency_scores(user_id: int, similarity_index: ItemSimilarityIndex, click_index: UserClickIndex, half_life_hours: float = 1.0, candidates=None):
+    """
+    Returns:
+        tuple | None: Les voisins des articles de l'historique, chaque article pesant selon la récence
+                      de son dernier clic (la session en cours domine), et leurs scores ;
+                      None si l'utilisateur n'a aucun clic.
+    """
+    return item_based_scores(user_id, similarity_index, click_index, recency_half_life_hours=half_life_hours, candidates=candidates)
+
+def _normalize(scores: np.ndarray) -> np.ndarray:
+    # Mise à l'échelle min-max dans [0, 1] : les scores des moteurs deviennent comparables
+    low, high = scores.min(), scores.max()
+    if high - low <= 0:
+        return np.ones_like(scores, dtype=np.float64)
+    return (scores - low) / (high - low)
+
+def blend_scores(engine_scores: dict, weights: dict):
+    """
+    Mélange les scores de plusieurs moteurs sur l'union de leurs articles candidats.
+
+    Chaque moteur est normalisé sur ses propres candidats ; un article qu'un moteur ne propose pas
+    reçoit 0 pour ce moteur.
+
+    Args:
+        engine_scores (dict): Nom du moteur -> (IDs des articles candidats, scores).
+        weights (dict): Nom du moteur -> poids.
+
+    Returns:
+        tuple: Les IDs des articles candidats et leur score mélangé.
+    """
+    engine_scores = {name: scores for name, scores in engine_scores.items() if scores is not None and len(scores[0])}
+    if not engine_scores:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    candidates = np.unique(np.concatenate([np.asarray(article_ids, dtype=np.int64) for article_ids, _ in engine_scores.values()]))
+    blended = np.zeros(len(candidates))
+    for name, (article_ids, scores) in engine_scores.items():
+        # Le dernier score d'un article proposé deux fois par un moteur l'emporte, sans effet en pratique
+        positions = np.searchsorted(candidates, np.asarray(article_ids, dtype=np.int64))
+        blended[positions] += weights.get(name, 0.0) * _normalize(np.asarray(scores, dtype=np.float64))
+    return candidates, blended
+
+class HybridRecommender:
+    """
+    Recommandations hybrides : les moteurs sont interrogés en parallèle puis leurs scores sont mélangés.
+
+    Chaque moteur dispose d'un budget de latence ; un moteur qui ne répond pas à temps est ignoré pour
+    cette requête. Un appel déjà commencé ne peut pas être interrompu et garde son thread jusqu'à la fin :
+    tant qu'un appel en retard d'un moteur tourne encore, ce moteur n'est plus soumis (statut "skipped"),
+    de sorte qu'un moteur lent n'occupe jamais plus d'un thread au-delà de son budget et ne sature pas le pool.
+    Les articles déjà lus par l'utilisateur sont retirés du mélange.
+
+    Args:
+        max_workers (int): Le nombre de threads du pool partagé par toutes les requêtes.
+        candidate_size (int): Le nombre d'articles candidats demandés à chaque moteur.
+    """
+
+    def __init__(self, max_workers: int = 8, candidate_size: int = 100):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hybrid")
+        self.candidate_size = candidate_size
+        self._lock = threading.Lock()
+        # Moteur -> appels ayant dépassé leur budget et toujours en cours
+        self._late = {}
+
+    def _release(self, name: str, future):
+        with self._lock:
+            self._late.get(name, set()).discard(future)
+
+    def engine_scores(self, engines: dict, budgets_ms: dict) -> tuple:
+        """
+        Exécute les moteurs en parallèle, chacun dans la limite de son budget.
+
+        Args:
+            engines (dict): Nom du moteur -> fonction sans argument retournant (IDs, scores) ou None.
+            budgets_ms (dict): Nom du moteur -> budget de latence en millisecondes.
+
+        Returns:
+            tuple: Les scores obtenus (nom -> (IDs, scores) ou None) et le statut de chaque moteur
+                   ("ok", "empty", "timeout", "skipped" ou "error").
+        """
+        start = time.perf_counter()
+        results, status, futures = {}, {}, {}
+        for name, engine in engines.items():
+            with self._lock:
+                busy = bool(self._late.get(name))
+            if busy:
+                status[name] = "skipped"
+            else:
+                futures[name] = self.executor.submit(engine)
+        for name, future in futures.items():
+            # Les moteurs tournent tous depuis `start` : chaque échéance est mesurée depuis ce même instant
+            remaining = start + budgets_ms.get(name, max(budgets_ms.values(), default=100.0)) / 1000 - time.perf_counter()
+            try:
+                results[name] = future.result(timeout=max(remaining, 0.0))
+                status[name] = "ok" if results[name] is not None else "empty"
+            except TimeoutError:
+                # Un appel encore en file est annulé ; un appel commencé est suivi jusqu'à sa fin
+                if not future.cancel():
+                    with self._lock:
+                        self._late.setdefault(name, set()).add(future)
+                    future.add_done_callback(lambda future, name=name: self._release(name, future))
+                status[name] = "timeout"
+            except Exception:
+                status[name] = "error"
+        return results, status
+
+    def recommend(self, user_id: int, popularity: PopularityIndex, similarity_index: ItemSimilarityIndex, svd_model: SVDModel,
+                  click_index: UserClickIndex, top_n: int = 5, weights: dict = None, budgets_ms: dict = None, candidates=None):
+        """
+        Génère des recommandations hybrides pour un utilisateur.
+
+        Args:
+            user_id (int): L'ID de l'utilisateur.
+            popularity (PopularityIndex): L'index de popularité.
+            similarity_index (ItemSimilarityIndex): L'index de similarité item-item.
+            svd_model (SVDModel): Le modèle SVD servi.
+            click_index (UserClickIndex): L'index des historiques de clics.
+            top_n (int): Le nombre de recommandations à retourner.
+            weights (dict): Poids de chaque moteur (par défaut `DEFAULT_WEIGHTS`) ; un poids nul désactive le moteur.
+            budgets_ms (dict): Budget de latence de chaque moteur (par défaut `DEFAULT_BUDGETS_MS`).
+            candidates (CandidateSet): Les articles éligibles, seuls scorés par chaque moteur (None : tout le catalogue).
+
+        Returns:
+            tuple: Une liste de dictionnaires contenant 'article_id' et 'popularity', et le statut de chaque moteur.
+        """
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        budgets_ms = {**DEFAULT_BUDGETS_MS, **(budgets_ms or {})}
+        history = np.unique(click_index.history(user_id)[0]).astype(np.int64)
+        size = max(self.candidate_size, top_n)
+        engines = {
+            # Les articles populaires déjà lus sont retirés du mélange : la liste est allongée d'autant
+            "popularity": lambda: popularity_scores(popularity, size + len(history), candidates),
+            "item-based": lambda: item_based_scores(user_id, similarity_index, click_index, candidates=candidates),
+            "svd": lambda: svd_scores(user_id, svd_model, size, click_index=click_index, candidates=candidates),
+            "session": lambda: session_recency_scores(user_id, similarity_index, click_index, candidates=candidates),
+        }
+        engines = {name: engine for name, engine in engines.items() if weights.get(name, 0.0) > 0}
+
+        with stage("hybrid_recommend", "engines"):
+            results, status = self.engine_scores(engines, budgets_ms)
+        for name, engine_status in status.items():
+            HYBRID_ENGINES.inc(engine=name, status=engine_status)
+        with stage("hybrid_recommend", "blend"):
+            article_ids, blended = blend_scores(results, weights)
+            best = top_n_indices(blended, top_n, exclude=np.isin(article_ids, history))
+        if len(best) == 0:
+            record_fallback("hybrid", "no_candidates")
+            return popularity.recommend(top_n, candidates), status
+        return popularity.describe(article_ids[best]), status
@@ -0,0 +1,64 @@
+# functions/id_map.py
+import numpy as np
+
+class IdMap:
+    """
+    Correspondance bidirectionnelle entre des IDs (utilisateurs ou articles) et leurs positions
+    (lignes ou colonnes d'une matrice).
+
+    Les IDs sont gardés dans un seul tableau trié : ID -> position par `np.searchsorted` (O(log n),
+    vectorisé pour un lot), position -> ID par simple indexation. Aucun dictionnaire Python n'est
+    construit, le tableau peut donc rester mappé en mémoire.
+
+    Args:
+        ids (np.ndarray): Les IDs, triés par ordre croissant et sans doublon.
+    """
+
+    def __init__(self, ids: np.ndarray):
+        self.ids = np.asarray(ids)
+        if len(self.ids) > 1 and not np.all(self.ids[1:] > self.ids[:-1]):
+            raise ValueError("Les IDs d'un IdMap doivent être triés et sans doublon")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, id_) -> bool:
+        return self.row(id_) is not None
+
+    def row(self, id_):
+        """
+        Args:
+            id_ (int): Un ID.
+
+        Returns:
+            int | None: La position de l'ID, ou None s'il est absent.
+        """
+        position = int(np.searchsorted(self.ids, id_))
+        if position < len(self.ids) and self.ids[position] == id_:
+            return position
+        return None
+
+    def rows(self, ids) -> np.ndarray:
+        """
+        Args:
+            ids: Les IDs recherchés.
+
+        Returns:
+            np.ndarray: La position de chaque ID, ou -1 s'il est absent.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        positions = np.searchsorted(self.ids, ids)
+        clipped = np.minimum(positions, len(self.ids) - 1)
+        return np.where(self.ids[clipped] == ids, positions, -1)
+
+    def ids_at(self, rows) -> np.ndarray:
+        """
+        Args:
+            rows: Des positions (lignes ou colonnes).
+
+        Returns:
+            np.ndarray: Les IDs correspondants.
+        """
+        return self.ids[rows]
@@ -0,0 +1,177 @@
+# functions/ingestion.py
+import os
+import threading
+import traceback
+
+import pandas as pd
+
+from functions.loader import CLICK_DTYPES, list_click_files, read_click_csv
+
+class ClickStore:
+    """
+    Stockage des clics : le log chargé au démarrage plus les lots ingérés depuis.
+
+    Chaque lot ajouté incrémente la version du stockage, ce qui permet aux reconstructions
+    en arrière-plan de savoir si elles sont à jour et quels lots rejouer après coup. Un lot peut
+    porter sa source (le fichier dont il provient), rendue quand le lot est compacté.
+
+    Args:
+        clicks (pd.DataFrame): Les clics chargés au démarrage.
+    """
+
+    def __init__(self, clicks: pd.DataFrame):
+        # Verrou partagé avec l'API : ingestion et bascule des index reconstruits sont exclusives
+        self.lock = threading.RLock()
+        self.version = 0
+        self._base = clicks
+        self._base_version = 0
+        self._batches = []
+
+    def append(self, clicks: pd.DataFrame, source: str = None) -> int:
+        """
+        Args:
+            clicks (pd.DataFrame): Un lot de nouveaux clics.
+            source (str): Le fichier dont provient le lot (None : clics reçus directement).
+
+        Returns:
+            int: La nouvelle version du stockage.
+        """
+        with self.lock:
+            self.version += 1
+            self._batches.append((self.version, clicks, source))
+            return self.version
+
+    def snapshot(self):
+        """
+        Returns:
+            tuple: La version courante et l'ensemble des clics à cette version.
+        """
+        with self.lock:
+            version, base, batches = self.version, self._base, [batch for _, batch, _ in self._batches]
+        if not batches:
+            return version, base
+        return version, pd.concat([base, *batches], ignore_index=True)
+
+    def batches_since(self, version: int) -> list:
+        """
+        Args:
+            version (int): Une version déjà prise en compte.
+
+        Returns:
+            list: Les lots ajoutés après cette version, dans l'ordre.
+        """
+        with self.lock:
+            return [batch for batch_version, batch, _ in self._batches if batch_version > version]
+
+    def compact(self, version: int, snapshot: pd.DataFrame) -> list:
+        """
+        Remplace le log de base par un instantané et oublie les lots qu'il contient déjà.
+
+        Args:
+            version (int): La version de l'instantané.
+            snapshot (pd.DataFrame): Les clics à cette version (retournés par `snapshot`).
+
+        Returns:
+            list: Les sources des lots compactés (leurs fichiers peuvent être archivés).
+        """
+        with self.lock:
+            if version < self._base_version:
+                return []
+            self._base, self._base_version = snapshot, version
+            sources = [source for batch_version, _, source in self._batches if batch_version <= version and source is not None]
+            self._batches = [batch for batch in self._batches if batch[0] > version]
+            return sources
+
+def clicks_from_records(records: list) -> pd.DataFrame:
+    """
+    Convertit des clics reçus par l'API (liste de dictionnaires) en DataFrame typé.
+
+    Args:
+        records (list): Les clics, avec au minimum 'user_id', 'click_article_id' et 'click_timestamp'.
+
+    Returns:
+        pd.DataFrame: Les clics, avec les types de `CLICK_DTYPES` pour les colonnes présentes.
+    """
+    clicks = pd.DataFrame.from_records(records).dropna(axis=1, how='all')
+    dtypes = {column: dtype for column, dtype in CLICK_DTYPES.items() if column in clicks}
+    dtypes['click_article_id'] = 'int32'
+    return clicks.astype(dtypes)
+
+class ClickFileWatcher(threading.Thread):
+    """
+    Surveille un dossier de fichiers horaires `clicks_*.csv` et transmet chaque nouveau fichier.
+
+    Un fichier n'est lu qu'une fois sa taille stable entre deux passages, pour ne pas lire
+    un fichier horaire encore en cours d'écriture. Un fichier peut disparaître entre deux passages
+    (archivé par le processus qui l'a compacté) : il est alors simplement oublié.
+
+    Args:
+        directory (str): Le dossier surveillé.
+        on_clicks (callable): Fonction appelée avec le DataFrame et le chemin de chaque nouveau fichier.
+        interval (float): Le délai entre deux passages, en secondes.
+        skip_existing (bool): Ignorer les fichiers déjà présents au démarrage (déjà chargés).
+    """
+
+    def __init__(self, directory: str, on_clicks, interval: float = 30.0, skip_existing: bool = True):
+        super().__init__(name="click-file-watcher", daemon=True)
+        self.directory = directory
+        self.on_clicks = on_clicks
+        self.interval = interval
+        self._seen = set(list_click_files(directory)) if skip_existing else set()
+        self._sizes = {}
+        self._stop_event = threading.Event()
+
+    def poll(self):
+        files = list_click_files(self.directory)
+        # Les fichiers archivés depuis le passage précédent ne sont plus suivis
+        self._seen.intersection_update(files)
+        for file in files:
+            if file in self._seen:
+                continue
+            try:
+                size = os.path.getsize(file)
+                if self._sizes.get(file) != size:
+                    self._sizes[file] = size
+                    continue
+                clicks = read_click_csv([file])
+            except FileNotFoundError:
+                self._sizes.pop(file, None)
+                continue
+            self.on_clicks(clicks, file)
+            self._seen.add(file)
+            self._sizes.pop(file, None)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                traceback.print_exc()
+
+    def stop(self):
+        self._stop_event.set()
+
+class PeriodicRefresher(threading.Thread):
+    """
+    Exécute une fonction de rafraîchissement à intervalle régulier, en arrière-plan.
+
+    Args:
+        refresh (callable): La fonction à exécuter (ex. reconstruction des index et réentraînement).
+        interval (float): Le délai entre deux exécutions, en secondes.
+    """
+
+    def __init__(self, refresh, interval: float = 600.0):
+        super().__init__(name="model-refresher", daemon=True)
+        self.refresh = refresh
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                traceback.print_exc()
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,73 @@
+# functions/interactions.py
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from functions.id_map import IdMap
+
+@dataclass
+class InteractionMatrix:
+    """
+    Matrice d'interaction utilisateurs x articles stockée en creux (CSR).
+
+    Attributes:
+        user_ids (np.ndarray): IDs des utilisateurs, triés, dans l'ordre des lignes.
+        article_ids (np.ndarray): IDs des articles, triés, dans l'ordre des colonnes.
+        counts (sparse.csr_matrix): Nombre de clics de chaque utilisateur sur chaque article.
+        binary (sparse.csr_matrix): Vue binaire (1 si l'utilisateur a cliqué l'article).
+        users (IdMap): Correspondance ID utilisateur <-> ligne.
+        articles (IdMap): Correspondance ID article <-> colonne.
+    """
+    user_ids: np.ndarray
+    article_ids: np.ndarray
+    counts: sparse.csr_matrix
+    binary: sparse.csr_matrix
+
+    def __post_init__(self):
+        self.users = IdMap(self.user_ids)
+        self.articles = IdMap(self.article_ids)
+
+    @property
+    def shape(self) -> tuple:
+        return self.counts.shape
+
+    @property
+    def empty(self) -> bool:
+        return self.counts.nnz == 0
+
+def build_interaction_matrix(dataframe: pd.DataFrame) -> InteractionMatrix:
+    """
+    Construit la matrice d'interaction creuse à partir du log de clics, sans passer par un `pivot_table` dense.
+
+    Les `user_id` et `click_article_id` sont factorisés en codes entiers contigus, puis les clics
+    sont agrégés en une seule passe dans une matrice CSR.
+
+    Args:
+        dataframe (pd.DataFrame): Le DataFrame contenant les interactions utilisateur-article.
+
+    Returns:
+        InteractionMatrix: Les matrices de comptage et binaire, avec les IDs correspondants.
+    """
+    df_clean = dataframe.dropna(subset=['click_article_id'])
+    user_codes, user_ids = pd.factorize(df_clean['user_id'], sort=True)
+    article_codes, article_ids = pd.factorize(df_clean['click_article_id'], sort=True)
+    shape = (len(user_ids), len(article_ids))
+
+    # Le constructeur COO additionne les doublons : chaque case contient le nombre de clics
+    counts = sparse.csr_matrix(
+        (np.ones(len(df_clean), dtype=np.float32), (user_codes, article_codes)),
+        shape=shape,
+    )
+    counts.sum_duplicates()
+    binary = sparse.csr_matrix(
+        (np.ones(counts.nnz, dtype=np.float32), counts.indices, counts.indptr),
+        shape=shape,
+    )
+    return InteractionMatrix(
+        user_ids=np.asarray(user_ids, dtype=np.int64),
+        article_ids=np.asarray(article_ids, dtype=np.int64),
+        counts=counts,
+        binary=binary,
+    )
@@ -1,7 +1,16 @@
 # functions/item_based.py
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
-from collections import defaultdict
+from scipy import sparse
+
+from functions.id_map import IdMap
+from functions.interactions import InteractionMatrix, build_interaction_matrix
+from functions.metrics import MATRIX_NNZ, build_timer, record_fallback, stage
+from functions.popularity import PopularityIndex
+from functions.session_based import UserClickIndex
+from functions.topn import top_n_indices
 
 def load_and_prepare_data(dataframe: pd.DataFrame):
     """
@@ -11,75 +20,278 @@ def load_and_prepare_data(dataframe: pd.DataFrame):
         dataframe (pd.DataFrame): Le DataFrame contenant les interactions utilisateur-article.
 
     Returns:
-        tuple: Un tuple contenant le DataFrame original et la matrice d'interaction binaire.
+        tuple: Un tuple contenant le DataFrame nettoyé et la matrice d'interaction creuse.
     """
     # Assurez-vous que le DataFrame est nettoyé
-    df_clean = dataframe.dropna(subset=['click_article_id'])
-
-    interaction_matrix = df_clean.pivot_table(
-        index='user_id',
-        columns='click_article_id',
-        values='click_timestamp',
-        aggfunc='count',
-        fill_value=0
+    with stage("load_and_prepare_data", "clean"):
+        df_clean = dataframe.dropna(subset=['click_article_id'])
+    # Construction creuse de la matrice utilisateurs x articles (l'ancien pivot)
+    with stage("load_and_prepare_data", "interaction_matrix"):
+        interaction_matrix = build_interaction_matrix(df_clean)
+    MATRIX_NNZ.set(interaction_matrix.counts.nnz, matrix="interactions")
+    return df_clean, interaction_matrix
+
+@dataclass
+class ItemSimilarityIndex:
+    """
+    Index de similarité item-item précalculé une seule fois (au démarrage ou au rechargement des données).
+
+    Attributes:
+        user_ids (np.ndarray): IDs des utilisateurs, triés, dans l'ordre des lignes de `user_item`.
+        article_ids (np.ndarray): IDs des articles, dans l'ordre des colonnes.
+        user_item (sparse.csr_matrix): Matrice binaire utilisateurs x articles.
+        similarity (sparse.csr_matrix): Similarité cosinus articles x articles, limitée aux top-K voisins par ligne.
+        users (IdMap): Correspondance ID utilisateur <-> ligne de `user_item`.
+        articles (IdMap): Correspondance ID article <-> colonne.
+    """
+    user_ids: np.ndarray
+    article_ids: np.ndarray
+    user_item: sparse.csr_matrix
+    similarity: sparse.csr_matrix
+
+    def __post_init__(self):
+        self.users = IdMap(self.user_ids)
+        self.articles = IdMap(self.article_ids)
+
+    @property
+    def empty(self) -> bool:
+        return self.user_item.nnz == 0
+
+def _rank_within_rows(matrix: sparse.csr_matrix):
+    """
+    Classe les valeurs non nulles de chaque ligne d'une matrice CSR par ordre décroissant.
+
+    Args:
+        matrix (sparse.csr_matrix): La matrice à classer.
+
+    Returns:
+        tuple: Les positions des valeurs (dans `matrix.data`) triées par ligne puis par valeur
+               décroissante, la ligne et le rang dans la ligne de chacune.
+    """
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    # Tri par ligne puis par valeur décroissante : le rang dans la ligne se déduit de indptr
+    order = np.lexsort((-matrix.data, rows))
+    rows = rows[order]
+    return order, rows, np.arange(matrix.nnz) - matrix.indptr[rows]
+
+def _keep_top_k_per_row(matrix: sparse.csr_matrix, top_k: int) -> sparse.csr_matrix:
+    """
+    Ne conserve que les `top_k` plus grandes valeurs de chaque ligne d'une matrice CSR.
+
+    Args:
+        matrix (sparse.csr_matrix): La matrice à élaguer.
+        top_k (int): Le nombre de valeurs à garder par ligne.
+
+    Returns:
+        sparse.csr_matrix: La matrice élaguée, de même forme.
+    """
+    n_rows = matrix.shape[0]
+    order, rows, rank = _rank_within_rows(matrix)
+    in_top = rank < top_k
+    kept = np.sort(order[in_top])
+
+    indptr = np.zeros(n_rows + 1, dtype=matrix.indptr.dtype)
+    np.cumsum(np.bincount(rows[in_top], minlength=n_rows), out=indptr[1:])
+    return sparse.csr_matrix((matrix.data[kept], matrix.indices[kept], indptr), shape=matrix.shape)
+
+def build_item_similarity_index(interaction_matrix: InteractionMatrix, top_k: int = 50) -> ItemSimilarityIndex:
+    """
+    Construit l'index de similarité item-item à partir de la matrice d'interaction binaire.
+
+    Args:
+        interaction_matrix (InteractionMatrix): La matrice d'interaction creuse utilisateur-article.
+        top_k (int): Le nombre de voisins conservés pour chaque article.
+
+    Returns:
+        ItemSimilarityIndex: L'index prêt à être interrogé.
+    """
+    user_item = interaction_matrix.binary
+
+    with build_timer("item-similarity"):
+        # Similarité cosinus calculée en creux : co-occurrences normalisées par les normes des colonnes
+        with stage("build_item_similarity_index", "co_occurrences"):
+            co_occurrences = (user_item.T @ user_item).tocsr()
+        with stage("build_item_similarity_index", "normalize"):
+            norms = np.sqrt(co_occurrences.diagonal())
+            norms[norms == 0] = 1.0
+            inv_norms = sparse.diags(1.0 / norms)
+            similarity = (inv_norms @ co_occurrences @ inv_norms).tocsr()
+            similarity.setdiag(0)
+            similarity.eliminate_zeros()
+        with stage("build_item_similarity_index", "top_k"):
+            similarity = _keep_top_k_per_row(similarity, top_k)
+    MATRIX_NNZ.set(similarity.nnz, matrix="item-similarity")
+
+    return ItemSimilarityIndex(
+        user_ids=interaction_matrix.user_ids,
+        article_ids=interaction_matrix.article_ids,
+        user_item=user_item,
+        similarity=similarity,
     )
-    interaction_matrix_binary = interaction_matrix.astype(bool).astype(int)
-    return df_clean, interaction_matrix_binary
 
-def get_item_based_collaborative_recommendations(user_id: int, dataframe: pd.DataFrame, interaction_matrix: pd.DataFrame, top_n: int = 5):
+def recency_weights(timestamps: np.ndarray, half_life_hours: float) -> np.ndarray:
+    """
+    Calcule un poids de récence pour chaque clic : 1 pour le plus récent, divisé par deux à chaque demi-vie.
+
+    Args:
+        timestamps (np.ndarray): Les horodatages des clics, en millisecondes.
+        half_life_hours (float): La demi-vie du poids, en heures.
+
+    Returns:
+        np.ndarray: Les poids, dans l'ordre des clics.
+    """
+    age_hours = (timestamps.max() - timestamps) / 3_600_000
+    return np.power(0.5, age_hours / half_life_hours)
+
+def _history_columns(user_id: int, similarity_index: ItemSimilarityIndex, click_index: UserClickIndex = None, recency_half_life_hours: float = None):
+    """
+    Les articles consultés par l'utilisateur, en colonnes de l'index, avec leur poids : 1 par défaut,
+    ou la récence du dernier clic sur l'article. L'historique de `click_index` comprend les clics ingérés
+    depuis la construction de l'index ; sans lui, seule la ligne de `user_item` est connue.
+
+    Returns:
+        tuple: Les colonnes (triées) et leurs poids, vides si l'utilisateur n'a consulté aucun article de l'index.
+    """
+    articles, timestamps = click_index.history(user_id) if click_index is not None else (np.empty(0, dtype=np.int64), None)
+    if len(articles) == 0:
+        user_row = similarity_index.users.row(user_id)
+        if user_row is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        user_item = similarity_index.user_item
+        columns = np.asarray(user_item.indices[user_item.indptr[user_row]:user_item.indptr[user_row + 1]], dtype=np.int64)
+        return columns, np.ones(len(columns))
+
+    # L'historique est trié par horodatage : le premier article distinct en partant de la fin est le clic le plus récent
+    distinct_articles, last_clicks = np.unique(articles[::-1], return_index=True)
+    if recency_half_life_hours is None:
+        weights = np.ones(len(distinct_articles))
+    else:
+        weights = recency_weights(timestamps[::-1][last_clicks], recency_half_life_hours)
+    columns = similarity_index.articles.rows(distinct_articles)
+    known = columns >= 0
+    columns, weights = columns[known], weights[known]
+    order = np.argsort(columns)
+    return columns[order], weights[order]
+
+def _user_vector(user_id: int, similarity_index: ItemSimilarityIndex, click_index: UserClickIndex = None, recency_half_life_hours: float = None) -> sparse.csr_matrix:
+    """
+    Construit le vecteur creux (1 x articles) des articles consultés par l'utilisateur,
+    binaire par défaut ou pondéré par la récence de chaque article (voir `_history_columns`).
+    """
+    columns, weights = _history_columns(user_id, similarity_index, click_index, recency_half_life_hours)
+    return sparse.csr_matrix((weights, columns, [0, len(columns)]), shape=(1, len(similarity_index.article_ids)))
+
+def item_based_scores(user_id: int, similarity_index: ItemSimilarityIndex, click_index: UserClickIndex = None, recency_half_life_hours: float = None, candidates=None):
+    """
+    Calcule les scores item-based des articles candidats d'un utilisateur (voisins de ses articles consultés).
+
+    Args:
+        user_id (int): L'ID de l'utilisateur.
+        similarity_index (ItemSimilarityIndex): L'index de similarité item-item précalculé.
+        click_index (UserClickIndex): L'index des historiques de clics (clics ingérés compris), requis pour
+                                      les utilisateurs arrivés après la construction et pour la pondération par récence.
+        recency_half_life_hours (float): Demi-vie (en heures) du poids de chaque article consulté.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        tuple | None: Les IDs des articles candidats (hors articles déjà consultés) et leurs scores,
+                      ou None si l'utilisateur n'a consulté aucun article de l'index.
+    """
+    user_vector = _user_vector(user_id, similarity_index, click_index, recency_half_life_hours)
+    if user_vector.nnz == 0:
+        return None
+
+    # Un seul produit creux : seules les lignes des articles consultés sont parcourues
+    scores = (user_vector @ similarity_index.similarity).tocsr()
+    unseen = ~np.isin(scores.indices, user_vector.indices)
+    article_ids = similarity_index.articles.ids_at(scores.indices[unseen])
+    scores = scores.data[unseen]
+    if candidates is not None:
+        eligible = candidates.contains(article_ids)
+        article_ids, scores = article_ids[eligible], scores[eligible]
+    return article_ids, scores
+
+def get_item_based_collaborative_recommendations(user_id: int, popularity: PopularityIndex, similarity_index: ItemSimilarityIndex, top_n: int = 5, click_index: UserClickIndex = None, recency_half_life_hours: float = None, candidates=None):
     """
     Génère des recommandations basées sur les items pour un utilisateur donné.
 
+    Les scores sont obtenus par un seul produit creux vecteur-matrice
+    (articles consultés x similarité), suivi d'un top-N vectorisé.
+
     Args:
         user_id (int): L'ID de l'utilisateur.
-        dataframe (pd.DataFrame): Le DataFrame original pour calculer la popularité.
-        interaction_matrix (pd.DataFrame): La matrice d'interaction utilisateur-article.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        similarity_index (ItemSimilarityIndex): L'index de similarité item-item précalculé.
         top_n (int): Le nombre de recommandations à retourner.
+        click_index (UserClickIndex): L'index des historiques de clics, requis pour la pondération par récence.
+        recency_half_life_hours (float): Demi-vie (en heures) du poids de chaque article consulté ;
+                                         None pour donner le même poids à tous les articles.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
 
     Returns:
         list: Une liste de dictionnaires contenant 'article_id' et 'popularity'.
     """
-    if user_id not in interaction_matrix.index:
+    with stage("get_item_based_collaborative_recommendations", "scoring"):
+        scored = item_based_scores(user_id, similarity_index, click_index, recency_half_life_hours, candidates)
+    if scored is None:
         # Si l'utilisateur est inconnu, retourner les articles populaires
-        popular_articles = dataframe['click_article_id'].value_counts()
-        top_articles = popular_articles.head(top_n)
-        recommendations = [{"article_id": int(art_id), "popularity": int(count)} for art_id, count in top_articles.items()]
-        return recommendations
-
-    user_interactions = interaction_matrix.loc[user_id]
-    user_clicked_articles = user_interactions[user_interactions > 0].index.tolist()
-    if not user_clicked_articles:
-        # Si l'utilisateur n'a rien cliqué, retourner les articles populaires
-        popular_articles = dataframe['click_article_id'].value_counts()
-        top_articles = popular_articles.head(top_n)
-        recommendations = [{"article_id": int(art_id), "popularity": int(count)} for art_id, count in top_articles.items()]
-        return recommendations
-
-    articles_matrix = interaction_matrix.T
-    similarity_matrix = cosine_similarity(articles_matrix)
-    similarity_df = pd.DataFrame(
-        similarity_matrix,
-        index=interaction_matrix.columns,
-        columns=interaction_matrix.columns
-    )
-    scores = defaultdict(float)
-    for article_consulte in user_clicked_articles:
-        similarities_to_article = similarity_df[article_consulte]
-        for other_article_id in interaction_matrix.columns:
-            if other_article_id != article_consulte and other_article_id not in user_clicked_articles:
-                scores[other_article_id] += similarities_to_article[other_article_id]
-
-    sorted_scores = sorted(scores.items(), key=lambda item: item[1], reverse=True)
-    recommended_article_ids = [article_id for article_id, score in sorted_scores[:top_n]]
-
-    # Calculer la popularité pour les articles recommandés en utilisant le dataframe original
-    popularity_counts = dataframe['click_article_id'].value_counts()
-    recommendations = []
-    for article_id in recommended_article_ids:
-        pop_count = int(popularity_counts.get(article_id, 0))
-        recommendations.append({
-            "article_id": int(article_id), # Assurez-vous que c'est un entier
-            "popularity": pop_count
-        })
+        record_fallback("item-based", "unknown_user")
+        return popularity.recommend(top_n, candidates)
+
+    article_ids, scores = scored
+    with stage("get_item_based_collaborative_recommendations", "top_n"):
+        best = top_n_indices(scores, top_n)
+    if len(best) == 0:
+        # Si aucun voisin n'est disponible, retourner les articles populaires
+        record_fallback("item-based", "no_candidates")
+        return popularity.recommend(top_n, candidates)
+
+    # Ajouter la popularité des articles recommandés depuis l'index précalculé
+    with stage("get_item_based_collaborative_recommendations", "describe"):
+        return popularity.describe(article_ids[best])
+
+def get_item_based_collaborative_recommendations_batch(user_ids: list, popularity: PopularityIndex, similarity_index: ItemSimilarityIndex, top_n: int = 5, click_index: UserClickIndex = None, candidates=None):
+    """
+    Génère les recommandations basées sur les items pour un lot d'utilisateurs en une seule opération.
 
+    Les scores de tout le lot sont obtenus par un unique produit creux
+    (historiques binaires du lot x matrice de similarité), puis le top-N est extrait ligne par ligne.
+
+    Args:
+        user_ids (list): Les IDs des utilisateurs.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        similarity_index (ItemSimilarityIndex): L'index de similarité item-item précalculé.
+        top_n (int): Le nombre de recommandations par utilisateur.
+        click_index (UserClickIndex): L'index des historiques de clics (clics ingérés compris).
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Pour chaque utilisateur, dans l'ordre, une liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    histories = [_history_columns(user_id, similarity_index, click_index)[0] for user_id in user_ids]
+    known = np.array([len(columns) > 0 for columns in histories], dtype=bool)
+    histories = [columns for columns in histories if len(columns)]
+    indptr = np.zeros(len(histories) + 1, dtype=np.int64)
+    np.cumsum([len(columns) for columns in histories], out=indptr[1:])
+    columns = np.concatenate(histories) if histories else np.empty(0, dtype=np.int64)
+    user_histories = sparse.csr_matrix((np.ones(len(columns)), columns, indptr), shape=(len(histories), len(similarity_index.article_ids)))
+
+    # Scores du lot entier, puis retrait des articles déjà consultés
+    scores = (user_histories @ similarity_index.similarity).tocsr()
+    scores = (scores - scores.multiply(user_histories)).tocsr()
+    if candidates is not None:
+        scores.data[~candidates.contains(similarity_index.articles.ids_at(scores.indices))] = 0
+    scores.eliminate_zeros()
+
+    order, rows, rank = _rank_within_rows(scores)
+    in_top = rank < top_n
+    row_sizes = np.bincount(rows[in_top], minlength=scores.shape[0])
+    best_articles = np.split(similarity_index.articles.ids_at(scores.indices[order[in_top]]), np.cumsum(row_sizes)[:-1])
+
+    fallback = popularity.recommend(top_n, candidates)
+    known_recommendations = iter(best_articles)
+    recommendations = []
+    for is_known in known:
+        articles = next(known_recommendations) if is_known else []
+        recommendations.append(popularity.describe(articles) if len(articles) else fallback)
     return recommendations
@@ -0,0 +1,84 @@
+# functions/latent.py
+import numpy as np
+
+from functions.id_map import IdMap
+from functions.session_based import UserClickIndex
+from functions.topn import top_n_indices_batch
+
+def user_history(user_id: int, click_index: UserClickIndex = None) -> np.ndarray:
+    """
+    Retourne les articles cliqués par un utilisateur, clics ingérés compris.
+
+    Args:
+        user_id (int): L'ID de l'utilisateur.
+        click_index (UserClickIndex): L'index des historiques de clics (None : historique vide).
+
+    Returns:
+        np.ndarray: Les IDs des articles cliqués.
+    """
+    if click_index is None:
+        return np.empty(0, dtype=np.int64)
+    return click_index.history(user_id)[0]
+
+def seen_columns(articles: IdMap, histories: list) -> list:
+    """
+    Convertit des historiques de clics en colonnes d'un modèle latent.
+
+    Args:
+        articles (IdMap): La correspondance ID article <-> colonne du modèle.
+        histories (list): L'historique (IDs d'articles) de chaque utilisateur.
+
+    Returns:
+        list: Pour chaque utilisateur, les colonnes distinctes des articles déjà consultés
+              (les articles inconnus du modèle sont ignorés).
+    """
+    columns = [np.unique(articles.rows(history)) for history in histories]
+    return [seen[seen >= 0] for seen in columns]
+
+def best_articles(articles: IdMap, article_vectors: np.ndarray, article_index, user_vectors: np.ndarray, histories: list, top_n: int, candidates=None) -> list:
+    """
+    Sélectionne les meilleurs articles de chaque utilisateur par produit scalaire maximal entre
+    son vecteur latent et les vecteurs des articles (SVD ou ALS).
+
+    Les articles déjà consultés sont exclus : en implicite, ils dominent sinon le classement.
+    Seuls les articles éligibles sont scorés.
+
+    Args:
+        articles (IdMap): La correspondance ID article <-> ligne de `article_vectors`.
+        article_vectors (np.ndarray): Les vecteurs latents des articles (articles x facteurs).
+        article_index (ArticleVectorIndex): L'index de recherche sur ces vecteurs (None : produit dense).
+        user_vectors (np.ndarray): Les vecteurs latents des utilisateurs (utilisateurs x facteurs).
+        histories (list): L'historique (IDs d'articles) de chaque utilisateur.
+        top_n (int): Le nombre d'articles par utilisateur.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Pour chaque utilisateur, les IDs des meilleurs articles et leurs scores,
+              triés par score décroissant.
+    """
+    seen = seen_columns(articles, histories)
+    eligible = None if candidates is None else candidates.columns(articles)
+    if article_index is not None:
+        # L'index ne sait pas exclure : on demande de quoi compenser le plus long historique
+        extra = max((len(columns) for columns in seen), default=0)
+        best_indices, best_scores = article_index.search_batch(user_vectors, top_n + extra, rows=eligible)
+        results = []
+        for indices, scores, columns in zip(best_indices, best_scores, seen):
+            unseen = ~np.isin(indices, columns)
+            results.append((articles.ids_at(indices[unseen][:top_n]), scores[unseen][:top_n]))
+        return results
+
+    vectors = np.asarray(article_vectors)
+    if eligible is None:
+        scores = np.asarray(user_vectors, dtype=vectors.dtype) @ vectors.T
+        exclude = np.zeros(scores.shape, dtype=bool)
+        for row, columns in enumerate(seen):
+            exclude[row, columns] = True
+        eligible = np.arange(scores.shape[1])
+    else:
+        scores = np.asarray(user_vectors, dtype=vectors.dtype) @ vectors[eligible].T
+        exclude = np.stack([np.isin(eligible, columns) for columns in seen]) if len(seen) else np.zeros(scores.shape, dtype=bool)
+    return [
+        (articles.ids_at(eligible[indices]), scores[row, indices])
+        for row, indices in enumerate(top_n_indices_batch(scores, top_n, exclude=exclude))
+    ]
@@ -0,0 +1,105 @@
+# functions/loader.py
+import glob
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # Dépendance optionnelle : sans pyarrow, les CSV sont relus à chaque démarrage
+    pa = None
+
+# Types explicites et étroits : les IDs tiennent sur 32 bits, les horodatages (ms) sur 64 bits
+CLICK_DTYPES = {
+    'user_id': 'int32',
+    'session_id': 'int64',
+    'session_start': 'int64',
+    'session_size': 'int16',
+    'click_article_id': 'Int32',
+    'click_timestamp': 'int64',
+    'click_environment': 'int16',
+    'click_deviceGroup': 'int16',
+    'click_os': 'int16',
+    'click_country': 'int16',
+    'click_region': 'int16',
+    'click_referrer_type': 'int16',
+}
+CATEGORICAL_COLUMNS = ['click_environment', 'click_deviceGroup', 'click_os', 'click_country', 'click_region', 'click_referrer_type']
+
+def list_click_files(path: str) -> list:
+    """
+    Args:
+        path (str): Un fichier CSV de clics ou un dossier de fichiers horaires `clicks_*.csv`.
+
+    Returns:
+        list: Les fichiers CSV à charger, triés.
+    """
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, 'clicks_*.csv')))
+    return [path]
+
+def default_cache_path(path: str) -> str:
+    """
+    Args:
+        path (str): Un fichier CSV de clics ou un dossier de fichiers horaires.
+
+    Returns:
+        str: L'emplacement du cache Arrow associé.
+    """
+    if os.path.isdir(path):
+        return os.path.join(path, 'clicks.arrow')
+    return os.path.splitext(path)[0] + '.arrow'
+
+def read_click_csv(files: list) -> pd.DataFrame:
+    """
+    Lit un ou plusieurs fichiers CSV de clics avec des types explicites.
+
+    Args:
+        files (list): Les fichiers CSV à lire.
+
+    Returns:
+        pd.DataFrame: Les clics, sans article manquant, avec des colonnes catégorielles pour le contexte.
+    """
+    frames = [pd.read_csv(file, sep=',', dtype=CLICK_DTYPES) for file in files]
+    clicks = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    clicks = clicks.dropna(subset=['click_article_id'])
+    clicks['click_article_id'] = clicks['click_article_id'].astype('int32')
+    # Conversion en catégories après concaténation, pour que tous les fichiers partagent les mêmes catégories
+    for column in CATEGORICAL_COLUMNS:
+        if column in clicks:
+            clicks[column] = clicks[column].astype('category')
+    return clicks.reset_index(drop=True)
+
+def load_clicks(path: str, cache_path: str = None) -> pd.DataFrame:
+    """
+    Charge le log de clics (fichier unique ou dossier de fichiers horaires) en passant par un cache Arrow.
+
+    Au premier chargement, les CSV sont lus avec des types étroits puis écrits dans un fichier Arrow IPC
+    non compressé. Les démarrages suivants mappent ce fichier en mémoire au lieu de reparser les CSV ;
+    le cache est reconstruit dès qu'un fichier source est plus récent que lui.
+
+    Args:
+        path (str): Un fichier CSV de clics ou un dossier de fichiers horaires `clicks_*.csv`.
+        cache_path (str): L'emplacement du cache (par défaut à côté des données).
+
+    Returns:
+        pd.DataFrame: Les clics typés.
+    """
+    files = list_click_files(path)
+    if not files:
+        raise FileNotFoundError(f"Aucun fichier de clics trouvé dans {path}")
+    if pa is None:
+        return read_click_csv(files)
+
+    cache_path = cache_path or default_cache_path(path)
+    newest_source = max(os.path.getmtime(file) for file in files)
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= newest_source:
+        table = feather.read_table(cache_path, memory_map=True)
+        return table.to_pandas(split_blocks=True)
+
+    clicks = read_click_csv(files)
+    tmp_path = cache_path + '.tmp'
+    feather.write_feather(clicks, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, cache_path)
+    return clicks
@@ -0,0 +1,296 @@
+# functions/metrics.py
+"""
+Métriques au format texte Prometheus, sans dépendance : compteurs, jauges et histogrammes étiquetés,
+rendus par `render()` pour l'endpoint `/metrics`.
+
+Les métriques sont propres au processus : en mode multi-processus (serve.py), chaque worker
+expose les siennes.
+"""
+import abc
+import functools
+import math
+import os
+import resource
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+# Bornes des histogrammes, en secondes : de la requête servie depuis le cache à l'entraînement d'un modèle
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class _Metric(abc.ABC):
+    TYPE = None
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} attend les étiquettes {self.label_names}, reçu {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abc.abstractmethod
+    def _samples(self) -> list:
+        """
+        Returns:
+            list: Les échantillons (suffixe du nom, noms des étiquettes, valeurs des étiquettes, valeur).
+        """
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.TYPE}"]
+        for suffix, names, values, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """
+    Compteur croissant (ex. nombre de replis sur la popularité) ; son nom se termine par `_total`.
+    """
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [("", self.label_names, key, value) for key, value in values]
+
+class Gauge(_Metric):
+    """
+    Valeur instantanée (ex. nombre de valeurs non nulles d'une matrice). Une jauge sans étiquette peut
+    être calculée à chaque rendu par `set_function`.
+    """
+    TYPE = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        super().__init__(name, documentation, labels)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def set_function(self, function):
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            return [("", (), (), float(self._function()))]
+        with self._lock:
+            values = list(self._values.items())
+        return [("", self.label_names, key, value) for key, value in values]
+
+class Histogram(_Metric):
+    """
+    Distribution de durées, par intervalles cumulés (`le`) comme l'attend Prometheus.
+
+    Args:
+        buckets (tuple): Les bornes supérieures des intervalles, croissantes.
+    """
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        self._observe(self._key(labels), value)
+
+    def labels(self, **labels):
+        """
+        Returns:
+            callable: Une fonction `observe(valeur)` liée à ces étiquettes, qui évite de les revalider
+                      à chaque mesure (chemin des requêtes).
+        """
+        return functools.partial(self._observe, self._key(labels))
+
+    def _observe(self, key: tuple, value: float):
+        # Le premier intervalle dont la borne est >= à la valeur ; len(buckets) pour +Inf
+        position = bisect_left(self.buckets, value)
+        # Une liste modifiée sur place par série : un compteur par intervalle, puis la somme des valeurs
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[position] += 1
+            entry[-1] += value
+
+    def _samples(self):
+        with self._lock:
+            values = [(key, entry[:-1], entry[-1]) for key, entry in self._values.items()]
+        samples = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append(("_bucket", self.label_names + ("le",), key + (_format_value(bound),), cumulative))
+            samples.append(("_sum", self.label_names, key, total))
+            samples.append(("_count", self.label_names, key, cumulative))
+        return samples
+
+class MetricsRegistry:
+    """
+    Ensemble des métriques exposées par `/metrics`.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns:
+            str: Toutes les métriques au format texte Prometheus (version 0.0.4).
+        """
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+def counter(name: str, documentation: str, labels: tuple = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labels))
+
+def gauge(name: str, documentation: str, labels: tuple = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labels))
+
+def histogram(name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labels, buckets))
+
+def render() -> str:
+    return REGISTRY.render()
+
+REQUEST_DURATION = histogram("recommendation_request_duration_seconds", "Durée des requêtes HTTP, par endpoint.", ("endpoint", "method", "status"))
+STAGE_DURATION = histogram("recommendation_stage_duration_seconds", "Durée de chaque étape des calculs de recommandation et d'entraînement.", ("function", "stage"))
+FALLBACKS = counter("recommendation_fallbacks_total", "Recommandations remplacées par la popularité, par moteur et par cause.", ("engine", "reason"))
+HYBRID_ENGINES = counter("hybrid_engine_results_total", "Résultat de chaque moteur interrogé par le mélange hybride.", ("engine", "status"))
+BUILD_SECONDS = gauge("model_build_seconds", "Durée de la dernière construction de chaque modèle ou index, en secondes.", ("model",))
+MATRIX_NNZ = gauge("matrix_nnz", "Nombre de valeurs non nulles de chaque matrice creuse construite.", ("matrix",))
+PROCESS_RSS = gauge("process_resident_memory_bytes", "Mémoire résidente (RSS) du processus, en octets.")
+
+def resident_memory_bytes() -> int:
+    # /proc donne le RSS courant sous Linux ; ailleurs, seul le maximum atteint est disponible
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+PROCESS_RSS.set_function(resident_memory_bytes)
+
+class stage:
+    """
+    Mesure la durée d'une étape dans `recommendation_stage_duration_seconds`.
+
+    Usage :
+        with stage("get_svd_recommendations", "search"):
+            ...
+
+    Args:
+        function (str): La fonction mesurée.
+        name (str): L'étape.
+    """
+    __slots__ = ("observe", "start")
+    _observers = {}
+
+    def __init__(self, function: str, name: str):
+        observe = self._observers.get((function, name))
+        if observe is None:
+            observe = self._observers.setdefault((function, name), STAGE_DURATION.labels(function=function, stage=name))
+        self.observe = observe
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.observe(time.perf_counter() - self.start)
+        return False
+
+class build_timer:
+    """
+    Mesure la construction complète d'un modèle ou d'un index dans la jauge `model_build_seconds`.
+
+    Args:
+        model (str): Le modèle ou l'index construit.
+    """
+    __slots__ = ("model", "start")
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            BUILD_SECONDS.set(time.perf_counter() - self.start, model=self.model)
+        return False
+
+def record_fallback(engine: str, reason: str, count: int = 1):
+    """
+    Compte les recommandations remplacées par la popularité (ex. utilisateur inconnu, aucun voisin).
+    """
+    if count:
+        FALLBACKS.inc(count, engine=engine, reason=reason)
+
+class RequestMetricsMiddleware:
+    """
+    Middleware ASGI qui mesure chaque requête HTTP dans `recommendation_request_duration_seconds`.
+
+    L'endpoint est le gabarit de la route (ex. "/recommendation/{algo}/batch") et non le chemin reçu,
+    pour borner le nombre de séries ; les chemins inconnus sont regroupés sous "unmatched". Pour une
+    réponse en flux, la durée court jusqu'au dernier morceau envoyé.
+
+    Args:
+        app: L'application ASGI mesurée.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                endpoint=getattr(route, "path", "unmatched"), method=scope["method"], status=status["code"],
+            )
@@ -1,26 +1,197 @@
 # functions/popularity.py
+import threading
+
+import numpy as np
 import pandas as pd
 
-def get_popular_recommendations(dataframe: pd.DataFrame, top_n: int = 5):
+from functions.topn import top_n_indices
+
+class PopularityIndex:
+    """
+    Popularité des articles calculée une seule fois puis tenue à jour de façon incrémentale.
+
+    Les compteurs de clics sont stockés dans un tableau NumPy indexé par l'ID d'article,
+    et la liste des `top_size` articles les plus cliqués est gardée triée : une recommandation
+    par popularité coûte O(top_n), sans recompter le log de clics.
+
+    Args:
+        article_ids (np.ndarray): Les IDs d'articles de chaque clic.
+        top_size (int): La taille de la liste des articles les plus populaires gardée triée.
+    """
+
+    def __init__(self, article_ids: np.ndarray, top_size: int = 100):
+        self.top_size = top_size
+        self._lock = threading.Lock()
+        self.counts = np.bincount(np.asarray(article_ids, dtype=np.int64)).astype(np.int64)
+        self._top = self._select(top_size)
+
+    @classmethod
+    def from_dataframe(cls, dataframe: pd.DataFrame, top_size: int = 100):
+        """
+        Construit l'index à partir du DataFrame des clics.
+
+        Args:
+            dataframe (pd.DataFrame): Le DataFrame contenant les interactions utilisateur-article.
+            top_size (int): La taille de la liste des articles les plus populaires gardée triée.
+
+        Returns:
+            PopularityIndex: L'index de popularité.
+        """
+        article_ids = dataframe['click_article_id'].dropna().to_numpy(dtype=np.int64)
+        return cls(article_ids, top_size=top_size)
+
+    @classmethod
+    def from_counts(cls, counts: np.ndarray, top_size: int = 100):
+        """
+        Construit l'index à partir de compteurs déjà calculés (ex. publiés par un autre processus).
+
+        Args:
+            counts (np.ndarray): Le nombre de clics de chaque article, indexé par ID d'article.
+            top_size (int): La taille de la liste des articles les plus populaires gardée triée.
+
+        Returns:
+            PopularityIndex: L'index de popularité, avec sa propre copie modifiable des compteurs.
+        """
+        index = cls.__new__(cls)
+        index.top_size = top_size
+        index._lock = threading.Lock()
+        index.counts = np.array(counts, dtype=np.int64)
+        index._top = index._select(top_size)
+        return index
+
+    def _select(self, size: int) -> np.ndarray:
+        # Sélection en O(n) par argpartition ; les ex aequo du dernier rang sont gardés pour que
+        # le départage par ID reste déterministe
+        counts = self.counts
+        best = top_n_indices(counts, size, exclude=counts == 0)
+        if len(best) == 0:
+            return best
+        candidates = np.flatnonzero(counts >= counts[best[-1]])
+        return self._rank(candidates, size=size)
+
+    def _rank(self, candidates: np.ndarray, size: int = None) -> np.ndarray:
+        # Tri par nombre de clics décroissant, puis par ID croissant pour départager les égalités
+        order = np.lexsort((candidates, -self.counts[candidates]))
+        return candidates[order[:size or self.top_size]]
+
+    def update(self, article_ids: np.ndarray):
+        """
+        Ajoute un lot de nouveaux clics sans recompter l'historique.
+
+        Seuls les articles du lot peuvent entrer dans le top : les compteurs ne faisant qu'augmenter,
+        le nouveau top est le meilleur de l'ancien top et des articles mis à jour.
+
+        Args:
+            article_ids (np.ndarray): Les IDs d'articles des nouveaux clics.
+        """
+        article_ids = np.asarray(article_ids, dtype=np.int64)
+        if len(article_ids) == 0:
+            return
+        with self._lock:
+            if article_ids.max() >= len(self.counts):
+                counts = np.zeros(article_ids.max() + 1, dtype=np.int64)
+                counts[:len(self.counts)] = self.counts
+                self.counts = counts
+            np.add.at(self.counts, article_ids, 1)
+            self._top = self._rank(np.union1d(self._top, article_ids))
+
+    def top(self, top_n: int = 5, candidates=None) -> np.ndarray:
+        """
+        Args:
+            top_n (int): Le nombre d'articles à retourner.
+            candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+        Returns:
+            np.ndarray: Les IDs des `top_n` articles les plus populaires.
+        """
+        if candidates is not None:
+            return self._top_among(top_n, candidates)
+        if top_n <= self.top_size:
+            return self._top[:top_n]
+        # Au-delà de la liste gardée triée, on sélectionne sur l'ensemble du catalogue
+        return self._select(top_n)
+
+    def _top_among(self, top_n: int, candidates) -> np.ndarray:
+        # La liste gardée triée suffit si elle contient assez d'articles éligibles
+        top = self._top
+        kept = top[candidates.contains(top)]
+        if len(kept) >= top_n:
+            return kept[:top_n]
+        # Sinon on ne sélectionne que parmi les articles éligibles
+        counts = self.counts
+        eligible = candidates.ids[:np.searchsorted(candidates.ids, len(counts))]
+        eligible_counts = counts[eligible]
+        best = top_n_indices(eligible_counts, top_n, exclude=eligible_counts == 0)
+        if len(best) == 0:
+            return best
+        return self._rank(eligible[eligible_counts >= eligible_counts[best[-1]]], size=top_n)
+
+    def popularity(self, article_ids: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            article_ids (np.ndarray): Des IDs d'articles.
+
+        Returns:
+            np.ndarray: Le nombre de clics de chaque article (0 si l'article est inconnu).
+        """
+        article_ids = np.asarray(article_ids, dtype=np.int64)
+        counts = self.counts
+        known = (article_ids >= 0) & (article_ids < len(counts))
+        return np.where(known, counts[np.where(known, article_ids, 0)], 0)
+
+    def describe(self, article_ids) -> list:
+        """
+        Formate une liste d'articles recommandés avec leur popularité.
+
+        Args:
+            article_ids: Les IDs des articles recommandés, dans l'ordre.
+
+        Returns:
+            list: Une liste de dictionnaires contenant 'article_id' et 'popularity'.
+        """
+        article_ids = np.asarray(article_ids, dtype=np.int64)
+        return [
+            {"article_id": int(article_id), "popularity": int(count)}
+            for article_id, count in zip(article_ids, self.popularity(article_ids))
+        ]
+
+    def recommend(self, top_n: int = 5, candidates=None) -> list:
+        """
+        Args:
+            top_n (int): Le nombre d'articles populaires à retourner.
+            candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+        Returns:
+            list: Une liste de dictionnaires contenant 'article_id' et 'popularity'.
+        """
+        return self.describe(self.top(top_n, candidates))
+
+def get_popular_recommendations(popularity: PopularityIndex, top_n: int = 5, candidates=None):
     """
     Génère des recommandations basées sur la popularité des articles.
 
     Args:
-        dataframe (pd.DataFrame): Le DataFrame contenant les interactions utilisateur-article.
+        popularity (PopularityIndex): L'index de popularité précalculé.
         top_n (int): Le nombre d'articles populaires à retourner.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
 
     Returns:
         list: Une liste de dictionnaires contenant 'article_id' et 'popularity'.
     """
-    # Calculer la popularité (nombre de clics) pour chaque article
-    popular_articles = dataframe['click_article_id'].value_counts()
-    # Sélectionner les top_n articles les plus populaires
-    top_articles = popular_articles.head(top_n)
-    # Formater les résultats
-    recommendations = []
-    for article_id, count in top_articles.items():
-        recommendations.append({
-            "article_id": article_id,
-            "popularity": int(count) # Assurez-vous que c'est un entier
-        })
-    return recommendations
+    return popularity.recommend(top_n, candidates)
+
+def get_popular_recommendations_batch(user_ids: list, popularity: PopularityIndex, top_n: int = 5, candidates=None):
+    """
+    Génère les recommandations basées sur la popularité pour un lot d'utilisateurs.
+
+    Args:
+        user_ids (list): Les IDs des utilisateurs.
+        popularity (PopularityIndex): L'index de popularité précalculé.
+        top_n (int): Le nombre d'articles populaires à retourner.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Pour chaque utilisateur, la même liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    recommendations = popularity.recommend(top_n, candidates)
+    return [recommendations] * len(user_ids)
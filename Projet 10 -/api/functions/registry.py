@@ -0,0 +1,117 @@
+# functions/registry.py
+import os
+import shutil
+import threading
+
+class ModelRegistry:
+    """
+    Registre versionné de modèles sauvegardés sur disque.
+
+    Chaque version est un sous-dossier `vNNNN` du dossier racine. Un nouveau modèle est d'abord
+    écrit dans un dossier temporaire puis renommé, de sorte qu'une version visible est toujours complète.
+    Le modèle servi est remplacé d'un seul coup, sans redémarrer l'API.
+
+    Args:
+        root (str): Le dossier racine du registre.
+        model_class (type): La classe du modèle, qui doit fournir `save(directory)` et `load(directory)`.
+        prepare (callable): Fonction optionnelle appliquée au modèle chargé avant qu'il ne soit servi
+                            (ex. construction d'un index de recherche).
+        keep (int): Le nombre de versions gardées sur disque après chaque publication
+                    (None : toutes les versions sont gardées).
+    """
+
+    def __init__(self, root: str, model_class: type, prepare=None, keep: int = None):
+        if keep is not None and keep < 1:
+            raise ValueError("keep doit être au moins 1")
+        self.root = root
+        self.model_class = model_class
+        self.prepare = prepare
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._current = (None, None)
+        os.makedirs(root, exist_ok=True)
+
+    def versions(self) -> list:
+        """
+        Returns:
+            list: Les versions publiées, de la plus ancienne à la plus récente.
+        """
+        # Tri numérique : v10000 vient après v9999
+        names = (name for name in os.listdir(self.root) if name.startswith("v") and name[1:].isdigit())
+        return sorted(names, key=lambda name: int(name[1:]))
+
+    def latest_version(self):
+        """
+        Returns:
+            str | None: La version publiée la plus récente, ou None si le registre est vide.
+        """
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def publish(self, model) -> str:
+        """
+        Sauvegarde un nouveau modèle sous une nouvelle version, puis supprime les anciennes
+        versions au-delà de `keep`.
+
+        Args:
+            model: Le modèle à publier.
+
+        Returns:
+            str: La version attribuée au modèle.
+        """
+        with self._lock:
+            latest = self.latest_version()
+            version = f"v{int(latest[1:]) + 1 if latest else 1:04d}"
+            tmp_dir = os.path.join(self.root, f".{version}.tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            model.save(tmp_dir)
+            os.rename(tmp_dir, os.path.join(self.root, version))
+        if self.keep is not None:
+            self.prune(self.keep)
+        return version
+
+    def prune(self, keep: int) -> list:
+        """
+        Supprime les versions les plus anciennes pour n'en garder que `keep`.
+        La version servie n'est jamais supprimée, même si elle est parmi les plus anciennes.
+
+        Args:
+            keep (int): Le nombre de versions les plus récentes à garder.
+
+        Returns:
+            list: Les versions supprimées.
+        """
+        with self._lock:
+            versions = self.versions()
+            stale = [version for version in versions[:max(len(versions) - keep, 0)] if version != self._current[0]]
+            for version in stale:
+                shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+        return stale
+
+    def load(self, version: str = None):
+        """
+        Charge une version (la plus récente par défaut) et en fait le modèle servi.
+
+        Args:
+            version (str): La version à charger.
+
+        Returns:
+            tuple: La version chargée et le modèle.
+        """
+        version = version or self.latest_version()
+        if version is None:
+            raise FileNotFoundError(f"Aucun modèle publié dans {self.root}")
+        model = self.model_class.load(os.path.join(self.root, version))
+        if self.prepare is not None:
+            self.prepare(model)
+        with self._lock:
+            self._current = (version, model)
+        return self._current
+
+    @property
+    def current(self):
+        """
+        Returns:
+            tuple: La version servie et le modèle correspondant (None, None si rien n'est chargé).
+        """
+        return self._current
@@ -1,6 +1,15 @@
 # functions/session_based.py
+import threading
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 
+from functions.id_map import IdMap
+from functions.metrics import record_fallback, stage
+from functions.popularity import PopularityIndex
+from functions.topn import top_n_indices
+
 def load_and_prepare_session_data(dataframe: pd.DataFrame):
     """
     Prépare les données à partir d'un DataFrame pour le filtrage basé sur les sessions.
@@ -17,14 +26,142 @@ def load_and_prepare_session_data(dataframe: pd.DataFrame):
     # Ici, on suppose qu'il est déjà triable
     return df_clean
 
-def get_session_based_recommendations(user_id: str, dataframe: pd.DataFrame, top_n: int = 5):
+@dataclass
+class UserClickIndex:
+    """
+    Index utilisateur -> historique de clics, au format CSR (décalages + valeurs).
+
+    Les clics de chaque utilisateur occupent une tranche contiguë de `article_ids`,
+    triée par horodatage croissant : un historique se lit par simple découpage.
+    Les clics ingérés après la construction sont gardés à part, par utilisateur, jusqu'à la
+    prochaine reconstruction de l'index.
+
+    Attributes:
+        user_ids (np.ndarray): IDs des utilisateurs, triés.
+        offsets (np.ndarray): Début de la tranche de chaque utilisateur (taille len(user_ids) + 1).
+        article_ids (np.ndarray): IDs des articles cliqués, groupés par utilisateur.
+        timestamps (np.ndarray): Horodatages des clics, alignés sur `article_ids`.
+        users (IdMap): Correspondance ID utilisateur <-> tranche de l'historique.
+    """
+    user_ids: np.ndarray
+    offsets: np.ndarray
+    article_ids: np.ndarray
+    timestamps: np.ndarray
+
+    def __post_init__(self):
+        self.users = IdMap(self.user_ids)
+        self._lock = threading.Lock()
+        self._appended = {}
+
+    @property
+    def empty(self) -> bool:
+        return len(self.article_ids) == 0 and not self._appended
+
+    def append(self, user_ids: np.ndarray, article_ids: np.ndarray, timestamps: np.ndarray):
+        """
+        Ajoute des clics ingérés après la construction de l'index.
+
+        Args:
+            user_ids (np.ndarray): Les IDs des utilisateurs de chaque clic.
+            article_ids (np.ndarray): Les IDs des articles cliqués.
+            timestamps (np.ndarray): Les horodatages des clics.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        order = np.lexsort((timestamps, user_ids))
+        user_ids = user_ids[order]
+        article_ids = np.asarray(article_ids, dtype=np.int32)[order]
+        timestamps = np.asarray(timestamps, dtype=np.int64)[order]
+        batch_users, starts = np.unique(user_ids, return_index=True)
+        with self._lock:
+            for user_id, start, end in zip(batch_users, starts, np.append(starts[1:], len(user_ids))):
+                previous_articles, previous_timestamps = self._appended.get(int(user_id), (article_ids[:0], timestamps[:0]))
+                self._appended[int(user_id)] = (
+                    np.concatenate([previous_articles, article_ids[start:end]]),
+                    np.concatenate([previous_timestamps, timestamps[start:end]]),
+                )
+
+    def compacted(self) -> "UserClickIndex":
+        """
+        Returns:
+            UserClickIndex: Un index au format CSR qui contient aussi les clics ajoutés par `append`
+                            (l'index lui-même s'il n'y en a pas).
+        """
+        with self._lock:
+            appended = dict(self._appended)
+        if not appended:
+            return self
+        users = np.concatenate([
+            np.repeat(np.asarray(self.user_ids, dtype=np.int64), np.diff(self.offsets)),
+            *(np.full(len(articles), user_id, dtype=np.int64) for user_id, (articles, _) in appended.items()),
+        ])
+        article_ids = np.concatenate([self.article_ids, *(articles for articles, _ in appended.values())]).astype(np.int32, copy=False)
+        timestamps = np.concatenate([self.timestamps, *(timestamps for _, timestamps in appended.values())]).astype(np.int64, copy=False)
+        # Tri stable : à horodatage égal, les clics de l'index gardent leur place avant les clics ajoutés, comme dans `history`
+        order = np.lexsort((timestamps, users))
+        user_ids, counts = np.unique(users[order], return_counts=True)
+        offsets = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return UserClickIndex(user_ids=user_ids, offsets=offsets, article_ids=article_ids[order], timestamps=timestamps[order])
+
+    def history(self, user_id: int):
+        """
+        Args:
+            user_id (int): L'ID de l'utilisateur.
+
+        Returns:
+            tuple: Les articles cliqués et leurs horodatages, du plus ancien au plus récent
+                   (tableaux vides si l'utilisateur est inconnu).
+        """
+        position = self.users.row(user_id)
+        if position is None:
+            articles, timestamps = self.article_ids[:0], self.timestamps[:0]
+        else:
+            start, end = self.offsets[position], self.offsets[position + 1]
+            articles, timestamps = self.article_ids[start:end], self.timestamps[start:end]
+
+        appended = self._appended.get(user_id)
+        if appended is None:
+            return articles, timestamps
+        articles = np.concatenate([articles, appended[0]])
+        timestamps = np.concatenate([timestamps, appended[1]])
+        order = np.argsort(timestamps, kind="stable")
+        return articles[order], timestamps[order]
+
+def build_user_click_index(dataframe: pd.DataFrame) -> UserClickIndex:
+    """
+    Construit l'index des historiques de clics par utilisateur.
+
+    Args:
+        dataframe (pd.DataFrame): Le DataFrame contenant les interactions utilisateur-article.
+
+    Returns:
+        UserClickIndex: L'index des historiques, triés par horodatage.
+    """
+    df_clean = load_and_prepare_session_data(dataframe)
+    users = df_clean['user_id'].to_numpy(dtype=np.int64)
+    timestamps = df_clean['click_timestamp'].to_numpy(dtype=np.int64)
+    order = np.lexsort((timestamps, users))
+
+    user_ids, counts = np.unique(users[order], return_counts=True)
+    offsets = np.zeros(len(user_ids) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return UserClickIndex(
+        user_ids=user_ids,
+        offsets=offsets,
+        article_ids=df_clean['click_article_id'].to_numpy(dtype=np.int32)[order],
+        timestamps=timestamps[order],
+    )
+
+def get_session_based_recommendations(user_id: str, click_index: UserClickIndex, popularity: PopularityIndex, top_n: int = 5, candidates=None):
     """
     Génère des recommandations basées sur la session d'un utilisateur.
 
     Args:
         user_id (str): L'ID de l'utilisateur (sous forme de chaîne).
-        dataframe (pd.DataFrame): Le DataFrame contenant les interactions.
+        click_index (UserClickIndex): L'index des historiques de clics par utilisateur.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
         top_n (int): Le nombre de recommandations à retourner.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
 
     Returns:
         list: Une liste de dictionnaires contenant 'article_id' et 'popularity'.
@@ -36,27 +173,42 @@ def get_session_based_recommendations(user_id: str, dataframe: pd.DataFrame, top
         # Si la conversion échoue, l'ID n'est pas valide
         return []
 
-    df_clean = load_and_prepare_session_data(dataframe) # On utilise la fonction pour nettoyer
-    user_clicks = df_clean[df_clean['user_id'] == user_id_int]
-    if user_clicks.empty:
+    with stage("get_session_based_recommendations", "history"):
+        user_articles, _ = click_index.history(user_id_int)
+    if len(user_articles) == 0:
         # Si l'utilisateur est inconnu, retourner les articles populaires
-        popular_articles = dataframe['click_article_id'].value_counts()
-        top_articles = popular_articles.head(top_n)
-        recommendations = [{"article_id": int(art_id), "popularity": int(count)} for art_id, count in top_articles.items()]
-        return recommendations
+        record_fallback("session-based", "unknown_user")
+        return popularity.recommend(top_n, candidates)
 
     # Exemple simplifié : recommander les articles les plus récents de la session utilisateur
-    recent_articles_df = user_clicks.sort_values('click_timestamp', ascending=False).head(top_n*2)
-    unique_recent_article_ids = recent_articles_df['click_article_id'].drop_duplicates().head(top_n).tolist()
-
-    # Calculer la popularité pour les articles de la session en utilisant le dataframe original
-    popularity_counts = dataframe['click_article_id'].value_counts()
-    recommendations = []
-    for article_id in unique_recent_article_ids:
-        pop_count = int(popularity_counts.get(article_id, 0))
-        recommendations.append({
-            "article_id": int(article_id), # Assurez-vous que c'est un entier
-            "popularity": pop_count
-        })
-
-    return recommendations
+    # Score de récence de chaque article distinct : position de son dernier clic dans l'historique
+    with stage("get_session_based_recommendations", "ranking"):
+        articles, last_from_end = np.unique(user_articles[::-1], return_index=True)
+        if candidates is not None:
+            eligible = candidates.contains(articles)
+            articles, last_from_end = articles[eligible], last_from_end[eligible]
+        unique_recent_article_ids = articles[top_n_indices(-last_from_end, top_n)]
+    if len(unique_recent_article_ids) == 0:
+        record_fallback("session-based", "no_candidates")
+        return popularity.recommend(top_n, candidates)
+
+    # Ajouter la popularité des articles recommandés depuis l'index précalculé
+    with stage("get_session_based_recommendations", "describe"):
+        return popularity.describe(unique_recent_article_ids)
+
+def get_session_based_recommendations_batch(user_ids: list, click_index: UserClickIndex, popularity: PopularityIndex, top_n: int = 5, candidates=None):
+    """
+    Génère les recommandations basées sur les sessions pour un lot d'utilisateurs.
+
+    Args:
+        user_ids (list): Les IDs des utilisateurs.
+        click_index (UserClickIndex): L'index des historiques de clics par utilisateur.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        top_n (int): Le nombre de recommandations par utilisateur.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Pour chaque utilisateur, dans l'ordre, une liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    # Chaque historique est une simple tranche de l'index : pas de calcul partagé à vectoriser
+    return [get_session_based_recommendations(user_id, click_index, popularity, top_n, candidates) for user_id in user_ids]
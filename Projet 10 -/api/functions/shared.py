@@ -0,0 +1,110 @@
+# functions/shared.py
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+
+from functions.covisitation import CovisitationIndex
+from functions.item_based import ItemSimilarityIndex
+from functions.popularity import PopularityIndex
+from functions.session_based import UserClickIndex
+
+def save_csr(directory: str, name: str, matrix: sparse.csr_matrix):
+    """
+    Sauvegarde une matrice CSR sous forme de trois fichiers `.npy` (data, indices, indptr), mappables en mémoire.
+    """
+    np.save(os.path.join(directory, f"{name}.data.npy"), matrix.data)
+    np.save(os.path.join(directory, f"{name}.indices.npy"), matrix.indices)
+    np.save(os.path.join(directory, f"{name}.indptr.npy"), matrix.indptr)
+    np.save(os.path.join(directory, f"{name}.shape.npy"), np.asarray(matrix.shape, dtype=np.int64))
+
+def load_csr(directory: str, name: str, mmap_mode: str = "r") -> sparse.csr_matrix:
+    """
+    Charge une matrice sauvegardée avec `save_csr`. Les tableaux gardant leur type d'index,
+    scipy les utilise tels quels : la matrice reste adossée aux fichiers mappés.
+    """
+    arrays = [np.load(os.path.join(directory, f"{name}.{part}.npy"), mmap_mode=mmap_mode) for part in ("data", "indices", "indptr")]
+    shape = tuple(int(size) for size in np.load(os.path.join(directory, f"{name}.shape.npy")))
+    return sparse.csr_matrix(tuple(arrays), shape=shape, copy=False)
+
+@dataclass
+class ServingIndexes:
+    """
+    Index servis par l'API, publiés une fois par le processus superviseur puis mappés en mémoire
+    (lecture seule) par chaque worker : les pages sont partagées entre les processus par le cache
+    du système, la mémoire ne croît pas avec le nombre de workers.
+
+    Se publie dans un `ModelRegistry` comme les modèles SVD et ALS.
+
+    Attributes:
+        click_index (UserClickIndex): L'index des historiques de clics.
+        similarity_index (ItemSimilarityIndex): L'index de similarité item-item.
+        covisitation_index (CovisitationIndex): L'index de co-visitation.
+        popularity_counts (np.ndarray): Le nombre de clics de chaque article.
+    """
+    click_index: UserClickIndex
+    similarity_index: ItemSimilarityIndex
+    covisitation_index: CovisitationIndex
+    popularity_counts: np.ndarray
+
+    def popularity(self) -> PopularityIndex:
+        """
+        Returns:
+            PopularityIndex: Un index de popularité propre au processus (il est mis à jour à chaque clic ingéré,
+                             et ne coûte qu'un compteur par article).
+        """
+        return PopularityIndex.from_counts(self.popularity_counts)
+
+    def save(self, directory: str):
+        """
+        Args:
+            directory (str): Le dossier de destination (créé s'il n'existe pas).
+        """
+        os.makedirs(directory, exist_ok=True)
+        # Les clics ingérés depuis la construction de l'index sont fusionnés dans les tableaux publiés
+        click_index = self.click_index.compacted()
+        arrays = {
+            "click_user_ids": click_index.user_ids,
+            "click_offsets": click_index.offsets,
+            "click_article_ids": click_index.article_ids,
+            "click_timestamps": click_index.timestamps,
+            "similarity_user_ids": self.similarity_index.user_ids,
+            "similarity_article_ids": self.similarity_index.article_ids,
+            "popularity_counts": self.popularity_counts,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+        save_csr(directory, "user_item", self.similarity_index.user_item)
+        save_csr(directory, "similarity", self.similarity_index.similarity)
+        save_csr(directory, "covisitation", self.covisitation_index.neighbours)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = "r"):
+        """
+        Args:
+            directory (str): Le dossier écrit par `save`.
+            mmap_mode (str): Mode de mapping mémoire passé à `np.load` (None pour tout charger).
+
+        Returns:
+            ServingIndexes: Les index, adossés aux fichiers mappés.
+        """
+        def array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        return cls(
+            click_index=UserClickIndex(
+                user_ids=array("click_user_ids"),
+                offsets=array("click_offsets"),
+                article_ids=array("click_article_ids"),
+                timestamps=array("click_timestamps"),
+            ),
+            similarity_index=ItemSimilarityIndex(
+                user_ids=array("similarity_user_ids"),
+                article_ids=array("similarity_article_ids"),
+                user_item=load_csr(directory, "user_item", mmap_mode),
+                similarity=load_csr(directory, "similarity", mmap_mode),
+            ),
+            covisitation_index=CovisitationIndex(neighbours=load_csr(directory, "covisitation", mmap_mode)),
+            popularity_counts=array("popularity_counts"),
+        )
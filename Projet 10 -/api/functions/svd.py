@@ -1,8 +1,20 @@
 # functions/svd.py
+import os
+from dataclasses import dataclass
+
 import pandas as pd
-from scipy.sparse.linalg import svds
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator, svds
 import numpy as np
 
+from functions.id_map import IdMap
+from functions.interactions import InteractionMatrix, build_interaction_matrix
+from functions.metrics import MATRIX_NNZ, build_timer, record_fallback, stage
+from functions.popularity import PopularityIndex
+from functions.session_based import UserClickIndex
+from functions.ann import ArticleVectorIndex
+from functions.latent import best_articles, user_history
+
 def load_and_prepare_svd_data(dataframe: pd.DataFrame):
     """
     Prépare les données à partir d'un DataFrame pour le filtrage collaboratif basé sur SVD.
@@ -11,132 +23,326 @@ def load_and_prepare_svd_data(dataframe: pd.DataFrame):
         dataframe (pd.DataFrame): Le DataFrame contenant les interactions utilisateur-article.
 
     Returns:
-        tuple: Un tuple contenant le DataFrame, la matrice d'interaction,
-               les IDs des utilisateurs et des articles.
+        tuple: Un tuple contenant le DataFrame nettoyé et la matrice d'interaction creuse
+               (qui porte les IDs des utilisateurs et des articles).
     """
     # Assurez-vous que le DataFrame est nettoyé
-    df_clean = dataframe.dropna(subset=['click_article_id'])
-
-    interaction_matrix = df_clean.pivot_table(
-        index='user_id',
-        columns='click_article_id',
-        values='click_timestamp',
-        aggfunc='count',
-        fill_value=0
+    with stage("load_and_prepare_svd_data", "clean"):
+        df_clean = dataframe.dropna(subset=['click_article_id'])
+    with stage("load_and_prepare_svd_data", "interaction_matrix"):
+        interaction_matrix = build_interaction_matrix(df_clean)
+    MATRIX_NNZ.set(interaction_matrix.counts.nnz, matrix="interactions")
+    return df_clean, interaction_matrix
+
+def _centered_operator(matrix: sparse.csr_matrix, row_means: np.ndarray) -> LinearOperator:
+    """
+    Opérateur linéaire représentant `matrix - row_means` sans jamais densifier la matrice.
+
+    Args:
+        matrix (sparse.csr_matrix): La matrice creuse à centrer.
+        row_means (np.ndarray): La moyenne de chaque ligne.
+
+    Returns:
+        LinearOperator: L'opérateur centré, utilisable directement par `svds`.
+    """
+    row_means = row_means.reshape(-1, 1)
+
+    def matmat(block):
+        block = block.reshape(matrix.shape[1], -1)
+        return matrix @ block - row_means @ block.sum(axis=0, keepdims=True)
+
+    def rmatmat(block):
+        block = block.reshape(matrix.shape[0], -1)
+        return matrix.T @ block - (row_means.T @ block)
+
+    return LinearOperator(
+        shape=matrix.shape,
+        matvec=lambda vector: matmat(vector).ravel(),
+        rmatvec=lambda vector: rmatmat(vector).ravel(),
+        matmat=matmat,
+        rmatmat=rmatmat,
+        dtype=np.float64,
     )
-    user_ids = interaction_matrix.index.tolist()
-    article_ids = interaction_matrix.columns.tolist()
-    return df_clean, interaction_matrix, user_ids, article_ids
 
-def train_svd_model(interaction_matrix: pd.DataFrame, n_components: int = 50):
+@dataclass
+class SVDModel:
+    """
+    Modèle SVD entraîné une seule fois : facteurs latents et index nécessaires à la prédiction.
+
+    Attributes:
+        user_ids (np.ndarray): IDs des utilisateurs, dans l'ordre des lignes de U.
+        article_ids (np.ndarray): IDs des articles, dans l'ordre des colonnes de Vt.
+        user_means (np.ndarray): Moyenne d'interaction de chaque utilisateur (centrage).
+        U (np.ndarray): Facteurs latents des utilisateurs.
+        sigma (np.ndarray): Valeurs singulières.
+        Vt (np.ndarray): Facteurs latents des articles (transposés).
+        users (IdMap): Correspondance ID utilisateur <-> ligne de U.
+        articles (IdMap): Correspondance ID article <-> colonne de Vt.
+    """
+    user_ids: np.ndarray
+    article_ids: np.ndarray
+    user_means: np.ndarray
+    U: np.ndarray
+    sigma: np.ndarray
+    Vt: np.ndarray
+
+    FIELDS = ("user_ids", "article_ids", "user_means", "U", "sigma", "Vt")
+
+    def __post_init__(self):
+        self.users = IdMap(self.user_ids)
+        self.articles = IdMap(self.article_ids)
+        self.article_index = None
+        self._article_vectors = None
+        # Somme des colonnes de Vt : terme de centrage du fold-in, calculé une seule fois
+        self.vt_column_sum = np.asarray(self.Vt).sum(axis=1)
+
+    def fold_in(self, article_ids: np.ndarray):
+        """
+        Projette l'historique d'un utilisateur absent de l'entraînement sur les facteurs des articles :
+        u = (x - moyenne) · Vtᵀ · Σ⁻¹, sans réentraîner le modèle.
+
+        Args:
+            article_ids (np.ndarray): Les IDs des articles cliqués (un élément par clic).
+
+        Returns:
+            tuple | None: Le vecteur latent de l'utilisateur et sa moyenne d'interaction,
+                          ou None si aucun article n'est connu du modèle.
+        """
+        columns = self.articles.rows(article_ids)
+        columns = columns[columns >= 0]
+        if len(columns) == 0:
+            return None
+        # Vecteur de comptage x implicite : la somme des colonnes cliquées de Vt vaut x · Vtᵀ
+        user_mean = len(columns) / len(self.article_ids)
+        projection = np.asarray(self.Vt[:, columns]).sum(axis=1) - user_mean * self.vt_column_sum
+        safe_sigma = np.where(self.sigma > 0, self.sigma, np.inf)
+        return projection / safe_sigma, user_mean
+
+    def article_vectors(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Les vecteurs des articles mis à l'échelle par sigma (articles x composants) :
+                        le score d'un article est le produit scalaire avec `U[utilisateur]`, à la moyenne près.
+        """
+        if self._article_vectors is not None:
+            return self._article_vectors
+        return (self.sigma[:, None] * self.Vt).T
+
+    def build_article_index(self, mode: str = "exact"):
+        """
+        Construit l'index de recherche par produit scalaire maximal sur les vecteurs des articles.
+
+        Args:
+            mode (str): "exact" ou "approx" (HNSW).
+        """
+        self.article_index = ArticleVectorIndex(self.article_vectors(), mode=mode)
+
+    def save(self, directory: str):
+        """
+        Sauvegarde le modèle sous forme de fichiers `.npy` (un par tableau), mappables en mémoire.
+
+        Args:
+            directory (str): Le dossier de destination (créé s'il n'existe pas).
+        """
+        os.makedirs(directory, exist_ok=True)
+        for field in self.FIELDS:
+            np.save(os.path.join(directory, f"{field}.npy"), getattr(self, field))
+        # Vecteurs de l'index de recherche, déjà au format attendu : mappés tels quels par chaque worker
+        np.save(os.path.join(directory, "article_vectors.npy"), np.ascontiguousarray(self.article_vectors(), dtype=np.float32))
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = "r"):
+        """
+        Charge un modèle sauvegardé avec `save`.
+
+        Args:
+            directory (str): Le dossier contenant les fichiers `.npy`.
+            mmap_mode (str): Mode de mapping mémoire passé à `np.load` (None pour tout charger).
+
+        Returns:
+            SVDModel: Le modèle chargé.
+        """
+        arrays = {field: np.load(os.path.join(directory, f"{field}.npy"), mmap_mode=mmap_mode) for field in cls.FIELDS}
+        model = cls(**arrays)
+        vectors_path = os.path.join(directory, "article_vectors.npy")
+        if os.path.exists(vectors_path):
+            model._article_vectors = np.load(vectors_path, mmap_mode=mmap_mode)
+        return model
+
+    def predict(self, user_row: int) -> np.ndarray:
+        """
+        Calcule les scores prédits de tous les articles pour une ligne utilisateur.
+
+        Args:
+            user_row (int): L'indice de l'utilisateur dans U.
+
+        Returns:
+            np.ndarray: Le vecteur des scores, dans l'ordre de `article_ids`.
+        """
+        return self.predict_vectors(self.U[user_row][None, :], self.user_means[[user_row]])[0]
+
+    def predict_batch(self, user_rows: np.ndarray) -> np.ndarray:
+        """
+        Calcule en une seule opération les scores de tous les articles pour plusieurs utilisateurs.
+
+        Args:
+            user_rows (np.ndarray): Les indices des utilisateurs dans U.
+
+        Returns:
+            np.ndarray: La matrice des scores (utilisateurs x articles).
+        """
+        return self.predict_vectors(self.U[user_rows], self.user_means[user_rows])
+
+    def predict_vectors(self, user_vectors: np.ndarray, user_means: np.ndarray) -> np.ndarray:
+        """
+        Calcule les scores de tous les articles à partir de vecteurs latents (lignes de U ou fold-in).
+
+        Args:
+            user_vectors (np.ndarray): Les vecteurs latents (utilisateurs x composants).
+            user_means (np.ndarray): La moyenne d'interaction de chaque utilisateur.
+
+        Returns:
+            np.ndarray: La matrice des scores (utilisateurs x articles).
+        """
+        return (user_vectors * self.sigma) @ self.Vt + np.asarray(user_means)[:, None]
+
+def train_svd_model(interaction_matrix: InteractionMatrix, n_components: int = 50) -> SVDModel:
     """
     Entraîne un modèle SVD sur la matrice d'interaction.
 
     Args:
-        interaction_matrix (pd.DataFrame): La matrice d'interaction utilisateur-article.
+        interaction_matrix (InteractionMatrix): La matrice d'interaction creuse utilisateur-article.
         n_components (int): Le nombre de composants latents pour SVD.
 
     Returns:
-        tuple: Le modèle SVD (non utilisé directement ici mais potentiellement utile),
-               les matrices U et Vt.
+        SVDModel: Le modèle entraîné (U, sigma, Vt, moyennes et index des IDs).
     """
-    user_item_matrix = interaction_matrix.values
-    mean_user_rating = user_item_matrix.mean(axis=1)
-    user_item_matrix_normalized = user_item_matrix - mean_user_rating.reshape(-1, 1)
+    with build_timer("svd"):
+        with stage("train_svd_model", "centering"):
+            user_item_matrix = interaction_matrix.counts.astype(np.float64)
+            mean_user_rating = np.asarray(user_item_matrix.mean(axis=1)).ravel()
+            # Le centrage par utilisateur est appliqué implicitement par l'opérateur
+            user_item_matrix_normalized = _centered_operator(user_item_matrix, mean_user_rating)
+
+        # S'assurer que k est inférieur à la taille minimale de la matrice
+        k = min(n_components, min(user_item_matrix_normalized.shape) - 1)
+        with stage("train_svd_model", "svds"):
+            U, sigma, Vt = svds(user_item_matrix_normalized, k=k)
+    return SVDModel(
+        user_ids=interaction_matrix.user_ids,
+        article_ids=interaction_matrix.article_ids,
+        user_means=mean_user_rating,
+        U=U,
+        sigma=sigma,
+        Vt=Vt,
+    )
+
+def _latent_vector(user_id: int, model: SVDModel, click_index: UserClickIndex = None):
+    """
+    Retourne le vecteur latent et la moyenne d'un utilisateur : sa ligne de U s'il est connu du modèle,
+    sinon la projection (fold-in) de son historique de clics.
+    """
+    user_row_index = model.users.row(user_id)
+    if user_row_index is not None:
+        return model.U[user_row_index], model.user_means[user_row_index]
+    if click_index is None:
+        return None
+    user_articles, _ = click_index.history(user_id)
+    return model.fold_in(user_articles)
+
+def svd_scores(user_id: int, model: SVDModel, top_n: int, click_index: UserClickIndex = None, candidates=None):
+    """
+    Retourne les `top_n` meilleurs articles SVD d'un utilisateur avec leur score (produit scalaire latent).
+
+    Args:
+        user_id (int): L'ID de l'utilisateur.
+        model (SVDModel): Le modèle SVD entraîné.
+        top_n (int): Le nombre d'articles candidats.
+        click_index (UserClickIndex): L'index des historiques de clics, pour le fold-in et l'exclusion
+                                      des articles déjà consultés.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
 
-    # S'assurer que k est inférieur à la taille minimale de la matrice
-    k = min(n_components, min(user_item_matrix_normalized.shape) - 1)
-    U, sigma, Vt = svds(user_item_matrix_normalized, k=k)
-    sigma = np.diag(sigma)
-    return None, U, Vt # On ne retourne pas le modèle complet, mais les matrices dérivées
+    Returns:
+        tuple | None: Les IDs des articles et leurs scores, ou None sans vecteur latent pour l'utilisateur.
+    """
+    latent = _latent_vector(user_id, model, click_index)
+    if latent is None:
+        return None
+    user_vector, _ = latent
+    history = user_history(user_id, click_index)
+    return best_articles(model.articles, model.article_vectors(), model.article_index, user_vector[None, :], [history], top_n, candidates)[0]
 
-def get_svd_recommendations(user_id: int, dataframe: pd.DataFrame, interaction_matrix: pd.DataFrame, user_ids: list, article_ids: list, U_latent: np.ndarray, V_latent: np.ndarray, top_n: int = 5):
+def get_svd_recommendations(user_id: int, popularity: PopularityIndex, model: SVDModel, top_n: int = 5, click_index: UserClickIndex = None, candidates=None):
     """
     Génère des recommandations basées sur SVD pour un utilisateur donné.
 
     Args:
         user_id (int): L'ID de l'utilisateur.
-        dataframe (pd.DataFrame): Le DataFrame original pour calculer la popularité.
-        interaction_matrix (pd.DataFrame): La matrice d'interaction utilisée pour l'entraînement.
-        user_ids (list): Liste des IDs des utilisateurs correspondant à U.
-        article_ids (list): Liste des IDs des articles correspondant à V.
-        U_latent (np.ndarray): Matrice U résultant de SVD.
-        V_latent (np.ndarray): Matrice V transposée résultant de SVD.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        model (SVDModel): Le modèle SVD entraîné.
         top_n (int): Le nombre de recommandations à retourner.
+        click_index (UserClickIndex): L'index des historiques de clics, pour exclure les articles déjà
+                                      consultés et projeter (fold-in) les utilisateurs absents de l'entraînement.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
 
     Returns:
         list: Une liste de dictionnaires contenant 'article_id' et 'popularity'.
     """
-    if user_id not in user_ids:
-        # Si l'utilisateur est inconnu, retourner les articles populaires
-        popular_articles = dataframe['click_article_id'].value_counts()
-        top_articles = popular_articles.head(top_n)
-        recommendations = [{"article_id": int(art_id), "popularity": int(count)} for art_id, count in top_articles.items()]
-        return recommendations
-
-    try:
-        user_row_index = user_ids.index(user_id)
-    except ValueError:
-        # L'utilisateur n'est pas dans la liste des IDs connus du modèle
-        # Cela ne devrait pas arriver si user_id est dans user_ids, mais on le gère quand même
-        return []
-
-    # Calcul de la prédiction pour l'utilisateur spécifique
-    # Calculer la moyenne de l'utilisateur à partir de la matrice d'interaction originale
-    mean_user_rating_matrix = interaction_matrix.mean(axis=1)
-    mean_user_rating = mean_user_rating_matrix.loc[user_id]
-
-    # Recalculer sigma à partir de U, Vt et de la matrice normalisée
-    # On peut le recalculer comme ceci : sigma = U^T * (M - mean_user) * V
-    # Mais c'est plus simple de le garder si on l'a.
-    # Pour simplifier, on suppose qu'on peut recalculer sigma comme les valeurs singulières
-    # En fait, svds retourne U, sigma, Vt. On a donc sigma.
-    # Mais on l'a séparé dans train_svd_model.
-    # Pour prédire, on fait U[user_idx] @ diag(sigma) @ Vt
-    user_pred_scores = U_latent[user_row_index, :] @ V_latent # On omet sigma ici, ce qui est incorrect.
-    # CORRECTION : On doit avoir sigma. On le recalcule ou on le passe.
-    # Pour cette version, on va supposer qu'on peut le recalculer ou qu'on l'a gardé.
-    # La fonction train_svd_model ne retourne pas sigma directement, mais on peut le faire ici.
-    # On refait le calcul de SVD pour récupérer sigma, ce qui n'est pas optimal.
-    # Une meilleure façon est de retourner sigma dans train_svd_model.
-    # Modifions train_svd_model et get_svd_recommendations.
-    # --- train_svd_model ---
-    # def train_svd_model(interaction_matrix: pd.DataFrame, n_components: int = 50):
-    #     user_item_matrix = interaction_matrix.values
-    #     mean_user_rating = user_item_matrix.mean(axis=1)
-    #     user_item_matrix_normalized = user_item_matrix - mean_user_rating.reshape(-1, 1)
-    #     k = min(n_components, min(user_item_matrix_normalized.shape) - 1)
-    #     U, sigma, Vt = svds(user_item_matrix_normalized, k=k)
-    #     return None, U, Vt, sigma
-    # --- get_svd_recommendations ---
-    # def get_svd_recommendations(user_id: int, dataframe, interaction_matrix, user_ids, article_ids, U_latent, V_latent, sigma, top_n=5):
-    #     ...
-    #     user_pred_scores = U_latent[user_row_index, :] @ np.diag(sigma) @ V_latent
-    #     ...
-    # MAIS pour garder la signature demandée, on va recalculer sigma ici, ce qui est inefficace.
-    # On fait SVD à nouveau.
-    user_item_matrix_full = interaction_matrix.values
-    mean_user_rating_full = user_item_matrix_full.mean(axis=1)
-    user_item_matrix_normalized_full = user_item_matrix_full - mean_user_rating_full.reshape(-1, 1)
-    _, sigma_full, _ = svds(user_item_matrix_normalized_full, k=U_latent.shape[1])
-    sigma_diag = np.diag(sigma_full)
-
-    user_pred_scores = U_latent[user_row_index, :] @ sigma_diag @ V_latent
-    # Ajouter la moyenne de l'utilisateur
-    user_pred_scores += mean_user_rating # Cette moyenne est scalaire pour l'utilisateur
-
-    # Obtenir les indices des articles les mieux notés
-    top_articles_indices = user_pred_scores.argsort()[-top_n:][::-1]
-    recommended_article_ids = [article_ids[i] for i in top_articles_indices]
-
-    # Calculer la popularité pour les articles recommandés en utilisant le dataframe original
-    popularity_counts = dataframe['click_article_id'].value_counts()
-    recommendations = []
-    for article_id in recommended_article_ids:
-        pop_count = int(popularity_counts.get(article_id, 0))
-        recommendations.append({
-            "article_id": int(article_id), # Assurez-vous que c'est un entier
-            "popularity": pop_count
-        })
+    with stage("get_svd_recommendations", "latent_vector"):
+        latent = _latent_vector(user_id, model, click_index)
+    if latent is None:
+        # Si l'utilisateur est inconnu (et sans historique exploitable), retourner les articles populaires
+        record_fallback("svd", "unknown_user")
+        return popularity.recommend(top_n, candidates)
+
+    # Une ligne (ou un fold-in) et un produit matrice-vecteur : u @ diag(sigma) @ Vt
+    # (la moyenne de l'utilisateur ne change pas le classement)
+    user_vector, _ = latent
+    with stage("get_svd_recommendations", "search"):
+        history = user_history(user_id, click_index)
+        recommended_article_ids, _ = best_articles(model.articles, model.article_vectors(), model.article_index, user_vector[None, :], [history], top_n, candidates)[0]
+    if len(recommended_article_ids) == 0:
+        record_fallback("svd", "no_candidates")
+        return popularity.recommend(top_n, candidates)
 
+    # Ajouter la popularité des articles recommandés depuis l'index précalculé
+    with stage("get_svd_recommendations", "describe"):
+        return popularity.describe(recommended_article_ids)
+
+def get_svd_recommendations_batch(user_ids: list, popularity: PopularityIndex, model: SVDModel, top_n: int = 5, click_index: UserClickIndex = None, candidates=None):
+    """
+    Génère les recommandations SVD pour un lot d'utilisateurs en une seule opération :
+    `U[lignes] @ diag(sigma) @ Vt`, puis un top-N par `argpartition` sur chaque ligne.
+
+    Args:
+        user_ids (list): Les IDs des utilisateurs.
+        popularity (PopularityIndex): L'index de popularité (repli et popularité des recommandations).
+        model (SVDModel): Le modèle SVD entraîné.
+        top_n (int): Le nombre de recommandations par utilisateur.
+        click_index (UserClickIndex): L'index des historiques de clics, pour exclure les articles déjà
+                                      consultés et projeter (fold-in) les utilisateurs absents de l'entraînement.
+        candidates (CandidateSet): Les articles éligibles (None : tout le catalogue).
+
+    Returns:
+        list: Pour chaque utilisateur, dans l'ordre, une liste de dictionnaires contenant 'article_id' et 'popularity'.
+    """
+    histories = [user_history(int(user_id), click_index) for user_id in user_ids]
+    user_rows = model.users.rows(user_ids)
+    scored = user_rows >= 0
+    user_vectors = np.zeros((len(user_rows), len(model.sigma)))
+    user_vectors[scored] = model.U[user_rows[scored]]
+    for position in np.flatnonzero(~scored):
+        folded = model.fold_in(histories[position])
+        if folded is not None:
+            user_vectors[position], _ = folded
+            scored[position] = True
+
+    scored_histories = [history for history, is_scored in zip(histories, scored) if is_scored]
+    best = iter(best_articles(model.articles, model.article_vectors(), model.article_index, user_vectors[scored], scored_histories, top_n, candidates))
+    # Les utilisateurs sans vecteur latent retombent sur la popularité
+    fallback = popularity.recommend(top_n, candidates)
+    recommendations = []
+    for is_scored in scored:
+        articles = next(best)[0] if is_scored else []
+        recommendations.append(popularity.describe(articles) if len(articles) else fallback)
     return recommendations
@@ -0,0 +1,47 @@
+# functions/topn.py
+import numpy as np
+
+def top_n_indices(scores: np.ndarray, top_n: int, exclude: np.ndarray = None) -> np.ndarray:
+    """
+    Sélectionne les indices des `top_n` meilleurs scores d'un vecteur, triés par score décroissant.
+
+    `np.argpartition` isole les candidats en O(n), seuls ces `top_n` candidats sont ensuite triés.
+
+    Args:
+        scores (np.ndarray): Le vecteur des scores.
+        top_n (int): Le nombre d'indices à retourner.
+        exclude (np.ndarray): Masque booléen optionnel des indices à écarter (ex. articles déjà consultés).
+
+    Returns:
+        np.ndarray: Les indices retenus (au plus `top_n`, moins si trop d'indices sont exclus).
+    """
+    return top_n_indices_batch(scores[None, :], top_n, None if exclude is None else exclude[None, :])[0]
+
+def top_n_indices_batch(scores: np.ndarray, top_n: int, exclude: np.ndarray = None) -> list:
+    """
+    Sélectionne, pour chaque ligne d'une matrice, les indices des `top_n` meilleurs scores.
+
+    Args:
+        scores (np.ndarray): La matrice des scores (lignes x éléments).
+        top_n (int): Le nombre d'indices à retourner par ligne.
+        exclude (np.ndarray): Masque booléen optionnel (même forme que `scores`) des éléments à écarter.
+
+    Returns:
+        list: Pour chaque ligne, les indices retenus triés par score décroissant.
+    """
+    n_rows, n_items = scores.shape
+    top_n = min(top_n, n_items)
+    if top_n <= 0:
+        return [np.empty(0, dtype=np.int64) for _ in range(n_rows)]
+    if exclude is not None:
+        scores = np.where(exclude, -np.inf, scores)
+
+    candidates = np.argpartition(scores, -top_n, axis=1)[:, -top_n:]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    if exclude is None:
+        return list(candidates)
+    # Les éléments exclus, classés en dernier, sont retirés des lignes où il manque des candidats
+    kept = ~np.take_along_axis(exclude, candidates, axis=1)
+    return [row[keep] for row, keep in zip(candidates, kept)]
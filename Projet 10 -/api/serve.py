@@ -0,0 +1,42 @@
+# serve.py
+"""
+Lance l'API en mode multi-processus : un superviseur et N workers uvicorn.
+
+Le superviseur charge les clics, entraîne les modèles si besoin et publie les index servis
+(historiques, similarité item-item, co-visitation, popularité) dans models/indexes. Chaque worker
+mappe ensuite en mémoire, en lecture seule, ces index et les modèles SVD / ALS / embeddings :
+les pages sont partagées par le cache du système, la mémoire ne croît pas avec le nombre de workers.
+
+Le superviseur reste seul à réentraîner (toutes les REFRESH_INTERVAL_SECONDS) et à ingérer le dossier
+CLICKS_WATCH_DIR ; les workers basculent sur chaque nouvelle version publiée (SYNC_INTERVAL_SECONDS).
+`POST /clicks` dépose les lots dans CLICKS_WATCH_DIR, qui est donc requis pour l'ingestion ; le superviseur
+archive chaque fichier (CLICKS_ARCHIVE_DIR) une fois ses clics compactés dans un réentraînement.
+
+Usage (depuis le dossier api/) :
+    python serve.py [--workers 4] [--host 0.0.0.0] [--port 8005]
+"""
+import argparse
+import os
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8005)
+    args = parser.parse_args()
+
+    # Le superviseur construit et publie tout avant de lancer les workers
+    os.environ["SERVING_MODE"] = "standalone"
+    os.environ["PUBLISH_INDEXES"] = "1"
+    import api
+    from functions.ingestion import PeriodicRefresher
+
+    PeriodicRefresher(api.refresh_models, interval=api.REFRESH_INTERVAL_SECONDS).start()
+    if api.CLICKS_WATCH_DIR:
+        api.click_file_watcher().start()
+
+    # Les workers sont des processus neufs (spawn) qui importent api en mode "shared"
+    os.environ["SERVING_MODE"] = "shared"
+    os.environ["PUBLISH_INDEXES"] = "0"
+    import uvicorn
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
@@ -0,0 +1,77 @@
+# tests/conftest.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Les modules de l'API s'importent comme depuis le dossier api/ (from functions.x import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def clicks() -> pd.DataFrame:
+    """
+    Un petit log de clics synthétique : 200 utilisateurs, 60 articles, popularité asymétrique.
+    """
+    rng = np.random.default_rng(0)
+    n_clicks = 3000
+    return pd.DataFrame({
+        "user_id": rng.integers(0, 200, n_clicks),
+        "session_id": rng.integers(0, 600, n_clicks),
+        "click_article_id": np.minimum(rng.zipf(1.5, n_clicks) - 1, 59),
+        "click_timestamp": 1_506_826_800_000 + np.sort(rng.integers(0, 3_600_000, n_clicks)),
+    })
+
+@pytest.fixture(scope="session")
+def api_data(tmp_path_factory) -> dict:
+    """
+    Un jeu de données complet pour l'API, écrit sur disque : clics, métadonnées et embeddings des articles.
+
+    Returns:
+        dict: Les chemins écrits, par variable d'environnement de l'API.
+    """
+    directory = tmp_path_factory.mktemp("api_data")
+    rng = np.random.default_rng(1)
+    n_clicks, n_articles = 6000, 120
+    users = rng.integers(0, 400, n_clicks)
+    timestamps = 1_506_826_800_000 + np.sort(rng.integers(0, 6 * 3_600_000, n_clicks))
+    pd.DataFrame({
+        "user_id": users,
+        "session_id": users * 1000 + (timestamps - timestamps[0]) // 3_600_000,
+        "session_start": timestamps,
+        "session_size": 2,
+        "click_article_id": np.minimum(rng.zipf(1.3, n_clicks) - 1, n_articles - 1),
+        "click_timestamp": timestamps,
+        **{column: 1 for column in ("click_environment", "click_deviceGroup", "click_os", "click_country", "click_region", "click_referrer_type")},
+    }).to_csv(directory / "clicks.csv", index=False)
+    pd.DataFrame({
+        "article_id": np.arange(n_articles),
+        "category_id": np.arange(n_articles) % 5,
+        "created_at_ts": 1_506_800_000_000 + np.arange(n_articles) * 60_000,
+        "publisher_id": 0,
+        "words_count": 200,
+    }).to_csv(directory / "articles_metadata.csv", index=False)
+    pd.to_pickle(rng.normal(size=(n_articles, 16)).astype(np.float32), directory / "articles_embeddings.pickle")
+    return {
+        "CLICKS_PATH": str(directory / "clicks.csv"),
+        "ARTICLES_METADATA_PATH": str(directory / "articles_metadata.csv"),
+        "EMBEDDINGS_PATH": str(directory / "articles_embeddings.pickle"),
+        "MODELS_DIR": str(directory / "models"),
+    }
+
+@pytest.fixture(scope="session")
+def api(api_data):
+    """
+    Le module `api`, importé une fois pour la session sur `api_data` (les registres sont écrits dans le dossier temporaire).
+    """
+    os.environ.update(api_data)
+    import api
+    return api
+
+@pytest.fixture(scope="session")
+def client(api):
+    from fastapi.testclient import TestClient
+
+    with TestClient(api.app) as client:
+        yield client
@@ -0,0 +1,65 @@
+# tests/test_als.py
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from functions import als
+from functions.als import get_als_recommendations, get_als_recommendations_batch, train_als_model
+from functions.interactions import build_interaction_matrix
+from functions.popularity import PopularityIndex
+from functions.session_based import build_user_click_index
+
+def exact_solution(confidence, fixed, regularization):
+    # Équation normale de chaque ligne, formée explicitement : (YᵀCᵤY + λI) xᵤ = YᵀCᵤpᵤ avec Cᵤ = 1 + c
+    solution = np.zeros((confidence.shape[0], fixed.shape[1]))
+    for row in range(confidence.shape[0]):
+        c = 1.0 + confidence[row].toarray()[0]
+        preference = (confidence[row].toarray()[0] > 0).astype(float)
+        A = (fixed.T * c) @ fixed + regularization * np.eye(fixed.shape[1])
+        solution[row] = np.linalg.solve(A, (fixed.T * c) @ preference)
+    return solution
+
+def test_conjugate_gradient_reaches_the_exact_least_squares(clicks, monkeypatch):
+    # Des tranches de 200 clics : plusieurs tâches pour le pool de threads
+    monkeypatch.setattr(als, "CHUNK_NNZ", 200)
+    confidence = (build_interaction_matrix(clicks).counts * 2.0).astype(np.float64).tocsr()
+    fixed = np.random.default_rng(0).normal(size=(confidence.shape[1], 6))
+    solution = np.zeros((confidence.shape[0], 6))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        # En arithmétique exacte, k pas de gradient conjugué résolvent un système k x k
+        als._least_squares(confidence, solution, fixed, 0.1, executor, cg_steps=12)
+    np.testing.assert_allclose(solution, exact_solution(confidence, fixed, 0.1), rtol=1e-6, atol=1e-8)
+
+def test_training_is_independent_of_the_thread_count(clicks, monkeypatch):
+    monkeypatch.setattr(als, "CHUNK_NNZ", 500)
+    interaction_matrix = build_interaction_matrix(clicks)
+    single = train_als_model(interaction_matrix, factors=8, iterations=3, n_threads=1)
+    threaded = train_als_model(interaction_matrix, factors=8, iterations=3, n_threads=4)
+    np.testing.assert_array_equal(single.user_factors, threaded.user_factors)
+    np.testing.assert_array_equal(single.item_factors, threaded.item_factors)
+
+def test_clicked_articles_score_above_the_others(clicks):
+    interaction_matrix = build_interaction_matrix(clicks)
+    model = train_als_model(interaction_matrix, factors=8, iterations=5)
+    scores = model.user_factors @ model.item_factors.T
+    clicked = interaction_matrix.binary.toarray() > 0
+    assert scores[clicked].mean() > 0.5 > scores[~clicked].mean()
+
+@pytest.fixture(params=[False, True], ids=["scores", "article_index"])
+def engine(request, clicks):
+    model = train_als_model(build_interaction_matrix(clicks), factors=8, iterations=5)
+    if request.param:
+        model.build_article_index("exact")
+    return model, build_user_click_index(clicks), PopularityIndex.from_dataframe(clicks)
+
+def test_recommendations_exclude_history_and_match_the_batch(engine, clicks):
+    model, click_index, popularity = engine
+    user_ids = list(clicks['user_id'].unique()[:50]) + [5000]
+    click_index.append(np.array([5000, 5000]), np.array([0, 1]), np.array([1, 2]))
+    batch = get_als_recommendations_batch(user_ids, popularity, model, top_n=5, click_index=click_index)
+    for user_id, batch_recommendations in zip(user_ids, batch):
+        recommendations = get_als_recommendations(int(user_id), popularity, model, top_n=5, click_index=click_index)
+        assert recommendations == batch_recommendations
+        history = set(click_index.history(int(user_id))[0].tolist())
+        assert not history & {recommendation['article_id'] for recommendation in recommendations}
@@ -0,0 +1,57 @@
+# tests/test_ann.py
+import numpy as np
+import pytest
+
+from functions.ann import ArticleVectorIndex, recall_at_n
+
+N_ARTICLES = 300
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(7)
+    return rng.normal(size=(N_ARTICLES, 12)).astype(np.float32), rng.normal(size=(5, 12)).astype(np.float32)
+
+def brute_force(article_vectors, queries, top_n, rows):
+    scores = queries @ article_vectors[rows].T
+    return rows[np.argsort(-scores, axis=1)[:, :top_n]]
+
+# Tout le catalogue, un sous-ensemble sélectif (vecteurs extraits) et un large (catalogue scoré puis masqué)
+@pytest.mark.parametrize("step", [None, 7, -7], ids=["catalog", "selective", "large"])
+def test_exact_search_matches_brute_force(vectors, step):
+    article_vectors, queries = vectors
+    every = np.arange(N_ARTICLES)
+    if step is None:
+        rows = None
+    elif step > 0:
+        rows = every[::step]
+    else:
+        rows = np.setdiff1d(every, every[::-step])
+    index = ArticleVectorIndex(article_vectors, mode="exact")
+
+    indices, scores = index.search_batch(queries, 10, rows=rows)
+    np.testing.assert_array_equal(indices, brute_force(article_vectors, queries, 10, every if rows is None else rows))
+    np.testing.assert_allclose(scores, np.take_along_axis(queries @ article_vectors.T, indices, axis=1), rtol=1e-5)
+    single_indices, _ = index.search(queries[0], 10, rows=rows)
+    np.testing.assert_array_equal(single_indices, indices[0])
+
+def test_top_n_is_capped_by_the_number_of_articles(vectors):
+    article_vectors, queries = vectors
+    index = ArticleVectorIndex(article_vectors)
+    assert index.search_batch(queries, 1000)[0].shape == (5, N_ARTICLES)
+    assert index.search_batch(queries, 10, rows=np.array([3, 5]))[0].shape == (5, 2)
+
+def test_unknown_mode_is_rejected(vectors):
+    with pytest.raises(ValueError):
+        ArticleVectorIndex(vectors[0], mode="fast")
+
+def test_approximate_search_recalls_the_exact_neighbours(vectors):
+    pytest.importorskip("hnswlib")
+    article_vectors, queries = vectors
+    index = ArticleVectorIndex(article_vectors, mode="approx", ef_search=100)
+    assert recall_at_n(index, queries, top_n=10) >= 0.9
+    indices, scores = index.search_batch(queries, 10)
+    assert np.all(np.diff(scores, axis=1) <= 1e-6)
+    # Un sous-ensemble éligible reste respecté en mode approché
+    rows = np.arange(0, N_ARTICLES, 3)
+    indices, _ = index.search_batch(queries, 10, rows=rows)
+    assert np.isin(indices, rows).all()
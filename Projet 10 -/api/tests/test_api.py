@@ -0,0 +1,64 @@
+# tests/test_api.py
+import json
+
+import numpy as np
+import pytest
+
+def post_clicks(client, user_id: int, article_ids: list, timestamp: int = 1_506_900_000_000):
+    clicks = [{"user_id": user_id, "click_article_id": article_id, "click_timestamp": timestamp + index}
+              for index, article_id in enumerate(article_ids)]
+    response = client.post("/clicks", json={"clicks": clicks})
+    assert response.status_code == 200
+
+def ids(response) -> list:
+    assert response.status_code == 200
+    return [recommendation["article_id"] for recommendation in response.json()["recommendations"]]
+
+def test_model_endpoints_see_ingested_clicks(api, client):
+    # Utilisateur inconnu : repli sur la popularité, mis en cache, puis fold-in dès ses premiers clics
+    for algo in ("svd", "als"):
+        assert "info" in client.get(f"/recommendation/{algo}", params={"user_id": 888888}).json()
+    post_clicks(client, 888888, [3, 4, 5])
+    for algo in ("svd", "als"):
+        response = client.get(f"/recommendation/{algo}", params={"user_id": 888888})
+        assert "projeté" in response.json()["info"]
+        assert not {3, 4, 5} & set(ids(response))
+
+def test_model_endpoints_exclude_articles_read_after_caching(api, client):
+    user_id = int(api.session_index.user_ids[0])
+    for algo in ("svd", "als"):
+        recommended = ids(client.get(f"/recommendation/{algo}", params={"user_id": user_id}))
+        post_clicks(client, user_id, recommended[:1])
+        assert recommended[0] not in ids(client.get(f"/recommendation/{algo}", params={"user_id": user_id}))
+
+def test_popularity_is_cached_across_clicks(api, client):
+    client.get("/recommendation/popularity")
+    hits = api.response_cache.hits
+    post_clicks(client, 999999, [int(np.random.default_rng(0).integers(0, 120))])
+    client.get("/recommendation/popularity")
+    assert api.response_cache.hits == hits + 1
+
+@pytest.mark.parametrize("algo", ["popularity", "item-based", "session-based", "covisitation", "svd", "als", "content-based"])
+def test_batch_streams_the_single_user_recommendations(api, client, monkeypatch, algo):
+    # Des paquets de 7 utilisateurs : le lot de 30 est scoré en plusieurs fois
+    monkeypatch.setattr(api, "BATCH_CHUNK_SIZE", 7)
+    user_ids = [int(user_id) for user_id in api.session_index.user_ids[:28]] + [999998, 5]
+    response = client.post(f"/recommendation/{algo}/batch", json={"user_ids": user_ids, "top_n": 4})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["user_id"] for line in lines] == user_ids
+
+    single_path = "/recommendation/popularity" if algo == "popularity" else f"/recommendation/{algo}"
+    for line in lines:
+        single = client.get(single_path, params={"user_id": line["user_id"]})
+        assert [recommendation["article_id"] for recommendation in line["recommendations"]] == ids(single)[:4]
+
+def test_batch_applies_candidate_filters(api, client):
+    response = client.post("/recommendation/svd/batch", json={"user_ids": [int(api.session_index.user_ids[0]), 999998], "category_id": 2})
+    for line in map(json.loads, response.text.splitlines()):
+        assert line["recommendations"]
+        assert all(recommendation["article_id"] % 5 == 2 for recommendation in line["recommendations"])
+
+def test_batch_rejects_unknown_algorithms(client):
+    assert client.post("/recommendation/foo/batch", json={"user_ids": [1]}).status_code == 404
@@ -0,0 +1,15 @@
+# tests/test_cache.py
+from functions.cache import ResponseCache
+
+def test_versions_are_checked_per_entry():
+    cache = ResponseCache(max_size=10, ttl_seconds=60)
+    cache.set(("popularity", None, 5, ()), ("models", 1), ["a"])
+    cache.set(("session-based", 1, 5, ()), ("models", 1, "clicks", 1), ["b"])
+
+    # Un nouveau clic change la version des endpoints qui lisent les historiques, pas celle des autres
+    assert cache.get(("session-based", 1, 5, ()), ("models", 1, "clicks", 2)) is None
+    assert cache.get(("popularity", None, 5, ()), ("models", 1)) == ["a"]
+    assert cache.stats()["size"] == 1
+
+    assert cache.get(("popularity", None, 5, ()), ("models", 2)) is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,51 @@
+# tests/test_candidates.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.candidates import CandidateIndex
+
+HOUR_MS = 3_600_000
+
+@pytest.fixture
+def metadata() -> pd.DataFrame:
+    # Article i créé i heures après le premier, catégorie i % 3, 100 * i mots
+    return pd.DataFrame({
+        "article_id": np.arange(10),
+        "category_id": np.arange(10) % 3,
+        "created_at_ts": 1_506_800_000_000 + np.arange(10) * HOUR_MS,
+        "words_count": np.arange(10) * 100,
+    })
+
+def test_resolve_combines_base_and_request_filters(metadata):
+    index = CandidateIndex(metadata, min_words=200)
+    assert index.eligible.ids.tolist() == list(range(2, 10))
+    assert index.resolve(category_id=1).ids.tolist() == [4, 7]
+    # Référence : le dernier article créé (9) ; 3 h au plus : 6 à 9
+    assert index.resolve(max_age_hours=3).ids.tolist() == [6, 7, 8, 9]
+    assert index.resolve(max_age_hours=3, category_id=1).ids.tolist() == [7]
+    assert index.resolve(category_id=42).ids.tolist() == []
+    assert index.eligible.contains([1, 2, 10, -1]).tolist() == [False, True, False, False]
+
+def test_generation_changes_only_with_the_eligible_set(metadata):
+    index = CandidateIndex(metadata)
+    generation = index.generation
+    index.refresh()
+    index.refresh(reference_ms=index.reference_ms)
+    assert index.generation == generation
+
+    # La fraîcheur de la requête suit l'instant de référence, sans changer la génération
+    fresh = index.resolve(max_age_hours=3)
+    version = index.version(max_age_hours=3)
+    index.refresh(reference_ms=index.reference_ms + 2 * HOUR_MS)
+    assert index.generation == generation
+    assert index.version() == (generation, None)
+    assert index.version(max_age_hours=3) != version
+    assert index.resolve(max_age_hours=3).ids.tolist() == [8, 9] != fresh.ids.tolist()
+
+def test_base_freshness_bumps_generation_when_articles_age_out(metadata):
+    index = CandidateIndex(metadata, max_age_hours=5)
+    generation, eligible = index.generation, index.eligible.ids.tolist()
+    index.refresh(reference_ms=index.reference_ms + 2 * HOUR_MS)
+    assert index.generation == generation + 1
+    assert index.eligible.ids.tolist() == eligible[2:]
@@ -0,0 +1,71 @@
+# tests/test_content_based.py
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.candidates import CandidateSet
+from functions.content_based import (ContentIndex, default_embeddings_cache_path, get_content_based_recommendations,
+                                     get_content_based_recommendations_batch, load_article_embeddings)
+from functions.popularity import PopularityIndex
+from functions.session_based import build_user_click_index
+
+@pytest.fixture
+def embeddings_path(tmp_path):
+    path = tmp_path / "articles_embeddings.pickle"
+    pd.to_pickle(np.random.default_rng(5).normal(size=(60, 8)), path)
+    return str(path)
+
+def ids(recommendations) -> list:
+    return [recommendation['article_id'] for recommendation in recommendations]
+
+def test_embeddings_are_converted_once_then_mapped(embeddings_path):
+    embeddings = load_article_embeddings(embeddings_path)
+    assert isinstance(embeddings, np.memmap) and embeddings.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
+    cache_path = default_embeddings_cache_path(embeddings_path)
+    converted_at = os.path.getmtime(cache_path)
+    load_article_embeddings(embeddings_path)
+    assert os.path.getmtime(cache_path) == converted_at
+
+    # Un pickle plus récent que sa conversion est reconverti
+    pd.to_pickle(np.ones((3, 8)), embeddings_path)
+    os.utime(embeddings_path, (converted_at + 10, converted_at + 10))
+    assert load_article_embeddings(embeddings_path).shape == (3, 8)
+
+def test_recommends_the_nearest_unread_articles_to_the_profile(embeddings_path, clicks):
+    embeddings = load_article_embeddings(embeddings_path)
+    content_index = ContentIndex(embeddings)
+    click_index = build_user_click_index(clicks)
+    popularity = PopularityIndex.from_dataframe(clicks)
+    user_ids = [int(user_id) for user_id in click_index.user_ids[:30]] + [123456]
+    mask = np.zeros(60, dtype=bool)
+    mask[::2] = True
+    candidates = CandidateSet(mask, key=("even",))
+
+    for restricted in (None, candidates):
+        batch = get_content_based_recommendations_batch(user_ids, content_index, click_index, popularity, top_n=5, candidates=restricted)
+        for user_id, recommendations in zip(user_ids, batch):
+            assert recommendations == get_content_based_recommendations(user_id, content_index, click_index, popularity, top_n=5, candidates=restricted)
+            articles, _ = click_index.history(user_id)
+            if len(articles) == 0:
+                assert recommendations == popularity.recommend(5, restricted)
+                continue
+            scores = embeddings @ embeddings[articles].mean(axis=0)
+            scores[articles] = -np.inf
+            if restricted is not None:
+                scores[~mask] = -np.inf
+            assert ids(recommendations) == np.argsort(-scores, kind="stable")[:5].tolist()
+
+def test_recency_weights_the_profile_towards_recent_clicks(embeddings_path, clicks):
+    embeddings = load_article_embeddings(embeddings_path)
+    content_index = ContentIndex(embeddings)
+    click_index = build_user_click_index(clicks)
+    popularity = PopularityIndex.from_dataframe(clicks)
+    # Deux clics à 10 heures d'écart : avec une demi-vie courte, le profil est celui du dernier article
+    click_index.append(np.array([5000, 5000]), np.array([10, 20]), np.array([0, 36_000_000]))
+    recommended = ids(get_content_based_recommendations(5000, content_index, click_index, popularity, top_n=3, recency_half_life_hours=0.1))
+    scores = embeddings @ embeddings[20]
+    scores[[10, 20]] = -np.inf
+    assert recommended == np.argsort(-scores)[:3].tolist()
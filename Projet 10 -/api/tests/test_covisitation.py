@@ -0,0 +1,77 @@
+# tests/test_covisitation.py
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.candidates import CandidateSet
+from functions.covisitation import (build_covisitation_index, build_covisitation_index_from_files, covisitation_counts,
+                                    get_covisitation_recommendations)
+from functions.popularity import PopularityIndex
+from functions.session_based import build_user_click_index
+
+MINUTE_MS = 60_000
+
+def test_counts_weight_consecutive_clicks_by_their_gap():
+    clicks = pd.DataFrame({
+        "session_id": [1, 1, 1, 1, 2, 2],
+        "click_article_id": [0, 1, 1, 2, 0, 1],
+        # Session 1 : 0 -> 1 (10 min), 1 -> 1 (même article), 1 -> 2 (70 min, trop tard) ; session 2 : 0 -> 1 (0 min)
+        "click_timestamp": [0, 10 * MINUTE_MS, 12 * MINUTE_MS, 82 * MINUTE_MS, 0, 0],
+    })
+    counts = covisitation_counts(clicks, max_gap_minutes=60, half_life_minutes=10, backward_weight=0.5).toarray()
+    expected = np.zeros((3, 3))
+    expected[0, 1] = 0.5 + 1.0
+    expected[1, 0] = 0.5 * expected[0, 1]
+    np.testing.assert_allclose(counts, expected)
+
+@pytest.fixture
+def sessions() -> pd.DataFrame:
+    rng = np.random.default_rng(2)
+    n_clicks = 4000
+    return pd.DataFrame({
+        "user_id": rng.integers(0, 300, n_clicks),
+        "session_id": rng.integers(0, 500, n_clicks),
+        "click_article_id": np.minimum(rng.zipf(1.4, n_clicks) - 1, 79),
+        # Trois heures de clics : des sessions à cheval sur plusieurs fichiers horaires
+        "click_timestamp": np.sort(rng.integers(0, 3 * 60 * MINUTE_MS, n_clicks)),
+    })
+
+def write_hourly_files(sessions: pd.DataFrame, directory) -> str:
+    for hour, clicks in sessions.groupby(sessions['click_timestamp'] // (60 * MINUTE_MS)):
+        clicks.to_csv(directory / f"clicks_hour_{hour:03d}.csv", index=False)
+    return str(directory)
+
+@pytest.mark.parametrize("max_workers, method", [(1, None), (2, "spawn"), (2, "forkserver")], ids=["in-process", "spawn", "forkserver"])
+def test_hourly_files_give_the_single_log_index(sessions, tmp_path, max_workers, method):
+    if method is not None and method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"méthode {method} indisponible")
+    expected = build_covisitation_index(sessions, top_k=10).neighbours
+    mp_context = multiprocessing.get_context(method) if method else None
+    built = build_covisitation_index_from_files(write_hourly_files(sessions, tmp_path), top_k=10, max_workers=max_workers, mp_context=mp_context).neighbours
+    assert built.shape == expected.shape
+    np.testing.assert_allclose(built.toarray(), expected.toarray(), rtol=1e-9)
+
+def test_next_articles_decay_exclude_and_filter(sessions):
+    covisitation_index = build_covisitation_index(sessions, top_k=20)
+    neighbours = covisitation_index.neighbours.toarray()
+    recent = np.array([3, 0])
+    expected = 0.5 * neighbours[3] + neighbours[0]
+    expected[recent] = -np.inf
+    assert covisitation_index.next_articles(recent, 5, recency_decay=0.5).tolist() == np.argsort(-expected, kind="stable")[:5].tolist()
+
+    mask = np.zeros(80, dtype=bool)
+    mask[1::2] = True
+    predicted = covisitation_index.next_articles(recent, 5, recency_decay=0.5, exclude=np.array([0, 1, 3]), candidates=CandidateSet(mask, key=("odd",)))
+    assert len(predicted) and np.all(predicted % 2 == 1) and 1 not in predicted
+    assert covisitation_index.next_articles(np.array([500]), 5).tolist() == []
+
+def test_recommendations_skip_read_articles(sessions):
+    covisitation_index = build_covisitation_index(sessions, top_k=20)
+    click_index = build_user_click_index(sessions)
+    popularity = PopularityIndex.from_dataframe(sessions)
+    for user_id in click_index.user_ids[:50]:
+        recommended = {recommendation['article_id'] for recommendation in get_covisitation_recommendations(int(user_id), click_index, covisitation_index, popularity)}
+        assert not recommended & set(click_index.history(int(user_id))[0].tolist())
+    assert get_covisitation_recommendations(123456, click_index, covisitation_index, popularity) == popularity.recommend(5)
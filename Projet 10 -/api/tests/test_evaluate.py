@@ -0,0 +1,51 @@
+# tests/test_evaluate.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+# Module importé entier : pytest collecterait sinon sa fonction `test_targets` comme un test
+import evaluate
+
+def test_ranking_metrics():
+    assert evaluate.ranking_metrics([1, 2, 3], {9}, k=3) == (0.0, 0.0, 0.0)
+    hr, ndcg, mrr = evaluate.ranking_metrics([5, 7, 9], {9, 5}, k=3)
+    assert hr == 1.0 and mrr == 1.0
+    assert ndcg == pytest.approx((1 + 1 / np.log2(4)) / (1 + 1 / np.log2(3)))
+    # Une réponse au-delà de k ne compte pas
+    assert evaluate.ranking_metrics([1, 2, 9], {9}, k=2) == (0.0, 0.0, 0.0)
+
+def test_split_and_targets_leave_out_read_articles():
+    clicks = pd.DataFrame({
+        "user_id": [1, 1, 2, 1, 2, 3],
+        "click_article_id": [10, 11, 12, 10, 13, 14],
+        "click_timestamp": [0, 1, 2, 10, 11, 12],
+    })
+    train, test, cutoff = evaluate.time_split(clicks, test_fraction=0.5)
+    assert train["click_timestamp"].max() < cutoff <= test["click_timestamp"].min()
+    assert len(train) + len(test) == len(clicks)
+
+    targets = evaluate.test_targets(test, max_users=10)
+    assert targets == {1: {10}, 2: {13}, 3: {14}}
+    seen = evaluate.seen_articles(train, targets)
+    assert seen == {1: {10, 11}, 2: {12}}
+    # L'utilisateur 1 n'a relu qu'un article déjà lu : il n'a rien à retrouver
+    assert evaluate.exclude_seen(targets, seen) == {2: {13}, 3: {14}}
+
+def test_evaluate_engine_refills_lists_after_excluding_read_articles():
+    requested = []
+
+    def recommend(user_id, top_n):
+        requested.append(top_n)
+        return list(range(top_n))
+
+    report = evaluate.evaluate_engine(recommend, {1: {3}}, k=2, n_articles=10, seen={1: {0, 1}})
+    # Deux articles lus : 4 demandés, les 2 premiers retirés, la liste [2, 3] contient la cible au rang 2
+    assert requested == [4]
+    assert report["metrics"]["hr@2"] == 1.0
+    assert report["metrics"]["mrr"] == 0.5
+    assert report["metrics"]["coverage"] == 0.2
+    assert evaluate.evaluate_engine(recommend, {1: {3}}, k=2, n_articles=10)["metrics"]["hr@2"] == 0.0
@@ -0,0 +1,56 @@
+# tests/test_hybrid.py
+import threading
+import time
+
+from functions.hybrid import HybridRecommender
+from functions.interactions import build_interaction_matrix
+from functions.item_based import build_item_similarity_index
+from functions.popularity import PopularityIndex
+from functions.session_based import build_user_click_index
+from functions.svd import train_svd_model
+
+def test_blend_excludes_history(clicks):
+    popularity = PopularityIndex.from_dataframe(clicks)
+    interaction_matrix = build_interaction_matrix(clicks)
+    similarity_index = build_item_similarity_index(interaction_matrix, top_k=20)
+    svd_model = train_svd_model(interaction_matrix, n_components=10)
+    click_index = build_user_click_index(clicks)
+    recommender = HybridRecommender(max_workers=4)
+    budgets_ms = {name: 10_000.0 for name in ("popularity", "item-based", "svd", "session")}
+
+    for user_id in (0, 1, 2, 5000):
+        recommendations, status = recommender.recommend(user_id, popularity, similarity_index, svd_model, click_index,
+                                                        top_n=5, budgets_ms=budgets_ms)
+        recommended = {recommendation['article_id'] for recommendation in recommendations}
+        assert len(recommended) == 5
+        assert not recommended & set(click_index.history(user_id)[0].tolist())
+    # Seul le poids de la popularité : les articles les plus populaires non lus
+    recommendations, _ = recommender.recommend(0, popularity, similarity_index, svd_model, click_index, top_n=3,
+                                               weights={"item-based": 0, "svd": 0, "session": 0}, budgets_ms=budgets_ms)
+    unread = [article_id for article_id in popularity.top(100) if article_id not in set(click_index.history(0)[0].tolist())]
+    assert [recommendation['article_id'] for recommendation in recommendations] == unread[:3]
+
+def test_late_engine_holds_at_most_one_thread():
+    recommender = HybridRecommender(max_workers=2)
+    release, calls = threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        release.wait()
+        return None
+
+    engines = {"slow": slow, "fast": lambda: ([1], [1.0])}
+    results, status = recommender.engine_scores(engines, {"slow": 10.0, "fast": 1000.0})
+    assert status == {"slow": "timeout", "fast": "ok"}
+    # L'appel en retard tourne toujours : le moteur n'est plus soumis, les autres restent servis
+    for _ in range(5):
+        _, status = recommender.engine_scores(engines, {"slow": 10.0, "fast": 1000.0})
+        assert status == {"slow": "skipped", "fast": "ok"}
+    assert len(calls) == 1
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while recommender._late.get("slow") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    _, status = recommender.engine_scores({"slow": lambda: None}, {"slow": 1000.0})
+    assert status == {"slow": "empty"}
@@ -0,0 +1,25 @@
+# tests/test_id_map.py
+import numpy as np
+import pytest
+
+from functions.id_map import IdMap
+
+def test_lookups_in_both_directions():
+    id_map = IdMap(np.array([3, 10, 42, 1_000_000]))
+    assert len(id_map) == 4
+    assert id_map.row(42) == 2
+    assert id_map.row(11) is None and id_map.row(2_000_000) is None and id_map.row(-1) is None
+    assert 10 in id_map and 11 not in id_map
+    assert id_map.rows([1_000_000, 3, 4, 2_000_000]).tolist() == [3, 0, -1, -1]
+    assert id_map.ids_at([2, 0]).tolist() == [42, 3]
+    assert id_map.ids_at(id_map.rows([10, 42])).tolist() == [10, 42]
+
+def test_empty_map_finds_nothing():
+    id_map = IdMap(np.empty(0, dtype=np.int64))
+    assert id_map.row(1) is None
+    assert id_map.rows(np.array([1, 2])).tolist() == [-1, -1]
+
+@pytest.mark.parametrize("ids", [[3, 1, 2], [1, 2, 2]], ids=["unsorted", "duplicates"])
+def test_rejects_unsorted_or_duplicated_ids(ids):
+    with pytest.raises(ValueError):
+        IdMap(np.array(ids))
@@ -0,0 +1,64 @@
+# tests/test_ingestion.py
+import os
+
+import pandas as pd
+import pytest
+
+from functions.ingestion import ClickFileWatcher, ClickStore, clicks_from_records
+
+def click_batch(user_id: int, article_ids: list) -> pd.DataFrame:
+    return clicks_from_records([
+        {"user_id": user_id, "click_article_id": article_id, "click_timestamp": 1_506_900_000_000 + index}
+        for index, article_id in enumerate(article_ids)
+    ])
+
+def test_compact_returns_the_sources_of_compacted_batches():
+    store = ClickStore(click_batch(1, [1, 2]))
+    store.append(click_batch(2, [3]), "a.csv")
+    store.append(click_batch(3, [4]))
+    version, snapshot = store.snapshot()
+    store.append(click_batch(4, [5]), "b.csv")
+
+    assert store.compact(version, snapshot) == ["a.csv"]
+    assert [len(batch) for batch in store.batches_since(version)] == [1]
+    # Un instantané plus ancien que la base ne compacte rien
+    assert store.compact(version - 1, snapshot) == []
+
+def test_watcher_passes_the_file_and_forgets_removed_files(tmp_path):
+    received = []
+    watcher = ClickFileWatcher(str(tmp_path), on_clicks=lambda clicks, file: received.append((len(clicks), file)))
+    path = tmp_path / "clicks_001.csv"
+    click_batch(1, [1, 2, 3]).to_csv(path, index=False)
+    watcher.poll()
+    watcher.poll()
+    assert received == [(3, str(path))]
+
+    os.remove(path)
+    watcher.poll()
+    assert watcher._seen == set()
+
+@pytest.mark.parametrize("archived", [True, False], ids=["archive", "delete"])
+def test_posted_click_files_leave_the_watched_dir_once_compacted(api, tmp_path, monkeypatch, archived):
+    watch_dir, archive_dir = tmp_path / "watch", tmp_path / "archive"
+    watch_dir.mkdir()
+    archive_dir.mkdir()
+    monkeypatch.setattr(api, "CLICKS_WATCH_DIR", str(watch_dir))
+    monkeypatch.setattr(api, "CLICKS_ARCHIVE_DIR", str(archive_dir) if archived else None)
+
+    user_id = 777777 if archived else 777778
+    path = api.queue_clicks(click_batch(user_id, [1, 2]))
+    watcher = api.click_file_watcher()
+    watcher.poll()
+    watcher.poll()
+    assert api.session_index.history(user_id)[0].tolist() == [1, 2]
+
+    api.refresh_models(force=True)
+    assert os.listdir(watch_dir) == []
+    assert os.listdir(archive_dir) == ([os.path.basename(path)] if archived else [])
+
+    # Au redémarrage, le dossier surveillé ne contient plus rien à ingérer
+    version = api.click_store.version
+    restarted = api.click_file_watcher()
+    restarted.poll()
+    restarted.poll()
+    assert api.click_store.version == version
@@ -0,0 +1,18 @@
+# tests/test_interactions.py
+import numpy as np
+import pandas as pd
+
+from functions.interactions import build_interaction_matrix
+
+def test_matches_the_pivot_table(clicks):
+    # Quelques clics sans article : ignorés, comme par l'ancien pivot_table
+    clicks = pd.concat([clicks, pd.DataFrame({"user_id": [0, 1], "click_article_id": [np.nan, np.nan]})], ignore_index=True)
+    interaction_matrix = build_interaction_matrix(clicks)
+    pivot = clicks.pivot_table(index='user_id', columns='click_article_id', aggfunc='size', fill_value=0)
+
+    assert interaction_matrix.user_ids.tolist() == pivot.index.tolist()
+    assert interaction_matrix.article_ids.tolist() == pivot.columns.astype(np.int64).tolist()
+    np.testing.assert_array_equal(interaction_matrix.counts.toarray(), pivot.to_numpy())
+    np.testing.assert_array_equal(interaction_matrix.binary.toarray(), pivot.to_numpy() > 0)
+    assert interaction_matrix.users.row(int(pivot.index[3])) == 3
+    assert interaction_matrix.articles.row(int(pivot.columns[-1])) == len(pivot.columns) - 1
@@ -0,0 +1,96 @@
+# tests/test_item_based.py
+import numpy as np
+import pytest
+
+from functions.interactions import build_interaction_matrix
+from functions.item_based import (build_item_similarity_index, get_item_based_collaborative_recommendations,
+                                  get_item_based_collaborative_recommendations_batch, item_based_scores)
+from functions.popularity import PopularityIndex
+from functions.session_based import build_user_click_index
+
+@pytest.fixture
+def engine(clicks):
+    return PopularityIndex.from_dataframe(clicks), build_item_similarity_index(build_interaction_matrix(clicks), top_k=20), build_user_click_index(clicks)
+
+def ids(recommendations) -> list:
+    return [recommendation['article_id'] for recommendation in recommendations]
+
+def test_ingested_clicks_feed_scores_and_exclusion(engine):
+    popularity, similarity_index, click_index = engine
+    # Utilisateur absent de l'index : ses clics ingérés suffisent à le scorer
+    assert item_based_scores(5000, similarity_index, click_index) is None
+    click_index.append(np.array([5000, 5000]), np.array([0, 1]), np.array([1, 2]))
+    article_ids, _ = item_based_scores(5000, similarity_index, click_index)
+    assert len(article_ids) and not {0, 1} & set(article_ids.tolist())
+
+    # Utilisateur connu : un article lu après la construction n'est plus recommandé
+    user_id = int(similarity_index.user_ids[0])
+    recommended = ids(get_item_based_collaborative_recommendations(user_id, popularity, similarity_index, top_n=5, click_index=click_index))
+    click_index.append(np.array([user_id]), np.array([recommended[0]]), np.array([2_000_000_000_000]))
+    after = ids(get_item_based_collaborative_recommendations(user_id, popularity, similarity_index, top_n=5, click_index=click_index))
+    assert recommended[0] not in after
+
+    users = [user_id, 5000, 123456]
+    batch = get_item_based_collaborative_recommendations_batch(users, popularity, similarity_index, top_n=5, click_index=click_index)
+    for single_user, recommendations in zip(users, batch):
+        single = get_item_based_collaborative_recommendations(single_user, popularity, similarity_index, top_n=5, click_index=click_index)
+        assert set(ids(recommendations)) == set(ids(single))
+        assert not set(ids(recommendations)) & set(click_index.history(single_user)[0].tolist())
+
+def test_similarity_keeps_the_top_k_cosine_neighbours(clicks):
+    interaction_matrix = build_interaction_matrix(clicks)
+    similarity_index = build_item_similarity_index(interaction_matrix, top_k=5)
+    binary = interaction_matrix.binary.toarray()
+    norms = np.sqrt((binary ** 2).sum(axis=0))
+    cosine = (binary.T @ binary) / np.outer(norms, norms)
+    np.fill_diagonal(cosine, 0)
+
+    similarity = similarity_index.similarity
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        columns, values = similarity.indices[start:end], similarity.data[start:end]
+        assert len(columns) == min(5, np.count_nonzero(cosine[row]))
+        np.testing.assert_allclose(values, cosine[row, columns], rtol=1e-5)
+        dropped = np.delete(cosine[row], columns)
+        assert values.min(initial=np.inf) >= dropped.max(initial=0) - 1e-6
+
+def test_recommendations_rank_unread_neighbours_by_summed_similarity(engine):
+    popularity, similarity_index, _ = engine
+    similarity = similarity_index.similarity.toarray()
+    for user_id in similarity_index.user_ids[:30]:
+        read = similarity_index.user_item[similarity_index.users.row(int(user_id))].toarray()[0] > 0
+        expected = read.astype(np.float32) @ similarity
+        expected[read] = 0
+        recommended = ids(get_item_based_collaborative_recommendations(int(user_id), popularity, similarity_index, top_n=5))
+        if not expected.any():
+            continue
+        scores = expected[similarity_index.articles.rows(recommended)]
+        assert not read[similarity_index.articles.rows(recommended)].any()
+        # Les recommandations sont les meilleurs scores (à égalité près), par ordre décroissant
+        assert np.all(np.diff(scores) <= 1e-6)
+        assert scores[-1] >= np.sort(expected)[-len(recommended)] - 1e-6
+
+@pytest.mark.parametrize("half_life_hours", [None, 0.5])
+def test_scores_match_the_loop_over_read_articles(engine, half_life_hours):
+    _, similarity_index, click_index = engine
+    similarity = similarity_index.similarity.toarray()
+    for user_id in similarity_index.user_ids[:40]:
+        articles, timestamps = click_index.history(int(user_id))
+        # Référence : une boucle sur les articles lus, chacun pondéré par la récence de son dernier clic
+        expected = {}
+        for article_id in np.unique(articles):
+            weight = 1.0
+            if half_life_hours is not None:
+                age_hours = (timestamps.max() - timestamps[articles == article_id].max()) / 3_600_000
+                weight = 0.5 ** (age_hours / half_life_hours)
+            row = similarity[similarity_index.articles.row(int(article_id))]
+            for column in np.flatnonzero(row):
+                neighbour = int(similarity_index.article_ids[column])
+                expected[neighbour] = expected.get(neighbour, 0.0) + weight * row[column]
+        for article_id in articles:
+            expected.pop(int(article_id), None)
+
+        result = item_based_scores(int(user_id), similarity_index, click_index, recency_half_life_hours=half_life_hours)
+        article_ids, scores = result if result is not None else ([], [])
+        assert sorted(article_ids) == sorted(expected)
+        np.testing.assert_allclose(scores, [expected[int(article_id)] for article_id in article_ids], rtol=1e-5)
@@ -0,0 +1,50 @@
+# tests/test_latent.py
+import numpy as np
+import pytest
+
+from functions.ann import ArticleVectorIndex
+from functions.candidates import CandidateSet
+from functions.id_map import IdMap
+from functions.latent import best_articles, seen_columns
+
+@pytest.fixture
+def latent():
+    rng = np.random.default_rng(3)
+    # 40 articles d'IDs pairs, 8 utilisateurs dont l'historique contient un article inconnu (1)
+    articles = IdMap(np.arange(0, 80, 2))
+    article_vectors = rng.normal(size=(40, 6)).astype(np.float32)
+    user_vectors = rng.normal(size=(8, 6)).astype(np.float32)
+    histories = [np.append(rng.choice(articles.ids, size=user, replace=False), 1) for user in range(8)]
+    return articles, article_vectors, user_vectors, histories
+
+def expected(articles, article_vectors, user_vectors, histories, top_n, eligible_ids):
+    results = []
+    for user_vector, history in zip(user_vectors, histories):
+        scores = article_vectors @ user_vector
+        allowed = np.isin(articles.ids, eligible_ids) & ~np.isin(articles.ids, history)
+        order = [row for row in np.argsort(-scores, kind="stable") if allowed[row]]
+        results.append(articles.ids[order[:top_n]].tolist())
+    return results
+
+def test_seen_columns_ignore_unknown_articles(latent):
+    articles, _, _, _ = latent
+    columns = seen_columns(articles, [np.array([4, 1, 4, 0]), np.empty(0, dtype=np.int64)])
+    assert [column.tolist() for column in columns] == [[0, 2], []]
+
+@pytest.mark.parametrize("with_index", [False, True], ids=["scores", "article_index"])
+@pytest.mark.parametrize("restricted", [False, True], ids=["catalog", "candidates"])
+def test_best_articles_exclude_history_and_respect_candidates(latent, with_index, restricted):
+    articles, article_vectors, user_vectors, histories = latent
+    eligible_ids = articles.ids[articles.ids % 3 != 0] if restricted else articles.ids
+    candidates = None
+    if restricted:
+        mask = np.zeros(80, dtype=bool)
+        mask[eligible_ids] = True
+        candidates = CandidateSet(mask, key=("test",))
+    article_index = ArticleVectorIndex(article_vectors, mode="exact") if with_index else None
+
+    results = best_articles(articles, article_vectors, article_index, user_vectors, histories, 5, candidates)
+    assert [article_ids.tolist() for article_ids, _ in results] == expected(articles, article_vectors, user_vectors, histories, 5, eligible_ids)
+    for article_ids, scores in results:
+        assert len(scores) == len(article_ids)
+        assert np.all(np.diff(scores) <= 1e-6)
@@ -0,0 +1,70 @@
+# tests/test_load_test.py
+import asyncio
+import os
+import sys
+
+import httpx
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import load_test
+
+def test_sampler_follows_the_click_distribution():
+    # L'utilisateur 3 a trois fois plus de clics que l'utilisateur 1
+    sampler = load_test.UserSampler(np.array([1, 3, 3, 3]), unknown_fraction=0.0)
+    assert sampler.users.tolist() == [1, 3]
+    users = sampler.sample(np.random.default_rng(0), 20_000)
+    assert np.mean(users == 3) == pytest.approx(0.75, abs=0.02)
+
+def test_sampler_adds_unknown_users():
+    sampler = load_test.UserSampler(np.arange(50), unknown_fraction=0.2)
+    users = sampler.sample(np.random.default_rng(0), 20_000)
+    unknown = users >= sampler.first_unknown
+    assert sampler.first_unknown == 50
+    assert np.mean(unknown) == pytest.approx(0.2, abs=0.02)
+    assert np.isin(users[~unknown], sampler.users).all()
+
+def test_scenario_requests():
+    sampler = load_test.UserSampler(np.arange(10), unknown_fraction=0.0)
+    rng = np.random.default_rng(0)
+
+    [(method, path, params, body)] = load_test.scenario_requests("batch", sampler, rng, batch_size=4)
+    assert (method, path, params) == ("POST", "/recommendation/svd/batch", None)
+    assert len(body["user_ids"]) == 4 and body["top_n"] == 5
+
+    # La popularité est envoyée sans user_id, les autres endpoints avec le même utilisateur
+    requests = load_test.scenario_requests("ui-compare", sampler, rng, batch_size=4)
+    assert [path for _, path, _, _ in requests] == list(load_test.ENDPOINTS.values())
+    assert requests[0][2] is None
+    assert len({params["user_id"] for _, _, params, _ in requests[1:]}) == 1
+
+    paths = {load_test.scenario_requests("mixed", sampler, rng, 4)[0][1] for _ in range(500)}
+    assert paths == set(load_test.ENDPOINTS.values())
+
+def test_run_step_against_the_app(api, client, clicks):
+    sampler = load_test.UserSampler(clicks["user_id"].to_numpy(), unknown_fraction=0.5)
+
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+            return await load_test.run_step(http_client, "ui-compare", sampler, concurrency=2, duration=0.5, warmup=0.1, batch_size=4)
+
+    step = asyncio.run(run())
+    assert step["transactions"] > 0
+    assert step["error_rate"] == 0.0
+    assert set(step["statuses"]) == {"200"}
+    assert step["latency_ms"]["p50"] <= step["latency_ms"]["p99"]
+
+def test_network_errors_count_as_failures():
+    def refuse(request):
+        raise httpx.ConnectError("refusée", request=request)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(refuse), base_url="http://test") as http_client:
+            sampler = load_test.UserSampler(np.arange(10))
+            return await load_test.run_step(http_client, "svd", sampler, concurrency=1, duration=0.1, warmup=0.0, batch_size=4)
+
+    step = asyncio.run(run())
+    assert step["error_rate"] == 1.0
+    assert set(step["statuses"]) == {"ConnectError"}
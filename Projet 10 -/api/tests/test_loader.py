@@ -0,0 +1,52 @@
+# tests/test_loader.py
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.loader import default_cache_path, load_clicks
+
+def write_hour(directory, hour: int, n_clicks: int = 50):
+    rng = np.random.default_rng(hour)
+    clicks = pd.DataFrame({
+        "user_id": rng.integers(0, 100, n_clicks),
+        "session_id": rng.integers(0, 300, n_clicks),
+        "click_article_id": rng.integers(0, 40, n_clicks).astype(float),
+        "click_timestamp": 1_506_826_800_000 + hour * 3_600_000 + np.arange(n_clicks),
+        "click_os": rng.integers(1, 4, n_clicks),
+    })
+    # Un clic sans article, écarté au chargement
+    clicks.loc[0, "click_article_id"] = np.nan
+    path = directory / f"clicks_hour_{hour:03d}.csv"
+    clicks.to_csv(path, index=False)
+    return path
+
+def test_hourly_files_load_with_narrow_dtypes(tmp_path):
+    write_hour(tmp_path, 0)
+    write_hour(tmp_path, 1)
+    clicks = load_clicks(str(tmp_path))
+    assert len(clicks) == 98
+    assert clicks["user_id"].dtype == np.int32
+    assert clicks["click_article_id"].dtype == np.int32
+    assert clicks["click_timestamp"].dtype == np.int64
+    assert isinstance(clicks["click_os"].dtype, pd.CategoricalDtype)
+    assert clicks["click_timestamp"].is_monotonic_increasing
+
+def test_arrow_cache_is_reused_then_rebuilt_when_a_file_is_newer(tmp_path):
+    pytest.importorskip("pyarrow")
+    write_hour(tmp_path, 0)
+    first = load_clicks(str(tmp_path))
+    cache_path = default_cache_path(str(tmp_path))
+    assert os.path.exists(cache_path)
+    cached_at = os.path.getmtime(cache_path)
+    pd.testing.assert_frame_equal(load_clicks(str(tmp_path)), first)
+    assert os.path.getmtime(cache_path) == cached_at
+
+    new_file = write_hour(tmp_path, 1)
+    os.utime(new_file, (cached_at + 10, cached_at + 10))
+    assert len(load_clicks(str(tmp_path))) == 2 * len(first)
+
+def test_missing_files_raise(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_clicks(str(tmp_path))
@@ -0,0 +1,64 @@
+# tests/test_metrics.py
+import threading
+
+import pytest
+
+from functions.metrics import Counter, Histogram, _Metric
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        _Metric("incomplete", "Métrique sans _samples")
+
+def test_histogram_concurrent_first_observations():
+    histogram = Histogram("test_seconds", "Durées de test", labels=("endpoint",), buckets=(0.1, 1.0))
+    observe = [histogram.labels(endpoint=f"e{index % 4}") for index in range(8)]
+    barrier = threading.Barrier(len(observe))
+
+    def worker(record):
+        barrier.wait()
+        for _ in range(1000):
+            record(0.5)
+
+    threads = [threading.Thread(target=worker, args=(record,)) for record in observe]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    counts = {key: value for suffix, _, key, value in histogram._samples() if suffix == "_count"}
+    assert counts == {(f"e{index}",): 2000 for index in range(4)}
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_render_seconds", "Durées", labels=("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage='a"b')
+    assert histogram.render() == [
+        "# HELP test_render_seconds Durées",
+        "# TYPE test_render_seconds histogram",
+        'test_render_seconds_bucket{stage="a\\"b",le="0.1"} 1.0',
+        'test_render_seconds_bucket{stage="a\\"b",le="1.0"} 3.0',
+        'test_render_seconds_bucket{stage="a\\"b",le="+Inf"} 4.0',
+        'test_render_seconds_sum{stage="a\\"b"} 4.05',
+        'test_render_seconds_count{stage="a\\"b"} 4.0',
+    ]
+    with pytest.raises(ValueError):
+        histogram.observe(1.0, function="x")
+
+def test_counter_accumulates_per_label_set():
+    counter = Counter("test_total", "Compteur", labels=("engine",))
+    counter.inc(engine="svd")
+    counter.inc(2, engine="svd")
+    counter.inc(engine="als")
+    assert counter.render()[2:] == ['test_total{engine="svd"} 3.0', 'test_total{engine="als"} 1.0']
+
+def test_metrics_endpoint_reports_route_templates_and_stages(api, client):
+    client.get("/recommendation/svd", params={"user_id": int(api.session_index.user_ids[1])})
+    client.get("/recommendation/svd", params={"user_id": 424242})
+    client.get("/does-not-exist")
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'recommendation_request_duration_seconds_count{endpoint="/recommendation/svd",method="GET",status="200"}' in body
+    assert 'endpoint="unmatched",method="GET",status="404"' in body
+    assert 'recommendation_stage_duration_seconds_count{function="get_svd_recommendations",stage="latent_vector"}' in body
+    assert 'recommendation_fallbacks_total{engine="svd",reason="unknown_user"}' in body
@@ -0,0 +1,43 @@
+# tests/test_popularity.py
+import numpy as np
+
+from functions.candidates import CandidateSet
+from functions.popularity import PopularityIndex
+
+def ranking(article_ids: np.ndarray, size: int) -> list:
+    # Référence : tri complet par nombre de clics décroissant puis par ID croissant
+    counts = np.bincount(article_ids)
+    clicked = np.flatnonzero(counts)
+    return clicked[np.lexsort((clicked, -counts[clicked]))][:size].tolist()
+
+def test_incremental_updates_match_a_full_recount(clicks):
+    rng = np.random.default_rng(4)
+    article_ids = clicks['click_article_id'].to_numpy()
+    index = PopularityIndex(article_ids, top_size=10)
+    for _ in range(20):
+        # Des lots qui font entrer des articles peu cliqués (ou nouveaux) dans le top
+        batch = rng.integers(40, 90, rng.integers(1, 40))
+        index.update(batch)
+        article_ids = np.concatenate([article_ids, batch])
+        assert index.top(10).tolist() == ranking(article_ids, 10)
+    assert index.popularity([0, 89, 1000, -1]).tolist() == [np.count_nonzero(article_ids == 0), np.count_nonzero(article_ids == 89), 0, 0]
+    # Au-delà de la liste gardée triée, la sélection se fait sur tout le catalogue
+    assert index.top(30).tolist() == ranking(article_ids, 30)
+
+def test_top_among_candidates(clicks):
+    article_ids = clicks['click_article_id'].to_numpy()
+    index = PopularityIndex(article_ids, top_size=5)
+    mask = np.zeros(100, dtype=bool)
+    mask[1::2] = True
+    candidates = CandidateSet(mask, key=("odd",))
+    expected = [article_id for article_id in ranking(article_ids, 60) if article_id % 2 == 1]
+    assert index.top(3, candidates).tolist() == expected[:3]
+    # Plus d'articles éligibles que la liste gardée triée n'en contient
+    assert index.top(12, candidates).tolist() == expected[:12]
+
+def test_from_counts_copies_the_counters(clicks):
+    index = PopularityIndex.from_dataframe(clicks)
+    copy = PopularityIndex.from_counts(index.counts)
+    copy.update(np.array([59, 59, 59]))
+    assert copy.popularity([59])[0] == index.popularity([59])[0] + 3
+    assert copy.recommend(5)[0] == index.recommend(5)[0]
@@ -0,0 +1,45 @@
+# tests/test_registry.py
+import os
+
+import pytest
+
+from functions.registry import ModelRegistry
+
+class Payload:
+    def __init__(self, value):
+        self.value = value
+
+    def save(self, directory):
+        os.makedirs(directory)
+        with open(os.path.join(directory, "value"), "w") as file:
+            file.write(str(self.value))
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "value")) as file:
+            return cls(int(file.read()))
+
+def test_versions_sort_numerically(tmp_path):
+    for name in ("v9999", "v10000", "v0002"):
+        os.makedirs(tmp_path / name)
+    registry = ModelRegistry(str(tmp_path), Payload)
+    assert registry.versions() == ["v0002", "v9999", "v10000"]
+    assert registry.latest_version() == "v10000"
+    assert registry.publish(Payload(1)) == "v10001"
+
+def test_publish_prunes_but_keeps_current(tmp_path):
+    registry = ModelRegistry(str(tmp_path), Payload, keep=2)
+    registry.publish(Payload(1))
+    registry.load("v0001")
+    for value in range(2, 5):
+        registry.publish(Payload(value))
+    assert registry.versions() == ["v0001", "v0003", "v0004"]
+    assert registry.current[1].value == 1
+
+    registry.load()
+    registry.publish(Payload(5))
+    assert registry.versions() == ["v0004", "v0005"]
+
+def test_keep_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        ModelRegistry(str(tmp_path), Payload, keep=0)
@@ -0,0 +1,42 @@
+# tests/test_session_based.py
+import numpy as np
+
+from functions.popularity import PopularityIndex
+from functions.session_based import build_user_click_index, get_session_based_recommendations
+
+def test_history_matches_a_per_user_sort(clicks):
+    click_index = build_user_click_index(clicks)
+    for user_id, group in clicks.groupby('user_id'):
+        group = group.sort_values('click_timestamp', kind='stable')
+        articles, timestamps = click_index.history(int(user_id))
+        assert articles.tolist() == group['click_article_id'].tolist()
+        assert timestamps.tolist() == group['click_timestamp'].tolist()
+    articles, timestamps = click_index.history(123456)
+    assert len(articles) == len(timestamps) == 0
+
+def test_appended_clicks_are_merged_and_compacted(clicks):
+    click_index = build_user_click_index(clicks)
+    user_id = int(clicks['user_id'].iloc[0])
+    first_ms = int(clicks['click_timestamp'].min())
+    # Un clic antérieur à tout l'historique, un clic récent, un utilisateur nouveau
+    click_index.append(np.array([user_id, user_id, 5000]), np.array([58, 59, 7]), np.array([first_ms - 1, 2_000_000_000_000, 1]))
+
+    articles, timestamps = click_index.history(user_id)
+    assert articles[0] == 58 and articles[-1] == 59
+    assert np.all(np.diff(timestamps) >= 0)
+    assert click_index.history(5000)[0].tolist() == [7]
+
+    compacted = click_index.compacted()
+    for known_user in (user_id, 5000, int(clicks['user_id'].iloc[-1])):
+        assert compacted.history(known_user)[0].tolist() == click_index.history(known_user)[0].tolist()
+    assert click_index.compacted() is not click_index
+    assert compacted.compacted() is compacted
+
+def test_recommends_the_most_recent_distinct_articles(clicks):
+    click_index = build_user_click_index(clicks)
+    popularity = PopularityIndex.from_dataframe(clicks)
+    click_index.append(np.array([5000] * 5), np.array([1, 2, 1, 3, 4]), np.arange(5))
+    recommended = [recommendation['article_id'] for recommendation in get_session_based_recommendations(5000, click_index, popularity, top_n=3)]
+    assert recommended == [4, 3, 1]
+    # Utilisateur inconnu : les articles populaires
+    assert get_session_based_recommendations(123456, click_index, popularity, top_n=3) == popularity.recommend(3)
@@ -0,0 +1,31 @@
+# tests/test_shared.py
+import numpy as np
+
+from functions.interactions import build_interaction_matrix
+from functions.covisitation import build_covisitation_index
+from functions.item_based import build_item_similarity_index
+from functions.popularity import PopularityIndex
+from functions.session_based import build_user_click_index
+from functions.shared import ServingIndexes
+
+def test_saved_click_index_includes_appended_clicks(clicks, tmp_path):
+    click_index = build_user_click_index(clicks)
+    # Un utilisateur connu (clic à un horodatage déjà présent) et un nouvel utilisateur
+    click_index.append(
+        np.array([0, 0, 1000]),
+        np.array([42, 43, 44]),
+        np.array([clicks['click_timestamp'].iloc[0], 1_506_900_000_000, 1_506_900_000_000]),
+    )
+    ServingIndexes(
+        click_index=click_index,
+        similarity_index=build_item_similarity_index(build_interaction_matrix(clicks), top_k=10),
+        covisitation_index=build_covisitation_index(clicks, top_k=10),
+        popularity_counts=PopularityIndex.from_dataframe(clicks).counts,
+    ).save(str(tmp_path))
+
+    published = ServingIndexes.load(str(tmp_path)).click_index
+    assert not published._appended
+    for user_id in (*range(200), 1000):
+        expected, loaded = click_index.history(user_id), published.history(user_id)
+        np.testing.assert_array_equal(loaded[0], expected[0])
+        np.testing.assert_array_equal(loaded[1], expected[1])
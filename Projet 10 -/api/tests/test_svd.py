@@ -0,0 +1,53 @@
+# tests/test_svd.py
+import numpy as np
+import pytest
+
+from functions.interactions import build_interaction_matrix
+from functions.popularity import PopularityIndex
+from functions.session_based import build_user_click_index
+from functions.svd import get_svd_recommendations, get_svd_recommendations_batch, svd_scores, train_svd_model
+
+@pytest.fixture(params=[False, True], ids=["scores", "article_index"])
+def engine(request, clicks):
+    model = train_svd_model(build_interaction_matrix(clicks), n_components=10)
+    if request.param:
+        model.build_article_index("exact")
+    return model, build_user_click_index(clicks), PopularityIndex.from_dataframe(clicks)
+
+def test_recommendations_exclude_history(engine, clicks):
+    model, click_index, popularity = engine
+    user_ids = clicks['user_id'].unique()
+    batch = get_svd_recommendations_batch(user_ids, popularity, model, top_n=5, click_index=click_index)
+    for user_id, batch_recommendations in zip(user_ids, batch):
+        history = set(click_index.history(int(user_id))[0].tolist())
+        recommendations = get_svd_recommendations(int(user_id), popularity, model, top_n=5, click_index=click_index)
+        assert recommendations == batch_recommendations
+        assert not history & {recommendation['article_id'] for recommendation in recommendations}
+
+def test_scores_exclude_history(engine, clicks):
+    model, click_index, _ = engine
+    for user_id in clicks['user_id'].unique()[:50]:
+        article_ids, scores = svd_scores(int(user_id), model, 10, click_index=click_index)
+        assert not np.isin(article_ids, click_index.history(int(user_id))[0]).any()
+        assert np.all(np.diff(scores) <= 1e-9)
+
+def test_fold_in_recovers_the_trained_user_factors(clicks):
+    model = train_svd_model(build_interaction_matrix(clicks), n_components=10)
+    click_index = build_user_click_index(clicks)
+    # Projeter l'historique d'un utilisateur de l'entraînement redonne sa ligne de U : (x - moyenne) · Vtᵀ · Σ⁻¹ = U
+    for user_id in model.user_ids[:30]:
+        user_vector, user_mean = model.fold_in(click_index.history(int(user_id))[0])
+        row = model.users.row(int(user_id))
+        np.testing.assert_allclose(user_vector, model.U[row], atol=1e-8)
+        assert user_mean == pytest.approx(model.user_means[row])
+    assert model.fold_in(np.array([1000, 1001])) is None
+
+def test_unseen_user_is_scored_from_the_fold_in(clicks):
+    model = train_svd_model(build_interaction_matrix(clicks), n_components=10)
+    click_index = build_user_click_index(clicks)
+    popularity = PopularityIndex.from_dataframe(clicks)
+    history = click_index.history(int(model.user_ids[0]))[0]
+    click_index.append(np.full(len(history), 5000), history, np.arange(len(history)))
+    # Même historique que l'utilisateur entraîné : mêmes recommandations
+    assert get_svd_recommendations(5000, popularity, model, top_n=5, click_index=click_index) == \
+        get_svd_recommendations(int(model.user_ids[0]), popularity, model, top_n=5, click_index=click_index)
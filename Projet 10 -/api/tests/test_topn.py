@@ -0,0 +1,26 @@
+# tests/test_topn.py
+import numpy as np
+import pytest
+
+from functions.topn import top_n_indices, top_n_indices_batch
+
+def full_sort(scores: np.ndarray, top_n: int, exclude: np.ndarray) -> list:
+    ranked = np.argsort(-scores, kind="stable")
+    return ranked[~exclude[ranked]][:top_n].tolist()
+
+@pytest.mark.parametrize("top_n", [1, 5, 50, 200])
+def test_matches_a_full_sort(top_n):
+    rng = np.random.default_rng(top_n)
+    scores = rng.normal(size=(6, 120))
+    exclude = rng.random(scores.shape) < 0.3
+    batch = top_n_indices_batch(scores, top_n, exclude=exclude)
+    for row, (row_scores, row_exclude) in enumerate(zip(scores, exclude)):
+        assert batch[row].tolist() == full_sort(row_scores, top_n, row_exclude)
+        assert top_n_indices(row_scores, top_n, exclude=row_exclude).tolist() == batch[row].tolist()
+    assert [row.tolist() for row in top_n_indices_batch(scores, top_n)] == [full_sort(row, top_n, np.zeros(120, dtype=bool)) for row in scores]
+
+def test_excluded_items_are_never_returned():
+    scores = np.array([5.0, 4.0, 3.0, 2.0])
+    assert top_n_indices(scores, 3, exclude=np.array([True, False, True, True])).tolist() == [1]
+    assert top_n_indices(scores, 0).tolist() == []
+    assert top_n_indices(np.array([-np.inf, 1.0]), 2).tolist() == [1, 0]
@@ -0,0 +1,28 @@
+# train_als.py
+"""
+Entraîne un nouveau modèle ALS implicite et le publie dans le registre.
+
+Usage :
+    python train_als.py <fichier_ou_dossier_de_clics> [factors] [iterations]
+
+L'API en cours d'exécution bascule sur cette version via `POST /models/als/reload`.
+"""
+import os
+import sys
+
+from functions.als import ALSModel, train_als_model
+from functions.interactions import build_interaction_matrix
+from functions.loader import load_clicks
+from functions.registry import ModelRegistry
+
+ALS_MODELS_DIR = os.path.join(os.environ.get("MODELS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")), "als")
+
+if __name__ == "__main__":
+    data_path = sys.argv[1]
+    factors = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 15
+
+    interaction_matrix = build_interaction_matrix(load_clicks(data_path))
+    model = train_als_model(interaction_matrix, factors=factors, iterations=iterations)
+    version = ModelRegistry(ALS_MODELS_DIR, ALSModel).publish(model)
+    print(f"Modèle ALS publié : {version}")
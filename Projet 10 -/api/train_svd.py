@@ -0,0 +1,27 @@
+# train_svd.py
+"""
+Entraîne un nouveau modèle SVD et le publie dans le registre.
+
+Usage :
+    python train_svd.py <fichier_ou_dossier_de_clics> [n_components]
+
+L'API en cours d'exécution bascule sur cette version via `POST /models/svd/reload`.
+"""
+import os
+import sys
+
+from functions.loader import load_clicks
+from functions.registry import ModelRegistry
+from functions.svd import SVDModel, load_and_prepare_svd_data, train_svd_model
+
+SVD_MODELS_DIR = os.path.join(os.environ.get("MODELS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")), "svd")
+
+if __name__ == "__main__":
+    data_path = sys.argv[1]
+    n_components = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    df = load_clicks(data_path)
+    _, interaction_matrix = load_and_prepare_svd_data(dataframe=df)
+    model = train_svd_model(interaction_matrix, n_components=n_components)
+    version = ModelRegistry(SVD_MODELS_DIR, SVDModel).publish(model)
+    print(f"Modèle SVD publié : {version}")
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import httpx
+
+# Codes de réponse pour lesquels une nouvelle tentative a un sens (API surchargée ou en redémarrage)
+RETRY_STATUS_CODES = {502, 503, 504}
+
+class RecommendationClient:
+    """
+    Client asynchrone de l'API de recommandation, avec un pool de connexions persistantes (keep-alive).
+
+    Une seule instance est partagée par toute l'interface : les connexions TCP sont réutilisées d'un appel
+    à l'autre au lieu d'être rouvertes à chaque requête.
+
+    Args:
+        base_url (str): L'URL de l'API.
+        timeout (float): Le délai maximal d'une requête, en secondes.
+        retries (int): Le nombre de nouvelles tentatives après une erreur réseau ou un code 502/503/504.
+        backoff (float): Le délai avant la première nouvelle tentative, doublé à chaque essai.
+        max_connections (int): Le nombre maximal de connexions simultanées vers l'API.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10.0, retries: int = 2, backoff: float = 0.1, max_connections: int = 20):
+        self.retries = retries
+        self.backoff = backoff
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 3.0)),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def get(self, endpoint: str, params: dict = None):
+        """
+        Args:
+            endpoint (str): Le chemin de l'endpoint (ex. "/recommendation/svd").
+            params (dict): Les paramètres de la requête.
+
+        Returns:
+            dict | None: La réponse JSON, ou None si l'appel échoue après toutes les tentatives.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._client.get(endpoint, params=params)
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.retries:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except (httpx.TimeoutException, httpx.NetworkError) as e:
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+                    continue
+                print(f"⚠️ Erreur API : {e}")
+            except httpx.HTTPError as e:
+                print(f"⚠️ Erreur API : {e}")
+                return None
+        return None
+
+    async def timed_get(self, endpoint: str, params: dict = None):
+        """
+        Returns:
+            tuple: La réponse JSON (ou None) et la durée de l'appel en millisecondes.
+        """
+        start = time.perf_counter()
+        response = await self.get(endpoint, params)
+        return response, (time.perf_counter() - start) * 1000
+
+    async def get_many(self, requests: dict) -> dict:
+        """
+        Envoie plusieurs requêtes en parallèle : la durée totale est celle de l'appel le plus lent.
+
+        Args:
+            requests (dict): Nom -> (endpoint, paramètres).
+
+        Returns:
+            dict: Nom -> (réponse JSON ou None, durée en millisecondes).
+        """
+        names = list(requests)
+        results = await asyncio.gather(*(self.timed_get(*requests[name]) for name in names))
+        return dict(zip(names, results))
+
+    async def aclose(self):
+        await self._client.aclose()
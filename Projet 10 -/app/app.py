@@ -1,36 +1,21 @@
 import gradio as gr
 import pandas as pd
-import requests
-import time
+
+from api_client import RecommendationClient
 
 # --- Configuration de l'API ---
 API_BASE_URL = "http://localhost:8005"
+RESULT_COLUMNS = ['Rang', 'ID Article', 'Popularité (clics)']
 
-def call_api(endpoint, params=None):
-    url = f"{API_BASE_URL}{endpoint}"
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"⚠️ Erreur API : {e}")
-        return None
+# Client unique : connexions persistantes réutilisées par tous les appels de l'interface
+api_client = RecommendationClient(API_BASE_URL, timeout=10)
 
-def get_recommendations_from_api(user_id_str, algo_choice):
-    # Animation de chargement
-    time.sleep(0.5)
-
-    try:
-        user_id = int(user_id_str)
-    except ValueError:
-        return (
-            pd.DataFrame(columns=['Rang', 'ID Article', 'Popularité (clics)']),
-            "❌ **Erreur** : L'ID utilisateur doit être un nombre entier.",
-            "error"
-        )
+async def call_api(endpoint, params=None):
+    return await api_client.get(endpoint, params)
 
+def algorithm_map(user_id):
     # Mapping des algorithmes et endpoints
-    algo_map = {
+    return {
         "Recommandation basée sur la popularité": {
             "endpoint": "/recommendation/popularity",
             "method": "Popularité Globale 🌍",
@@ -46,41 +31,75 @@ def get_recommendations_from_api(user_id_str, algo_choice):
             "method": "Session-Based Recommendation 🕒",
             "params": {"user_id": str(user_id)}
         },
+        "Prochain article (co-visitation des sessions)": {
+            "endpoint": "/recommendation/covisitation",
+            "method": "Co-visitation (articles lus à la suite) ⏭️",
+            "params": {"user_id": user_id}
+        },
         "Filtrage Collaboratif Basé sur SVD": {
             "endpoint": "/recommendation/svd",
             "method": "SVD (Décomposition en Valeurs Singulières) 📊",
             "params": {"user_id": user_id}
+        },
+        "Filtrage Collaboratif ALS (retours implicites)": {
+            "endpoint": "/recommendation/als",
+            "method": "ALS implicite 🧮",
+            "params": {"user_id": user_id}
+        },
+        "Recommandation basée sur le contenu": {
+            "endpoint": "/recommendation/content-based",
+            "method": "Content-Based (embeddings des articles) 📰",
+            "params": {"user_id": user_id}
+        },
+        "Recommandation hybride": {
+            "endpoint": "/recommendation/hybrid",
+            "method": "Hybride (mélange des moteurs) 🧩",
+            "params": {"user_id": user_id}
         }
     }
 
-    config = algo_map.get(algo_choice)
+ALGORITHM_CHOICES = list(algorithm_map(0))
+
+def recommendations_rows(api_response):
+    # Construction des lignes du DataFrame
+    recommendations = api_response.get('recommendations', [])
+    results = []
+    for i, rec in enumerate(recommendations, 1):
+        if isinstance(rec, dict) and 'article_id' in rec:
+            results.append({
+                'Rang': i,
+                'ID Article': rec['article_id'],
+                'Popularité (clics)': rec.get('popularity', 0)
+            })
+    return results
+
+async def get_recommendations_from_api(user_id_str, algo_choice):
+    try:
+        user_id = int(user_id_str)
+    except ValueError:
+        return (
+            pd.DataFrame(columns=RESULT_COLUMNS),
+            "❌ **Erreur** : L'ID utilisateur doit être un nombre entier.",
+            "error"
+        )
+
+    config = algorithm_map(user_id).get(algo_choice)
     if not config:
         return (
-            pd.DataFrame(columns=['Rang', 'ID Article', 'Popularité (clics)']),
+            pd.DataFrame(columns=RESULT_COLUMNS),
             "❌ **Erreur** : Algorithme inconnu. Veuillez sélectionner une option valide.",
             "error"
         )
 
-    api_response = call_api(config["endpoint"], config["params"])
+    api_response = await call_api(config["endpoint"], config["params"])
     if api_response is None:
         return (
-            pd.DataFrame(columns=['Rang', 'ID Article', 'Popularité (clics)']),
+            pd.DataFrame(columns=RESULT_COLUMNS),
             f"⚠️ **Erreur API** : Impossible de récupérer les recommandations pour {config['method']}.",
             "error"
         )
 
-    # Construction du DataFrame
-    recommendations = api_response.get('recommendations', [])
-    results = []
-    for i, rec in enumerate(recommendations, 1):
-        if isinstance(rec, dict) and 'article_id' in rec:
-            results.append({
-                'Rang': i,
-                'ID Article': rec['article_id'],
-                'Popularité (clics)': rec.get('popularity', 0)
-            })
-
-    df = pd.DataFrame(results)
+    df = pd.DataFrame(recommendations_rows(api_response))
     user_status = f"👤 **Utilisateur** : ID {user_id} traité avec succès !"
     info_text = f"""
     ✨ **Méthode** : {config['method']}
@@ -90,6 +109,37 @@ def get_recommendations_from_api(user_id_str, algo_choice):
 
     return df, info_text, "success"
 
+async def compare_all_algorithms(user_id_str):
+    try:
+        user_id = int(user_id_str)
+    except ValueError:
+        return (
+            pd.DataFrame(columns=['Algorithme', *RESULT_COLUMNS]),
+            "❌ **Erreur** : L'ID utilisateur doit être un nombre entier."
+        )
+
+    # Tous les endpoints sont appelés en même temps : l'attente totale est celle du plus lent
+    algorithms = algorithm_map(user_id)
+    responses = await api_client.get_many({name: (config["endpoint"], config["params"]) for name, config in algorithms.items()})
+
+    results, lines = [], []
+    for name, config in algorithms.items():
+        api_response, latency_ms = responses[name]
+        if api_response is None:
+            lines.append(f"    ⚠️ **{config['method']}** : indisponible ({latency_ms:.0f} ms)")
+            continue
+        rows = recommendations_rows(api_response)
+        results.extend({'Algorithme': config['method'], **row} for row in rows)
+        lines.append(f"    ✅ **{config['method']}** : {len(rows)} recommandations ({latency_ms:.0f} ms)")
+
+    slowest = max(latency_ms for _, latency_ms in responses.values())
+    info_text = "\n".join([
+        f"    👤 **Utilisateur** : ID {user_id}",
+        *lines,
+        f"    ⏱️ **Durée totale** : {slowest:.0f} ms (appels en parallèle)",
+    ])
+    return pd.DataFrame(results, columns=['Algorithme', *RESULT_COLUMNS]), info_text
+
 # --- Interface Gradio (Version PSM) ---
 with gr.Blocks(
     theme=gr.themes.Soft(
@@ -129,12 +179,7 @@ with gr.Blocks(
             )
             algo_selector = gr.Dropdown(
                 label="Algorithme de Recommandation",
-                choices=[
-                    "Recommandation basée sur la popularité",
-                    "Filtrage Collaboratif Basé sur les Items",
-                    "Filtrage Collaboratif Basé sur les Sessions",
-                    "Filtrage Collaboratif Basé sur SVD"
-                ],
+                choices=ALGORITHM_CHOICES,
                 value="Recommandation basée sur la popularité",
                 info="Sélectionnez la méthode de recommandation.",
                 elem_classes="dropdown-box"
@@ -144,6 +189,11 @@ with gr.Blocks(
                 variant="primary",
                 scale=1
             )
+            compare_btn = gr.Button(
+                "⚖️ **Comparer tous les algorithmes**",
+                variant="secondary",
+                scale=1
+            )
 
         # Colonne de droite : Résultats
         with gr.Column(scale=2):
@@ -158,6 +208,12 @@ with gr.Blocks(
                 datatype=["number", "number", "number"],
                 elem_classes="output-df"
             )
+            compare_df = gr.DataFrame(
+                label="Comparaison des Algorithmes",
+                headers=["Algorithme", "Rang", "ID Article", "Popularité (clics)"],
+                datatype=["str", "number", "number", "number"],
+                elem_classes="output-df"
+            )
 
     # --- Pied de page ---
     gr.Markdown("""
@@ -173,6 +229,12 @@ with gr.Blocks(
         outputs=[output_df, output_info],
         api_name="generate_recommendations"
     )
+    compare_btn.click(
+        fn=compare_all_algorithms,
+        inputs=[user_input],
+        outputs=[compare_df, output_info],
+        api_name="compare_algorithms"
+    )
 
 # --- Lancement ---
 if __name__ == "__main__":
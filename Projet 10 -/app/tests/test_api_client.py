@@ -0,0 +1,62 @@
+# tests/test_api_client.py
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api_client import RecommendationClient
+
+def client_with(handler, retries: int = 2) -> RecommendationClient:
+    # Transport simulé : les requêtes n'ouvrent aucune connexion
+    client = RecommendationClient("http://api", retries=retries, backoff=0.0)
+    client._client = httpx.AsyncClient(base_url="http://api", transport=httpx.MockTransport(handler))
+    return client
+
+def test_retries_overloaded_responses_then_succeeds():
+    statuses = [503, 502, 200]
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params["user_id"])
+        return httpx.Response(statuses[len(calls) - 1], json={"recommendations": [1]})
+
+    client = client_with(handler)
+    assert asyncio.run(client.get("/recommendation/svd", {"user_id": 5})) == {"recommendations": [1]}
+    assert calls == ["5", "5", "5"]
+
+def test_gives_up_without_retrying_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(404)
+
+    assert asyncio.run(client_with(handler).get("/recommendation/foo")) is None
+    assert len(calls) == 1
+
+def test_network_errors_are_retried_then_reported_as_none():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("refusée", request=request)
+
+    assert asyncio.run(client_with(handler, retries=1).get("/recommendation/svd")) is None
+    assert len(calls) == 2
+
+def test_get_many_sends_the_requests_concurrently():
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"path": request.url.path})
+
+    client = client_with(handler)
+    requests = {name: (f"/recommendation/{name}", {"user_id": 1}) for name in ("svd", "als", "item-based", "popularity")}
+    start = time.perf_counter()
+    results = asyncio.run(client.get_many(requests))
+    # Quatre appels de 200 ms : en parallèle, la durée totale est celle du plus lent
+    assert time.perf_counter() - start < 0.6
+    assert {name: response["path"] for name, (response, _) in results.items()} == {name: endpoint for name, (endpoint, _) in requests.items()}
+    assert all(elapsed_ms >= 150 for _, elapsed_ms in results.values())
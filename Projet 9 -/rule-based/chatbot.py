@@ -1,18 +1,88 @@
 import re
 import json
+from collections import deque
+
+DEFAULT_RESPONSE = "Je ne peux pas répondre à cette question. Voulez-vous que je cherche dans la documentation officielle ?"
+WORD_CHAR = re.compile(r"\w")
 
 class RuleBasedChatbot:
     def __init__(self, rules_file):
         with open(rules_file, 'r', encoding='utf-8') as f:
             self.rules = json.load(f)['intents']
-    
-    def find_best_match(self, user_input):
-        user_input = user_input.lower()
+        self._compile_patterns()
+
+    def _compile_patterns(self):
+        # Politique de choix, indépendante de l'ordre du fichier : la priorité de l'intention
+        # (champ "priority" optionnel, 0 par défaut) la plus haute, puis le motif le plus long,
+        # puis le plus tôt dans le message, puis le tag par ordre alphabétique
+        preferred = {}
         for intent in self.rules:
             for pattern in intent['patterns']:
-                if re.search(r'\b' + re.escape(pattern) + r'\b', user_input):
-                    return intent['response']
-        return "Je ne peux pas répondre à cette question. Voulez-vous que je cherche dans la documentation officielle ?"
+                pattern = pattern.lower()
+                if not pattern:
+                    continue
+                rank = (-intent.get('priority', 0), -len(pattern), intent['tag'])
+                if pattern not in preferred or rank < preferred[pattern][0]:
+                    preferred[pattern] = (rank, intent)
+        entries = sorted(preferred.items(), key=lambda item: item[1][0])
+        self._patterns = [pattern for pattern, _ in entries]
+        self._intents = [intent for _, (_, intent) in entries]
+        self._ranks = [rank[:2] for _, (rank, _) in entries]
+
+        # Automate d'Aho-Corasick construit au chargement : un trie des motifs, complété par les liens
+        # d'échec (le plus long suffixe de l'état qui est aussi un préfixe de motif). Le message est lu
+        # une seule fois, caractère par caractère : le coût est linéaire en la longueur du message
+        # (plus le nombre de correspondances), quel que soit le nombre de motifs, et les motifs qui se
+        # chevauchent sont tous trouvés
+        self._goto = [{}]
+        self._outputs = [[]]
+        for index, pattern in enumerate(self._patterns):
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._outputs.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._outputs[state].append(index)
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # Un état reconnaît aussi les motifs de son lien d'échec (suffixes plus courts)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+                queue.append(next_state)
+
+    def _matches(self, user_input):
+        # Correspondances (indice du motif, position de début) entourées de bornes de mot ; les bornes
+        # (pas de caractère \w de part et d'autre) valent aussi pour les motifs qui commencent ou
+        # finissent par de la ponctuation
+        state = 0
+        for position, char in enumerate(user_input):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for index in self._outputs[state]:
+                start, end = position + 1 - len(self._patterns[index]), position + 1
+                if start > 0 and WORD_CHAR.match(user_input, start - 1):
+                    continue
+                if WORD_CHAR.match(user_input, end):
+                    continue
+                yield index, start
+
+    def find_best_match(self, user_input):
+        user_input = user_input.lower()
+        # Les motifs sont classés du préféré au moins préféré : l'indice départage les ex aequo (le tag)
+        best = min(((self._ranks[index], start, index) for index, start in self._matches(user_input)), default=None)
+        if best is None:
+            return DEFAULT_RESPONSE
+        return self._intents[best[2]]['response']
 
     def get_response(self, user_input):
-        return self.find_best_match(user_input)
\ No newline at end of file
+        return self.find_best_match(user_input)
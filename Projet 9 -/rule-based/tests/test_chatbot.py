@@ -0,0 +1,72 @@
+# tests/test_chatbot.py
+import json
+import os
+import random
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chatbot import DEFAULT_RESPONSE, RuleBasedChatbot
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules.json")
+
+def make_chatbot(tmp_path, intents):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"intents": intents}), encoding="utf-8")
+    return RuleBasedChatbot(str(path))
+
+def intent(tag, patterns, priority=None):
+    rule = {"tag": tag, "patterns": patterns, "response": tag}
+    if priority is not None:
+        rule["priority"] = priority
+    return rule
+
+def test_priority_wins_over_length_and_position(tmp_path):
+    chatbot = make_chatbot(tmp_path, [intent("long", ["liste python"]), intent("urgent", ["aide"], priority=1)])
+    assert chatbot.get_response("liste python, aide") == "urgent"
+
+def test_longest_pattern_wins_at_equal_priority(tmp_path):
+    chatbot = make_chatbot(tmp_path, [intent("court", ["liste"]), intent("long", ["trier une liste"])])
+    assert chatbot.get_response("liste : comment trier une liste ?") == "long"
+
+def test_earliest_position_wins_at_equal_length(tmp_path):
+    chatbot = make_chatbot(tmp_path, [intent("tuple", ["tuple"]), intent("liste", ["liste"])])
+    assert chatbot.get_response("une liste ou un tuple") == "liste"
+    assert chatbot.get_response("un tuple ou une liste") == "tuple"
+
+def test_tag_breaks_remaining_ties_whatever_the_file_order(tmp_path):
+    for intents in ([intent("b", ["dict"]), intent("a", ["dict"])], [intent("a", ["dict"]), intent("b", ["dict"])]):
+        assert make_chatbot(tmp_path, intents).get_response("un dict") == "a"
+
+def test_word_boundaries_and_case(tmp_path):
+    chatbot = make_chatbot(tmp_path, [intent("fstring", ["F-String"]), intent("var", ["var"]), intent("cpp", ["c++"])])
+    assert chatbot.get_response("une f-string !") == "fstring"
+    assert chatbot.get_response("variable") == DEFAULT_RESPONSE
+    assert chatbot.get_response("et en c++ ?") == "cpp"
+    assert chatbot.get_response("abc++") == DEFAULT_RESPONSE
+
+def test_matches_reference_on_shipped_rules():
+    # Référence : chaque motif cherché séparément, même politique de choix
+    chatbot = RuleBasedChatbot(RULES_PATH)
+    rules = chatbot.rules
+    words = [word for rule in rules for pattern in rule["patterns"] for word in pattern.lower().split()] + ["bonjour", "merci", ","]
+    rng = random.Random(0)
+
+    def reference(message):
+        message = message.lower()
+        matches = [
+            ((-rule.get("priority", 0), -len(pattern.lower()), match.start(), rule["tag"]), rule["response"])
+            for rule in rules for pattern in rule["patterns"] if pattern
+            for match in re.finditer(rf"(?=(?<!\w){re.escape(pattern.lower())}(?!\w))", message)
+        ]
+        return min(matches)[1] if matches else DEFAULT_RESPONSE
+
+    for _ in range(500):
+        message = " ".join(rng.choice(words) for _ in range(rng.randint(1, 12)))
+        assert chatbot.get_response(message) == reference(message), message
+
+@pytest.mark.parametrize("message", ["", "rien à voir", "éàç"])
+def test_default_response(tmp_path, message):
+    assert make_chatbot(tmp_path, [intent("liste", ["liste"])]).get_response(message) == DEFAULT_RESPONSE